@@ -2,7 +2,6 @@ import DB.DB_Back as db
 import VLM_Control as VLM
 
 from datetime import datetime
-import random
 import json
 
 # for image adjustment
@@ -21,35 +20,37 @@ def Norm_Product_Operation(ID, Shelf_Property, Product_ID, QTY, Operator_ID, Sou
         Operator_ID (str): The ID of the operator performing the operation.
         Source (str, optional): The source of the operation (e.g., "Website", "Mobile App"). Defaults to "Website".
         project (str, optional): The project name associated with the operation. Defaults to None.
+    Returns:
+        int: The new quantity of the product on the shelf, otherwise an error (e.g. not enough stock).
     """
     if Source == "Website": 
         Shelf_ID = Shelf_Property
     else:
         Shelf_ID = db.Shelf_ID_From_Position(Shelf_Property)
     
-    Current_Qty = db.Get_Product_on_Shelf_QTY(Shelf_ID, Product_ID)
-    date = datetime.now()
-    
-    if QTY < 0:
-        QTY_Removed = abs(QTY)
-        QTY_Added = 0
-    else:
-        QTY_Removed = 0
-        QTY_Added = QTY
+    QTY_Added = max(QTY, 0)
+    QTY_Removed = max(-QTY, 0)
+
+    # One atomic change on the shelf, safe to run alongside other website and ESP32 operations
+    New_Qty = db.Stock_Delta_Apply_db(ID, Shelf_ID, Product_ID, QTY, datetime.now(), Operator_ID, Project_Name=project)
+    if isinstance(New_Qty, Exception):
+        db.log_event(
+            "WARNING",
+            f"Product operation rejected: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY={QTY}, Operator_ID={Operator_ID}, Source={Source}: {New_Qty}",
+            "Server",
+            transaction_type="PRODUCT_OPERATION",
+            transaction_id=ID,
+        )
+        return New_Qty
 
-    db.Add_Transaction_db(
-        ID, Product_ID, Shelf_ID, date, QTY_Added, QTY_Removed, Operator_ID, Project_Name=project
-    )
-
-    db.Products_Shelves_Update_db(Shelf_ID, Product_ID, QTY + Current_Qty)
-    
     db.log_event(
         "INFO",
-        f"Product operation logged: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY_Added={QTY_Added}, QTY_Removed={QTY_Removed}, Operator_ID={Operator_ID}, Source={Source}, Project_Name={project}",
+        f"Product operation logged: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY_Added={QTY_Added}, QTY_Removed={QTY_Removed}, New_Qty={New_Qty}, Operator_ID={Operator_ID}, Source={Source}, Project_Name={project}",
         "Server",
         transaction_type="PRODUCT_OPERATION",
         transaction_id=ID,
     )
+    return New_Qty
 
 def VLM_Product_Operation(Shelf_Pos, Product_ID, QTY, Operator_ID, project=None):
     """Logs a product operation (dispense or restock) and updates the database.
@@ -59,46 +60,78 @@ def VLM_Product_Operation(Shelf_Pos, Product_ID, QTY, Operator_ID, project=None)
         QTY (int): The quantity of the product being dispensed or restocked.
         Operator_ID (str): The ID of the operator performing the operation.
         project (str, optional): The project name associated with the operation. Defaults to None.
+    Returns:
+        int: The new quantity of the product on the shelf, otherwise an error (e.g. not enough stock).
     """
     Shelf_ID = db.Shelf_ID_From_Position(Shelf_Pos)
-    Current_Qty = db.Get_Product_on_Shelf_QTY(Shelf_ID, Product_ID)
-    date = datetime.now()
-    ID = f"N-{date.day}-{date.month}-{date.minute}-{random.randint(1,9)}{random.randint(1,9)}{random.randint(1,9)}"
+    ID = db.Transaction_ID_Generator()
+    QTY_Added = max(QTY, 0)
+    QTY_Removed = max(-QTY, 0)
+
+    New_Qty = db.Stock_Delta_Apply_db(ID, Shelf_ID, Product_ID, QTY, datetime.now(), Operator_ID, Project_Name=project)
+    if isinstance(New_Qty, Exception):
+        db.log_event(
+            "WARNING",
+            f"VLM Product operation rejected: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY={QTY}, Operator_ID={Operator_ID}: {New_Qty}",
+            "Server",
+            transaction_type="PRODUCT_OPERATION_VLM",
+            transaction_id=ID,
+        )
+        return New_Qty
 
-    if QTY < 0:
-        QTY_Removed = abs(QTY)
-        QTY_Added = 0
-    else:
-        QTY_Removed = 0
-        QTY_Added = QTY
-
-    db.Add_Transaction_db(
-        ID, Product_ID, Shelf_ID, date, QTY_Added, QTY_Removed, Operator_ID, Project_Name=project
-    )
-
-    db.Products_Shelves_Update_db(Shelf_ID, Product_ID, QTY + Current_Qty)
     db.log_event(
         "INFO",
-        f"VLM Product operation logged: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY_Added={QTY_Added}, QTY_Removed={QTY_Removed}, Operator_ID={Operator_ID}, Project_Name={project}",
+        f"VLM Product operation logged: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY_Added={QTY_Added}, QTY_Removed={QTY_Removed}, New_Qty={New_Qty}, Operator_ID={Operator_ID}, Project_Name={project}",
         "Server",
         transaction_type="PRODUCT_OPERATION_VLM",
         transaction_id=ID,
     )
+    return New_Qty
+
+def Bulk_Product_Operation(ID, Operations, Operator_ID, Source="Website", project=None):
+    """Logs a batch of product operations and updates the database in one transaction.
+    Args:
+        ID (int): The ID of the transaction shared by all operations.
+        Operations (list): A list of (Shelf_Property, Product_ID, QTY) tuples. Shelf_Property follows
+            the same rule as in Norm_Product_Operation (Shelf_ID for "Website", Shelf Position otherwise).
+        Operator_ID (str): The ID of the operator performing the operations.
+        Source (str, optional): The source of the operations. Defaults to "Website".
+        project (str, optional): The project name associated with the operations. Defaults to None.
+    Returns:
+        bool: True if the batch was applied, otherwise an error message.
+    """
+    rows = []
+    for Shelf_Property, Product_ID, QTY in Operations:
+        if Source == "Website":
+            Shelf_ID = Shelf_Property
+        else:
+            Shelf_ID = db.Shelf_ID_From_Position(Shelf_Property)
+        rows.append((Shelf_ID, Product_ID, QTY))
+
+    return db.Stock_Operations_Apply_db(ID, rows, datetime.now(), Operator_ID, Project_Name=project, Source=Source)
+
 ## Operator
+LOGIN_BUSY = "Login busy, please try again"
+
 def LogIn_Check(Username, Passw):
     """Checks if the provided username and password match an operator in the database.
+    The bcrypt hash runs on the bounded password hasher pool, not on the request thread.
     Args:
         Username (str): The username of the operator.
         Passw (str): The password of the operator.
     Returns:
         bool: True if the credentials are valid, False otherwise.
+              LOGIN_BUSY if the hasher pool is saturated.
     """
     try:
         [Name, Salted_Passw, Salt, AccessLevel] = db.Operator_Login(Username)
     except:
         return "Invalid Username!", False, False
 
-    Passw = db.Passw_Salter(Passw, Salt)
+    try:
+        Passw = db.Passw_Salter_Pooled(Passw, Salt)
+    except TimeoutError:
+        return LOGIN_BUSY, False, False
 
     if Passw == Salted_Passw:
         return True, Name, int(AccessLevel)
@@ -230,13 +263,11 @@ def Unique_Product_Families_Get():
     Returns a list of family names, thumbnails and product ids of the first product found of the family.
     This is used for the home page where the photo would be the one gathered and will land on the page with that product ID.
     """
-    Family_names = db.Unique_Family_Products_Get()
-    Thumbnails, Products_ID = db.Home_Page_Families_Get(Family_names)
-
-    if isinstance(Family_names, str):
-        return Family_names, [], []
-
-    return Family_names, Thumbnails, Products_ID
+    try:
+        return db.Families_First_Product_Get()
+    except Exception as e:
+        print(str(e))
+        return [], [], []
 
 
 def Product_Read(Product_ID):
@@ -254,16 +285,10 @@ def Products_Project_Search(project):
     Searches for products associated with a specific project ID.
     Returns a list of products associated with the project.
     """
-    Products_ID = db.Products_Project_Search(project)
-    if not Products_ID:
+    Products = db.Project_Products_Get(project)
+    if not Products:
         return "No products found for this project"
 
-    Products = []
-    for product_id in Products_ID:
-        product_info = db.Products_Data_Read(product_id)
-        if product_info:
-            Products.append(product_info)
-
     return Products
 
 
@@ -282,10 +307,20 @@ def Website_Transaction(product_ids, operation, operator_id, QTY=1, project=None
         return json.dumps({"status": "error", "message": "Invalid operation"}), 400
 
     # Physical Control of the VLM where the shelf is retrieved
-    Shelf_IDs, Positions = db.Product_Shelf_Get(product_ids)
+    Shelves = db.Product_Shelf_Get(product_ids)
 
-    if not Shelf_IDs:
-        Shelf_IDs, Positions = db.Product_Shelf_Choose(product_ids)
+    Missing = [pid for pid in product_ids if pid not in Shelves]
+    if Missing:
+        Chosen = db.Product_Shelf_Choose(Missing)
+        if Chosen:
+            for pid, shelf_id, pos in zip(Missing, *Chosen):
+                if shelf_id is not None:
+                    Shelves[pid] = (shelf_id, pos)
+
+    if any(pid not in Shelves for pid in product_ids):
+        return json.dumps({"status": "error", "message": "No shelf found for some products"}), 404
+    Shelf_IDs = [Shelves[pid][0] for pid in product_ids]
+    Positions = [Shelves[pid][1] for pid in product_ids]
 
     try:
         if operation == "dispense":
@@ -297,17 +332,16 @@ def Website_Transaction(product_ids, operation, operator_id, QTY=1, project=None
         Transaction_id = db.Transaction_ID_Generator()
         
         if Transaction:
-            for product_id, i in enumerate(product_ids):
-                Norm_Product_Operation(
-                    ID = Transaction_id,
-                    Shelf_Property=Shelf_IDs[i],
-                    Product_ID=product_id,
-                    QTY=QTY,
-                    Operator_ID=operator_id,
-                    Source="Website",
-                    project=project,
-                )
-            
+            result = Bulk_Product_Operation(
+                ID=Transaction_id,
+                Operations=[(shelf_id, product_id, QTY) for shelf_id, product_id in zip(Shelf_IDs, product_ids)],
+                Operator_ID=operator_id,
+                Source="Website",
+                project=project,
+            )
+            if result is not True:
+                raise result
+
             db.log_event(
                 "INFO",
                 f"Website {operation} operation successful for products {product_ids}",
@@ -330,16 +364,19 @@ def Website_Transaction(product_ids, operation, operator_id, QTY=1, project=None
         return json.dumps({"status": "error", "message": str(e)}), 500
 
 
-def Get_Product_Inventory(product_id):
+def Get_Product_Inventory(product_id, start=None, end=None, max_points=500):
     """
     Fetches inventory data for a product over time.
     Args:
         product_id (str): The ID of the product.
+        start (str, optional): Start of the date range.
+        end (str, optional): End of the date range.
+        max_points (int, optional): Upper bound on the number of chart points, None for every record.
     Returns:
         dict: A dictionary containing dates and quantities.
     """
     try:
-        inventory_records = db.Get_Product_Inventory_Records(product_id)
+        inventory_records = db.Get_Product_Inventory_Records(product_id, start=start, end=end, max_points=max_points)
         dates = [record["Time"] for record in inventory_records]
         quantities = [record["On_Hand"] for record in inventory_records]
         operators = [record["Operator_ID"] for record in inventory_records]
@@ -354,13 +391,14 @@ def Get_Product_Inventory(product_id):
         return str(e)
 
 
-def Get_Logs(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None, limit=50, offset=0):
-    """Wrapper to DB.Get_Logs"""
+def Get_Logs(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None, limit=50, offset=0, cursor=None, sort="time", include_archive=False):
+    """Wrapper to DB.Get_Logs, returns (logs, total, next_cursor). Raises ValueError for a malformed cursor."""
+    if cursor:
+        db.Logs_Cursor_Decode(cursor)  # the caller's mistake, not an empty result
     try:
-        logs, total = db.Get_Logs(level=level, source=source, transaction_type=transaction_type, transaction_id=transaction_id, q=q, start=start, end=end, limit=limit, offset=offset)
-        return logs, total
+        return db.Get_Logs(level=level, source=source, transaction_type=transaction_type, transaction_id=transaction_id, q=q, start=start, end=end, limit=limit, offset=offset, cursor=cursor, sort=sort, include_archive=include_archive)
     except Exception as e:
-        return [], 0
+        return [], 0, None
 
 
 def Get_Log_Selectors():
@@ -1,32 +1,625 @@
 import sqlite3
 import queue
+import base64
+import json
+import atexit
+import threading
+import time
+import os
+import re
+import sys
+import gzip
+import glob
+from datetime import datetime, timezone, timedelta
 import bcrypt
-
-# Simple connection pool
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from DB import DB_Create, DB_Queries
+
+# Per-query instrumentation for pool connections.
+# Every statement run on a pool connection is timed (execute plus the fetches that follow it) and
+# aggregated by calling function and normalized SQL, together with the rows fetched. The time
+# spent waiting for a pool connection is aggregated per function that opened the DBConnection.
+# Statements slower than slow_ms are kept in a short in-memory log and written to LOGS as
+# SLOW_QUERY warnings, without their parameters. Rows read by iterating a cursor are not counted.
+@lru_cache(maxsize=2048)
+def Query_Normalize(sql):
+    """Collapses whitespace and placeholder lists so the same query with any IN/VALUES size is one key."""
+    sql = " ".join(sql.split())
+    sql = re.sub(r"\?(\s*,\s*\?)+", "?, ...", sql)
+    sql = re.sub(r"\(\?(, \.\.\.)?\)(\s*,\s*\(\?(, \.\.\.)?\))+", r"(?\1), ...", sql)
+    return sql[:300]
+
+def Query_Caller(frame):
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name)
+
+class QueryStats:
+    QUIET_THREADS = {"LogWriter", "HallWriter"}  # slow batch writes are not logged to LOGS again
+
+    def __init__(self, slow_ms=100.0, enabled=True, max_queries=2000, slow_log_size=200):
+        """
+        Args:
+            slow_ms (float): Statements taking at least this long go to the slow-query log.
+            enabled (bool): Record anything at all.
+            max_queries (int): Distinct (function, query) keys kept, later ones are grouped as "(other)".
+            slow_log_size (int): Slow statements kept in memory for the debug endpoint.
+        """
+        self.slow_ms = slow_ms
+        self.enabled = enabled
+        self.max_queries = max_queries
+        self.lock = threading.Lock()
+        self.slow = deque(maxlen=slow_log_size)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.queries = {}  # (function, sql) -> [calls, total s, max s, rows]
+            self.functions = {}  # function -> [queries, query s, rows, waits, wait s, max wait s]
+            self.slow.clear()
+            self.since = time.time()
+
+    def _function(self, function):
+        entry = self.functions.get(function)
+        if entry is None:
+            entry = self.functions[function] = [0, 0.0, 0, 0, 0.0, 0.0]
+        return entry
+
+    def record(self, function, sql, elapsed):
+        """Adds an executed statement. Returns the trace its fetches are added to."""
+        key = (function, Query_Normalize(sql))
+        with self.lock:
+            entry = self.queries.get(key)
+            if entry is None:
+                if len(self.queries) >= self.max_queries:
+                    key = (function, "(other)")
+                    entry = self.queries.setdefault(key, [0, 0.0, 0.0, 0])
+                else:
+                    entry = self.queries[key] = [0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+            totals = self._function(function)
+            totals[0] += 1
+            totals[1] += elapsed
+        trace = [key, elapsed, 0, None]  # key, statement time so far, rows, slow log entry
+        self._check_slow(trace)
+        return trace
+
+    def fetched(self, trace, elapsed, rows):
+        key = trace[0]
+        trace[1] += elapsed
+        trace[2] += rows
+        with self.lock:
+            entry = self.queries.get(key)
+            if entry is not None:
+                entry[1] += elapsed
+                entry[2] = max(entry[2], trace[1])
+                entry[3] += rows
+            totals = self._function(key[0])
+            totals[1] += elapsed
+            totals[2] += rows
+        if trace[3] is not None:
+            trace[3]["ms"] = round(trace[1] * 1000, 2)
+            trace[3]["rows"] = trace[2]
+        else:
+            self._check_slow(trace)
+
+    def waited(self, function, elapsed):
+        """Adds the time a function waited for a pool connection."""
+        with self.lock:
+            totals = self._function(function)
+            totals[3] += 1
+            totals[4] += elapsed
+            totals[5] = max(totals[5], elapsed)
+
+    def _check_slow(self, trace):
+        ms = trace[1] * 1000
+        if trace[3] is not None or ms < self.slow_ms:
+            return
+        function, sql = trace[0]
+        # the entry keeps being updated by later fetches of the same statement
+        trace[3] = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "function": function, "ms": round(ms, 2), "rows": trace[2], "query": sql}
+        self.slow.append(trace[3])
+        if threading.current_thread().name not in self.QUIET_THREADS:
+            log_event("WARNING", f"Slow query in {function}: {ms:.1f} ms so far: {sql}", "Server", transaction_type="SLOW_QUERY")
+
+    def stats(self, limit=20):
+        """
+        Returns:
+            dict: {"enabled", "slow_ms", "since", "functions", "queries", "slow"} with functions and
+                  queries sorted by total time, queries limited to the top limit.
+        """
+        with self.lock:
+            functions = [
+                {"function": function, "queries": q, "query_ms": round(t * 1000, 2), "rows": rows,
+                 "waits": waits, "wait_ms": round(wait * 1000, 2), "max_wait_ms": round(max_wait * 1000, 2)}
+                for function, (q, t, rows, waits, wait, max_wait) in self.functions.items()
+            ]
+            queries = [
+                {"function": function, "query": sql, "calls": calls, "total_ms": round(total * 1000, 2),
+                 "mean_ms": round(total / calls * 1000, 3) if calls else None, "max_ms": round(longest * 1000, 2), "rows": rows}
+                for (function, sql), (calls, total, longest, rows) in self.queries.items()
+            ]
+            slow = list(self.slow)
+        functions.sort(key=lambda f: f["query_ms"] + f["wait_ms"], reverse=True)
+        queries.sort(key=lambda q: q["total_ms"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.since)),
+            "functions": functions,
+            "queries": queries[:limit],
+            "slow": slow[::-1],
+        }
+
+query_stats = QueryStats(
+    slow_ms=float(os.environ.get("VLM_SLOW_QUERY_MS", 100)),
+    enabled=os.environ.get("VLM_QUERY_STATS", "1") != "0",
+)
+
+class TracedCursor(sqlite3.Cursor):
+    trace = None
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, sys._getframe(1))
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters, sys._getframe(1))
+
+    def _run(self, method, sql, parameters, frame):
+        if not query_stats.enabled:
+            return method(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return method(sql, parameters)
+        finally:
+            self.trace = query_stats.record(Query_Caller(frame), sql, time.perf_counter() - started)
+
+    def _fetched(self, started, rows):
+        if self.trace is not None:
+            query_stats.fetched(self.trace, time.perf_counter() - started, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+class TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute does not go through cursor(), route it explicitly
+    def execute(self, sql, parameters=()):
+        cursor = self.cursor()
+        return cursor._run(super(TracedCursor, cursor).execute, sql, parameters, sys._getframe(1))
+
+    def executemany(self, sql, seq_of_parameters):
+        cursor = self.cursor()
+        return cursor._run(super(TracedCursor, cursor).executemany, sql, seq_of_parameters, sys._getframe(1))
+
+# Connection pool with separate read and write lanes.
+# WAL journaling lets the read lane keep serving while a writer commits.
 class ConnectionPool:
-    def __init__(self, db_path, pool_size=5):
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",  # durable in WAL mode, fsync only at checkpoints
+        "PRAGMA cache_size=-16000",  # 16 MB page cache per connection
+        "PRAGMA mmap_size=67108864",  # 64 MB memory mapped I/O
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    def __init__(self, db_path, pool_size=5, write_pool_size=2, timeout=10.0, busy_timeout_ms=5000, health_check_interval=30.0):
+        """
+        Args:
+            db_path (str): Path to the SQLite database file.
+            pool_size (int): Number of read-only connections.
+            write_pool_size (int): Number of read/write connections.
+            timeout (float): Seconds to wait for a free connection before raising TimeoutError.
+            busy_timeout_ms (int): How long SQLite retries a locked database before failing.
+            health_check_interval (float): Idle seconds after which a connection is checked before reuse.
+        """
         self.db_path = db_path
-        self.pool = queue.Queue(maxsize=pool_size)
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.health_check_interval = health_check_interval
+        self.lanes = {
+            "read": queue.Queue(maxsize=pool_size),
+            "write": queue.Queue(maxsize=write_pool_size),
+        }
+        self.lock = threading.Lock()
+        self.checked_out = {}  # id(conn) -> (lane, checkout time)
+        self.last_used = {}  # id(conn) -> time the connection was returned
+        self.counters = {
+            lane: {"acquired": 0, "exhausted": 0, "reconnects": 0, "wait_time": 0.0, "max_wait_time": 0.0, "hold_time": 0.0, "max_hold_time": 0.0}
+            for lane in self.lanes
+        }
+        for _ in range(write_pool_size):
+            self.lanes["write"].put(self._connect(read_only=False))
         for _ in range(pool_size):
-            conn = sqlite3.connect(db_path, check_same_thread=False)
-            self.pool.put(conn)
-
-    def get_connection(self):
-        return self.pool.get()
-
-    def return_connection(self, conn):
-        self.pool.put(conn)
+            self.lanes["read"].put(self._connect(read_only=True))
+
+    def _connect(self, read_only):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.busy_timeout_ms / 1000, factory=TracedConnection)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        self.last_used[id(conn)] = time.monotonic()
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
 
-pool = ConnectionPool("DB/DB.db")
+    def _replace(self, conn, lane):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self.last_used.pop(id(conn), None)
+        with self.lock:
+            self.counters[lane]["reconnects"] += 1
+        return self._connect(read_only=(lane == "read"))
+
+    def get_connection(self, lane="write"):
+        """Takes a connection from the given lane, waiting at most self.timeout seconds.
+        Raises:
+            TimeoutError: If no connection became free in time.
+        """
+        start = time.monotonic()
+        try:
+            conn = self.lanes[lane].get(timeout=self.timeout)
+        except queue.Empty:
+            with self.lock:
+                self.counters[lane]["exhausted"] += 1
+            raise TimeoutError(f"No {lane} connection available after {self.timeout}s")
+
+        now = time.monotonic()
+        if now - self.last_used.get(id(conn), now) > self.health_check_interval and not self._healthy(conn):
+            conn = self._replace(conn, lane)
+
+        waited = now - start
+        with self.lock:
+            stats = self.counters[lane]
+            stats["acquired"] += 1
+            stats["wait_time"] += waited
+            stats["max_wait_time"] = max(stats["max_wait_time"], waited)
+            self.checked_out[id(conn)] = (lane, now)
+        return conn
+
+    def return_connection(self, conn, broken=False):
+        """Puts a connection back in its lane. Open transactions are rolled back and
+        broken connections are replaced with a fresh one."""
+        now = time.monotonic()
+        with self.lock:
+            lane, checked_out_at = self.checked_out.pop(id(conn), ("write", now))
+            held = now - checked_out_at
+            stats = self.counters[lane]
+            stats["hold_time"] += held
+            stats["max_hold_time"] = max(stats["max_hold_time"], held)
+
+        if not broken:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        if broken and not self._healthy(conn):
+            conn = self._replace(conn, lane)
+
+        self.last_used[id(conn)] = now
+        self.lanes[lane].put(conn)
+
+    def stats(self):
+        """Returns a snapshot of the pool counters per lane."""
+        with self.lock:
+            snapshot = {}
+            for lane, stats in self.counters.items():
+                snapshot[lane] = dict(stats)
+                snapshot[lane]["size"] = self.lanes[lane].maxsize
+                snapshot[lane]["idle"] = self.lanes[lane].qsize()
+                snapshot[lane]["in_use"] = sum(1 for l, _ in self.checked_out.values() if l == lane)
+            return snapshot
+
+# VLM_DB_PATH points the whole backend at another database (benchmarks, see DB/DB_Bench.py)
+DB_PATH = os.environ.get("VLM_DB_PATH", "DB/DB.db")
+DB_Create.Migrate(DB_PATH)
+pool = ConnectionPool(DB_PATH)
 
 # Context manager for connections
+# Inside a Snapshot, read-only connections on that thread come from the snapshot instead of the pool.
 class DBConnection:
+    def __init__(self, read_only=False):
+        self.lane = "read" if read_only else "write"
+
     def __enter__(self):
-        self.conn = pool.get_connection()
+        snapshot = getattr(snapshot_local, "conn", None)
+        if snapshot is not None and self.lane == "read":
+            self.conn = None
+            return snapshot
+        started = time.perf_counter()
+        self.conn = pool.get_connection(self.lane)
+        if query_stats.enabled:
+            query_stats.waited(Query_Caller(sys._getframe(1)), time.perf_counter() - started)
         return self.conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pool.return_connection(self.conn)
+        if self.conn is not None:
+            pool.return_connection(self.conn, broken=isinstance(exc_val, sqlite3.DatabaseError))
+
+# Point-in-time copy of the tables an analytics job (Optimization) reads, made over a dedicated
+# connection. The source is attached and every table is copied with INSERT ... SELECT inside one
+# read transaction, so the copy is consistent, never blocks writers under WAL, holds no pool
+# connection, and leaves no long read transaction open to stall checkpoints while the job runs.
+# Only the listed tables and their indexes are copied, LOGS and the hall series stay behind.
+snapshot_local = threading.local()
+
+SNAPSHOT_TABLES = ("PRODUCTS", "SHELVES", "PRODUCTS_SHELVES", "PRODUCT_PROJECTS", "TRANSACTIONS")
+
+class Snapshot:
+    def __init__(self, path=None, db_path=None, tables=SNAPSHOT_TABLES):
+        """
+        Args:
+            path (str, optional): File to copy into, deleted on exit. Default is an in-memory copy.
+            db_path (str, optional): Database to copy, default is the pool's database.
+            tables (tuple): Tables to copy. Reads of any other table inside the snapshot fail.
+        """
+        self.path = path
+        self.db_path = db_path or pool.db_path
+        self.tables = tables
+        self.conn = None
+        self.seconds = None
+        self.rows = None
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self.conn = sqlite3.connect(self.path or ":memory:", check_same_thread=False, isolation_level=None)
+        try:
+            self.conn.execute(f"PRAGMA busy_timeout={int(pool.busy_timeout_ms)}")
+            self.conn.execute("ATTACH DATABASE ? AS source", (self.db_path,))
+            self.rows = {}
+            self.conn.execute("BEGIN")
+            try:
+                for table in self.tables:
+                    schema = self.conn.execute(
+                        "SELECT type, sql FROM source.sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') AND sql IS NOT NULL ORDER BY type = 'index'",
+                        (table,),
+                    ).fetchall()
+                    for kind, sql in schema:
+                        if kind == "table":
+                            self.conn.execute(sql)
+                            self.rows[table] = self.conn.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table}").rowcount
+                        else:
+                            self.conn.execute(sql)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("DETACH DATABASE source")
+        except Exception:
+            self.conn.close()
+            raise
+        self.conn.execute("PRAGMA query_only = ON")
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.previous = getattr(snapshot_local, "conn", None)
+        snapshot_local.conn = self.conn
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        snapshot_local.conn = self.previous
+        self.conn.close()
+        if self.path:
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                try:
+                    os.remove(self.path + suffix)
+                except FileNotFoundError:
+                    pass
+
+def In_Snapshot():
+    """True if read-only connections on this thread are served by a Snapshot."""
+    return getattr(snapshot_local, "conn", None) is not None
+
+# Read-through cache for catalog reads (products, families, projects).
+# Every entry lists the tags it depends on; writers invalidate tags, which drops exactly the
+# entries built from the rows they changed. Cached values are shared, callers must not mutate them.
+class CatalogCache:
+    MISSING = object()
+
+    def __init__(self, max_entries=2048, default_ttl=300.0, ttls=None):
+        """
+        Args:
+            max_entries (int): Least recently used entries are evicted past this size.
+            default_ttl (float): Seconds an entry stays valid.
+            ttls (dict, optional): TTL per key namespace (the first element of the key tuple).
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.entries = OrderedDict()  # key -> (expires, value, tags)
+        self.tagged = {}  # tag -> set of keys
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidated": 0}
+
+    def get(self, key):
+        """Returns the cached value, or CatalogCache.MISSING. Reads inside a Snapshot bypass the cache."""
+        if In_Snapshot():
+            return self.MISSING
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return self.MISSING
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return self.MISSING
+            self.entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[1]
+
+    def set(self, key, value, tags=(), generation=None):
+        """
+        Stores a value. Pass the generation read before loading it: if anything was invalidated
+        since, the value may be stale and is not stored. Values read from a Snapshot are not stored.
+        """
+        if In_Snapshot():
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self.entries:
+                self._remove(key)
+            ttl = self.ttls.get(key[0], self.default_ttl)
+            tags = set(tags) | {key}
+            self.entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self.tagged.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.counters["evicted"] += 1
+
+    def invalidate(self, *tags):
+        """Drops every entry that depends on one of the tags."""
+        with self.lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self.tagged.get(tag, ())):
+                    self._remove(key)
+                    self.counters["invalidated"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.counters["invalidated"] += len(self.entries)
+            self.entries.clear()
+            self.tagged.clear()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else None
+        return stats
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tagged[tag]
+
+catalog_cache = CatalogCache(ttls={"product": 60.0, "project_products": 60.0})
+
+# In-memory shelf topology: shelf ID <-> position <-> level.
+# Loaded at startup and kept current by Shelves_DB_Add / Shelves_DB_Pos_Update, so the ESP32
+# message path resolves positions without reading SHELVES. Shelves written by anything else
+# (DB_Import, another process on the same file) bump SHELVES_VERSION.Generation (migration 7),
+# lookups compare it with the loaded generation and reload the registry when it moved.
+# Positions are side + level, e.g. 'F01' or 'B12'.
+class ShelfRegistry:
+    def __init__(self, check_interval=1.0):
+        """
+        Args:
+            check_interval (float): Seconds between generation checks for shelf_id/position.
+                level() always checks, it decides where the lift goes.
+        """
+        self.by_id = {}  # Shelf_ID -> Pos
+        self.by_pos = {}  # Pos -> Shelf_ID
+        self.lock = threading.Lock()
+        self.check_interval = check_interval
+        self.generation = None
+        self.checked = 0.0
+
+    def load(self):
+        """Replaces the registry with the current SHELVES table."""
+        with DBConnection(read_only=True) as db:
+            # Generation first: a change in between only causes one more reload later
+            generation = Shelves_Generation(db)
+            rows = db.execute("SELECT ID, Pos FROM SHELVES ORDER BY rowid").fetchall()
+        with self.lock:
+            self.by_id = {}
+            self.by_pos = {}
+            for ID, Pos in rows:
+                self.by_id[ID] = Pos
+                self.by_pos[Pos] = ID
+            self.generation = generation
+            self.checked = time.monotonic()
+
+    def refresh(self, force=False):
+        """Reloads the registry if SHELVES changed since it was loaded.
+        The generation is read at most once per check_interval unless force.
+        """
+        if not force and time.monotonic() - self.checked < self.check_interval:
+            return
+        with DBConnection(read_only=True) as db:
+            generation = Shelves_Generation(db)
+        self.checked = time.monotonic()
+        if generation != self.generation:
+            self.load()
+
+    def set(self, ID, Pos):
+        """Records a shelf at a position, dropping its previous position."""
+        with self.lock:
+            Old_Pos = self.by_id.get(ID)
+            if Old_Pos is not None and self.by_pos.get(Old_Pos) == ID:
+                del self.by_pos[Old_Pos]
+            self.by_id[ID] = Pos
+            self.by_pos[Pos] = ID
+
+    def shelf_id(self, Pos):
+        self.refresh()
+        return self.by_pos.get(Pos)
+
+    def position(self, ID):
+        self.refresh()
+        return self.by_id.get(ID)
+
+    def level(self, ID):
+        """Level of a shelf as an int, or None for an unknown shelf."""
+        self.refresh(force=True)
+        return Pos_Level(self.by_id.get(ID))
+
+def Shelves_Generation(db):
+    """SHELVES_VERSION.Generation, changed by every shelf insert, delete or move."""
+    row = db.execute("SELECT Generation FROM SHELVES_VERSION WHERE ID = 1").fetchone()
+    return row[0] if row else None
+
+def Pos_Level(Pos):
+    """Level encoded in a shelf position ('F03' -> 3), or None if the position is not valid."""
+    try:
+        return int(Pos[1:])
+    except (TypeError, ValueError):
+        return None
+
+shelf_registry = ShelfRegistry()
+shelf_registry.load()
 
 # def get_db_connection():
 #     """Create a new SQLite connection for the current thread."""
@@ -44,165 +637,97 @@ def Get_Product_on_Shelf_QTY(Product_ID, Shelf_ID):
         int: The quantity of the product on the shelf. Returns 0 if not found.
         """
     
-    with DBConnection() as db:
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
         cursor.execute(
-            "SELECT Quantity FROM PRODUCTS_SHELVES WHERE Product_ID = ? AND Shelf_ID = ?",
+            DB_Queries.PRODUCT_ON_SHELF_QTY,
             (Product_ID, Shelf_ID),
         )
         Qty = cursor.fetchone()
         return Qty[0] if Qty else 0
 
-def Product_Shelf_Get(Product_ID):
-    """Get the shelf ID where the product is located.
+def Product_Shelf_Get(Product_ID, chunk_size=500):
+    """Get the shelf where each product is located, in one query per chunk of product IDs.
+    When a product sits on several shelves, shelves that still hold stock win, then the one
+    with the most space left.
     Args:
-        Product_ID (list): The unique identifier of the product or a list of product IDs.
+        Product_ID (list): A list of product IDs.
+        chunk_size (int): Maximum number of product IDs bound in a single query.
     Returns:
-        list: A list of shelf IDs where the product(s) is/are located.
+        dict: {Product_ID: (Shelf_ID, Pos)} for every product found on a shelf.
     """
-    with DBConnection() as db:
-    
+    Product_IDs = list(dict.fromkeys(Product_ID))
+    Shelves = {}
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
-        Shelf_IDs = []
-        Positions = []
-        
-        # If Product_ID is a list, loop through each IDs
-        for pid in Product_ID:
-            cursor.execute(
-                "SELECT Shelf_ID, Pos FROM PRODUCTS_SHELVES WHERE Product_ID = ? ORDER BY SpaceLeft DESC",
-                (pid,),
-            )
-            Shelf_ID_loop = cursor.fetchone()
-
-            if Shelf_ID_loop:
-                
-                Shelf_IDs.append(Shelf_ID_loop[0])
-                Positions.append(Shelf_ID_loop[1])
-            
-        return Shelf_IDs, Positions if Shelf_IDs else (None, None)
+        for i in range(0, len(Product_IDs), chunk_size):
+            chunk = Product_IDs[i:i + chunk_size]
+            cursor.execute(DB_Queries.Product_Shelf_Get_Query(len(chunk)), chunk)
+            for pid, shelf_id, pos, _ in cursor.fetchall():
+                Shelves[pid] = (shelf_id, pos)
+    return Shelves
 
 def Product_Shelf_Choose(Product_IDs):
     """Choose the best shelf for dispensing/restocking based on quantity and weight.
+    For every product the shelf is picked in one ranked query, in order of preference:
+        1. Shelves holding other products of the same project(s)
+        2. Shelves holding other products of the same family
+        3. The best shelf overall
+    Within a tier, shelves with more space left and then less weight win.
     Args:
-        Product_ID (list): The unique identifier of the product.
+        Product_IDs (list): The unique identifiers of the products.
     Returns:
-        best_shelf[0]: list: A list containing the best shelf ID.
-        best_shelf[1]: list: A list containing the best shelf position.
+        list: The best shelf ID for each product, in the order of Product_IDs (None for unknown products).
+        list: The matching shelf positions.
+        None: If none of the products exist.
     """
-    with DBConnection() as db:
+    Product_IDs = list(Product_IDs)
+    if not Product_IDs:
+        return None
+    params = [value for seq, pid in enumerate(Product_IDs) for value in (seq, pid)]
+
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
-        best_shelf = None
-        Product_ID = Product_IDs[0]  # Assuming we are choosing shelf for the first product in the list
-       # Sequence: 1. Get Product info 2. Get projects associated with product 3. Get other products on those projects 4. Get shelves associated with those products if not found
+        cursor.execute(DB_Queries.Product_Shelf_Choose_Query(len(Product_IDs)), params)
+        best = {seq: (shelf_id, pos) for seq, shelf_id, pos in cursor.fetchall()}
 
-        cursor.execute("SELECT * FROM PRODUCTS WHERE ID = ?", (Product_ID,))
-        product = cursor.fetchone()
-        if not product:
-            return None
-        cursor.execute("SELECT * FROM PRODUCT_PROJECTS WHERE Product_ID = ?", (Product_ID,))
-        
-        project_names = cursor.fetchall()
-        if project_names:
-            project_names = [project[1] for project in project_names]
+    if not best:
+        return None
+    Shelf_IDs = [best.get(seq, (None, None))[0] for seq in range(len(Product_IDs))]
+    Positions = [best.get(seq, (None, None))[1] for seq in range(len(Product_IDs))]
+    return Shelf_IDs, Positions
 
-            placeholders = ', '.join('?' * len(project_names))
-            query = f"SELECT Product_ID FROM PRODUCT_PROJECTS WHERE Project IN ({placeholders})"
-            cursor.execute(query, project_names)
-            
-            related_products = cursor.fetchall()
-            if related_products:
-                related_products = [rp[0] for rp in related_products if rp[0] != Product_ID]
-                
-                placeholders = ', '.join('?' * len(related_products))
-                query = f"SELECT Shelf_ID FROM PRODUCTS_SHELVES WHERE Product_ID IN ({placeholders})"
-                cursor.execute(query, related_products)
-                
-                shelf_ids = cursor.fetchall()
-                if shelf_ids:
-                    shelf_ids = [shelf[0] for shelf in shelf_ids]
-
-                    placeholders = ', '.join('?' * len(shelf_ids))
-                    query = f"SELECT ID, Pos, Weight, SpaceLeft FROM SHELVES WHERE ID IN ({placeholders}) ORDER BY SpaceLeft DESC, Weight ASC"
-                    cursor.execute(query, shelf_ids)
-                    best_shelf = cursor.fetchone()
-                    if best_shelf:
-                        return [best_shelf[0]], [best_shelf[1]]
-
-        # If no projects or project logic failed, look for family 
-        if not best_shelf:
-            cursor.execute("SELECT Family_Name FROM PRODUCTS WHERE ID = ?", (Product_ID,))
-            family_name = cursor.fetchall()
-            if family_name:
-                family_name = [fn[0] for fn in family_name]
-                placeholders = ', '.join('?' * len(family_name))
-                query = f"SELECT ID FROM PRODUCTS WHERE Family_Name IN ({placeholders})"
-
-                cursor.execute(query, family_name)
-                family_products = cursor.fetchall()
-                
-                if family_products:
-                    family_products = [fp[0] for fp in family_products if fp[0] != Product_ID]
-                    
-                    placeholders = ', '.join('?' * len(family_products))
-                    query = f"SELECT Shelf_ID FROM PRODUCTS_SHELVES WHERE Product_ID IN ({placeholders})"
-                    cursor.execute(query, family_products)
-                    
-                    shelf_ids = cursor.fetchall()
-                    if shelf_ids:
-                        shelf_ids = [shelf[0] for shelf in shelf_ids]
-
-                        placeholders = ', '.join('?' * len(shelf_ids))
-                        query = f"SELECT ID, Pos, Weight, SpaceLeft FROM SHELVES WHERE ID IN ({placeholders}) ORDER BY SpaceLeft DESC, Weight ASC"
-                        cursor.execute(query, shelf_ids)
-                        best_shelf = cursor.fetchone()
-                        if best_shelf:
-                            return [best_shelf[0]], [best_shelf[1]]
-
-        # Fallback: If no related shelves found, pick the best from all shelves
-        if not best_shelf:
-            cursor.execute("SELECT ID, Pos FROM SHELVES ORDER BY SpaceLeft DESC, Weight ASC")
-            best_shelf = cursor.fetchone()
-            if best_shelf:
-                return [best_shelf[0]], [best_shelf[1]]
-
-def Get_Product_Inventory_Records(product_id: str):
-    """
-    Fetches inventory records for a specific product from the TRANSACTIONS table.
+def Get_Product_Inventory_Records(product_id: str, start=None, end=None, max_points=None):
+    """
+    Fetches inventory records for a specific product from the TRANSACTIONS table, newest first.
+    On_Hand is the balance right after each transaction, computed in SQL by walking back from the
+    current PRODUCTS.OH with a running sum over the newer transactions.
     Args:
         product_id (str): The ID of the product to fetch inventory records for.
+        start (str, optional): Only return transactions at or after this time.
+        end (str, optional): Only return transactions at or before this time.
+        max_points (int, optional): Downsample to about this many records by keeping the lowest
+            and highest On_Hand record of each time bucket. None returns every record.
     Returns:
         list: A list of dictionaries containing inventory records for the product.
     """
-
-    with DBConnection() as db:
+    query = DB_Queries.Inventory_Records_Query(bool(start), bool(end), bool(max_points))
+    params = {"pid": product_id, "start": start, "end": end, "max_points": max_points, "buckets": max(int(max_points or 0) // 2, 1)}
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
-        cursor.execute(
-            """SELECT Time, Quantity_Added, Quantity_Removed, Operator_ID, Project_Name, Shelf_ID
-               FROM TRANSACTIONS
-               WHERE Product_ID = ?
-               ORDER BY Time DESC""",
-            (product_id,),
-        )
-        rows = cursor.fetchall()
-        records = []
-        cursor.execute(
-            """
-                SELECT OH FROM PRODUCTS WHERE ID = ?
-            """,
-            (product_id,)
-        )
-        oh = cursor.fetchone()
-        for row in rows:
-            records.append({
+        cursor.execute(query, params)
+        return [
+            {
                 "Time": row[0],
-                "On_Hand": oh[0] if len(records) == 0 else records[-1]["On_Hand"] - row[2] + row[1],
-                "Quantity_Added": row[1],
-                "Quantity_Removed": row[2],
-                "Operator_ID": row[3],
-                "Project_Name": row[4],
-                "Shelf_ID": row[5]
-            })
-        return records
+                "On_Hand": row[1],
+                "Quantity_Added": row[2],
+                "Quantity_Removed": row[3],
+                "Operator_ID": row[4],
+                "Project_Name": row[5],
+                "Shelf_ID": row[6]
+            }
+            for row in cursor.fetchall()
+        ]
 
 
 ### Transactions section
@@ -232,20 +757,211 @@ def Add_Transaction_db(ID, Product_ID, Shelf_ID, Time, Quantity_Added, Quantity_
             return e
         return True
 
+# Restock: add to the row, creating it if the product is not on the shelf yet
+STOCK_ADD = """INSERT INTO PRODUCTS_SHELVES (Shelf_ID, Product_ID, Quantity) VALUES (?, ?, ?)
+    ON CONFLICT (Shelf_ID, Product_ID) DO UPDATE SET Quantity = COALESCE(Quantity, 0) + excluded.Quantity
+    RETURNING Quantity"""
+# Dispense: take from the row only if enough is left, no row comes back otherwise
+STOCK_TAKE = """UPDATE PRODUCTS_SHELVES SET Quantity = Quantity + ?
+    WHERE Shelf_ID = ? AND Product_ID = ? AND Quantity + ? >= 0
+    RETURNING Quantity"""
+
+def Stock_Delta_Execute(cursor, Shelf_ID, Product_ID, Delta):
+    """
+    Runs the conditional STOCK_ADD/STOCK_TAKE statement for one change, inside the caller's transaction.
+    Returns:
+        int: The new quantity, or None if the shelf does not hold enough to dispense Delta.
+    """
+    if Delta >= 0:
+        cursor.execute(STOCK_ADD, (Shelf_ID, Product_ID, Delta))
+    else:
+        cursor.execute(STOCK_TAKE, (Delta, Shelf_ID, Product_ID, Delta))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def Stock_Operations_Apply_db(ID, rows, Time, Operator_ID, Project_Name=None, Source="Website"):
+    """
+    Applies a batch of stock changes in a single transaction.
+    Every row writes a TRANSACTIONS record, adjusts PRODUCTS_SHELVES in place with
+    Quantity = Quantity + delta, updates the shelf/product aggregates and adds a LOGS row.
+    Rows for the same shelf and product are merged before writing. Dispenses are conditional
+    like in Stock_Delta_Apply_db: if any shelf holds too little, nothing of the batch is applied.
+    Args:
+        ID (str): Transaction ID shared by all rows of the batch.
+        rows (list): A list of (Shelf_ID, Product_ID, Delta) tuples. Negative delta dispenses.
+        Time (datetime): Timestamp of the transaction.
+        Operator_ID (str): ID of the operator who performed the transaction.
+        Project_Name (str, optional): Project associated with the transaction.
+        Source (str, optional): Source of the operation, used in the log message.
+    Returns:
+        bool: True if the batch was applied successfully, otherwise an error message
+              (a ValueError if a shelf does not hold enough).
+    """
+    merged = {}
+    for Shelf_ID, Product_ID, Delta in rows:
+        merged[(Shelf_ID, Product_ID)] = merged.get((Shelf_ID, Product_ID), 0) + Delta
+    rows = [(Shelf_ID, Product_ID, Delta) for (Shelf_ID, Product_ID), Delta in merged.items()]
+    if not rows:
+        return True
+
+    with DBConnection() as db:
+        cursor = db.cursor()
+        try:
+            # Take the write lock up front, like Stock_Delta_Apply_db
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(
+                "INSERT OR REPLACE INTO TRANSACTIONS VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (ID, Product_ID, Project_Name, Shelf_ID, Time, max(Delta, 0), max(-Delta, 0), Operator_ID)
+                    for Shelf_ID, Product_ID, Delta in rows
+                ],
+            )
+            for Shelf_ID, Product_ID, Delta in rows:
+                if Stock_Delta_Execute(cursor, Shelf_ID, Product_ID, Delta) is None:
+                    db.rollback()
+                    return ValueError(f"Not enough of product {Product_ID} on shelf {Shelf_ID} to remove {-Delta}")
+            Aggregates_Apply_Delta(db, rows)
+            cursor.executemany(
+                "INSERT INTO LOGS (Level, Message, Source, Transaction_Type, Transaction_ID) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        "INFO",
+                        f"Product operation logged: ID={ID}, Product_ID={Product_ID}, Shelf_ID={Shelf_ID}, QTY_Added={max(Delta, 0)}, QTY_Removed={max(-Delta, 0)}, Operator_ID={Operator_ID}, Source={Source}, Project_Name={Project_Name}",
+                        "Server",
+                        "PRODUCT_OPERATION",
+                        ID,
+                    )
+                    for Shelf_ID, Product_ID, Delta in rows
+                ],
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            return e
+    catalog_cache.invalidate(*{("product", Product_ID) for _, Product_ID, _ in rows})
+    return True
+
+def Stock_Delta_Apply_db(ID, Shelf_ID, Product_ID, Delta, Time, Operator_ID, Project_Name=None):
+    """
+    Applies one stock change atomically and returns the new quantity on the shelf.
+    The quantity is changed by a single conditional statement (Quantity = Quantity + Delta), never
+    read and written back from Python, inside a BEGIN IMMEDIATE transaction that also writes the
+    TRANSACTIONS row and the aggregates. Concurrent changes from the website and the ESP32 on the
+    same shelf therefore all land, whatever order they run in, without any lock in Python.
+    Args:
+        ID (int): Transaction ID.
+        Shelf_ID (str): ID of the shelf.
+        Product_ID (str): ID of the product.
+        Delta (int): Quantity added, negative to dispense.
+        Time (datetime): Timestamp of the transaction.
+        Operator_ID (str): ID of the operator who performed the transaction.
+        Project_Name (str, optional): Project associated with the transaction.
+    Returns:
+        int: The quantity of the product on the shelf after the change, otherwise an error.
+             Dispensing more than the shelf holds returns a ValueError and changes nothing.
+    """
+    if Shelf_ID is None:
+        return ValueError(f"Unknown shelf for product {Product_ID}")
+
+    with DBConnection() as db:
+        cursor = db.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            New_Qty = Stock_Delta_Execute(cursor, Shelf_ID, Product_ID, Delta)
+            if New_Qty is None:
+                db.rollback()
+                return ValueError(f"Not enough of product {Product_ID} on shelf {Shelf_ID} to remove {-Delta}")
+            cursor.execute(
+                "INSERT OR REPLACE INTO TRANSACTIONS VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+                (ID, Product_ID, Project_Name, Shelf_ID, Time, max(Delta, 0), max(-Delta, 0), Operator_ID),
+            )
+            Aggregates_Apply_Delta(db, [(Shelf_ID, Product_ID, Delta)])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            return e
+    catalog_cache.invalidate(("product", Product_ID))
+    return New_Qty
+
+# Time-ordered ID allocator: milliseconds since EPOCH_MS | node | sequence.
+# IDs from one process are strictly increasing, so inserts keyed by them append to the end of
+# the TRANSACTIONS/LOGS indexes and an ID range is a time range (see ID_From_Time).
+# 41 + 4 + 8 bits keeps IDs below 2**53, so they survive JSON in the browser and int64 on the ESP32.
+class IDAllocator:
+    EPOCH_MS = 1735689600000  # 2025-01-01 00:00:00 UTC
+    NODE_BITS = 4
+    SEQUENCE_BITS = 8
+
+    def __init__(self, node=0):
+        """
+        Args:
+            node (int): Number of this process, 0-15. Processes minting IDs into the same
+                database need different nodes.
+        """
+        if not 0 <= node < (1 << self.NODE_BITS):
+            raise ValueError(f"node must be between 0 and {(1 << self.NODE_BITS) - 1}")
+        self.node = node
+        self.last_ms = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def next(self):
+        with self.lock:
+            now_ms = int(time.time() * 1000) - self.EPOCH_MS
+            if now_ms > self.last_ms:
+                self.last_ms = now_ms
+                self.sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting from the last ID
+                self.sequence += 1
+                if self.sequence >> self.SEQUENCE_BITS:
+                    self.last_ms += 1
+                    self.sequence = 0
+            return (
+                (self.last_ms << (self.NODE_BITS + self.SEQUENCE_BITS))
+                | (self.node << self.SEQUENCE_BITS)
+                | self.sequence
+            )
+
+id_allocator = IDAllocator()
+
+def ID_From_Time(Time):
+    """
+    Smallest ID that can be allocated at or after a time, for ID range queries.
+    Args:
+        Time (datetime): Aware datetime, or naive datetime in local time.
+    Returns:
+        int: The lower bound ID.
+    """
+    ms = int(Time.timestamp() * 1000) - IDAllocator.EPOCH_MS
+    return max(ms, 0) << (IDAllocator.NODE_BITS + IDAllocator.SEQUENCE_BITS)
+
+def ID_Time(ID):
+    """
+    Time an ID was allocated at.
+    Args:
+        ID (int): An ID from Transaction_ID_Generator.
+    Returns:
+        datetime: UTC datetime of the allocation.
+    """
+    ms = (int(ID) >> (IDAllocator.NODE_BITS + IDAllocator.SEQUENCE_BITS)) + IDAllocator.EPOCH_MS
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
 def Transaction_ID_Generator():
     """
     Generates a new unique transaction ID.
     Returns:
-        str: A new unique transaction ID.
+        int: A new unique, time-ordered transaction ID.
     """
-    import uuid
-    id = str(uuid.uuid4().hex)[:8]
-
-    return int(id, 16)
+    return id_allocator.next()
 
 def Products_Shelves_Update_db(Shelf_ID, Product_ID, Quantity):
     """
     Updates the quantity of a product on a shelf in the PRODUCTS_SHELVES table.
+    The shelf and product aggregates are adjusted by the change in quantity only,
+    so a single stock change touches one SHELVES row and one PRODUCTS row. The old quantity
+    is read under BEGIN IMMEDIATE, so a concurrent stock change cannot slip in between the
+    read and the write and leave the aggregates off by its delta.
     Args:
         Shelf_ID (str): ID of the shelf where the product is located.
         Product_ID (str): ID of the product to update.
@@ -256,17 +972,126 @@ def Products_Shelves_Update_db(Shelf_ID, Product_ID, Quantity):
     with DBConnection() as db:
         cursor = db.cursor()
         try:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                "SELECT Quantity FROM PRODUCTS_SHELVES WHERE Shelf_ID = ? AND Product_ID = ?",
+                (Shelf_ID, Product_ID),
+            )
+            Old_Qty = cursor.fetchone()
+            Delta = Quantity - (Old_Qty[0] if Old_Qty and Old_Qty[0] is not None else 0)
+
             cursor.execute(
                 "INSERT OR REPLACE INTO PRODUCTS_SHELVES VALUES(?, ?, ?)",
                 (Shelf_ID, Product_ID, Quantity),
             )
+            Aggregates_Apply_Delta(db, [(Shelf_ID, Product_ID, Delta)])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            return e
+    catalog_cache.invalidate(("product", Product_ID))
+    return True
+
+def Aggregates_Apply_Delta(db, rows):
+    """
+    Applies quantity changes to the SHELVES and PRODUCTS aggregates.
+    Only the shelves and products named in the rows are updated. The caller owns the
+    transaction, this function does not commit.
+    Args:
+        db (sqlite3.Connection): The database connection object.
+        rows (list): A list of (Shelf_ID, Product_ID, Delta) tuples.
+    Returns:
+        bool: True if the update was successful.
+    """
+    from shared_states import shelf_properties
+    shelf_area = shelf_properties['width'] * shelf_properties['depth']
+
+    rows = [(Shelf_ID, Product_ID, Delta) for Shelf_ID, Product_ID, Delta in rows if Delta]
+    if not rows:
+        return True
+
+    cursor = db.cursor()
+    cursor.executemany(
+        f"""UPDATE SHELVES
+           SET Quantity = COALESCE(Quantity, 0) + :Delta,
+               Weight = COALESCE(Weight, 0) + :Delta * COALESCE(
+                   (SELECT Weight FROM PRODUCTS WHERE ID = :Product_ID), 0),
+               SpaceLeft = COALESCE(SpaceLeft, 100) - :Delta * COALESCE(
+                   (SELECT Length * Width FROM PRODUCTS WHERE ID = :Product_ID), 0) / {shelf_area} * 100
+           WHERE ID = :Shelf_ID;""",
+        [{"Shelf_ID": s, "Product_ID": p, "Delta": d} for s, p, d in rows],
+    )
+    cursor.executemany(
+        "UPDATE PRODUCTS SET OH = COALESCE(OH, 0) + ? WHERE ID = ?",
+        [(d, p) for _, p, d in rows],
+    )
+    return True
+
+def Aggregates_Check(repair=False, tolerance=0.01):
+    """
+    Compares the stored SHELVES and PRODUCTS aggregates against PRODUCTS_SHELVES.
+    Args:
+        repair (bool): If True and a mismatch is found, rebuilds all aggregates.
+        tolerance (float): Allowed difference for the float columns (Weight, SpaceLeft).
+    Returns:
+        list: A list of dictionaries describing each mismatch. Empty if consistent.
+    """
+    from shared_states import shelf_properties
+    shelf_area = shelf_properties['width'] * shelf_properties['depth']
+
+    with DBConnection(read_only=True) as db:
+        cursor = db.cursor()
+        cursor.execute(
+            f"""SELECT SHELVES.ID, SHELVES.Quantity, SHELVES.Weight, SHELVES.SpaceLeft,
+                      COALESCE(SUM(PRODUCTS_SHELVES.Quantity), 0),
+                      COALESCE(SUM(PRODUCTS.Weight * PRODUCTS_SHELVES.Quantity), 0),
+                      100 - COALESCE(SUM(PRODUCTS.Length * PRODUCTS.Width * PRODUCTS_SHELVES.Quantity), 0) / {shelf_area} * 100,
+                      COUNT(PRODUCTS_SHELVES.Product_ID)
+               FROM SHELVES
+               LEFT JOIN PRODUCTS_SHELVES ON PRODUCTS_SHELVES.Shelf_ID = SHELVES.ID
+               LEFT JOIN PRODUCTS ON PRODUCTS.ID = PRODUCTS_SHELVES.Product_ID
+               GROUP BY SHELVES.ID"""
+        )
+        mismatches = []
+        for ID, Qty, Weight, SpaceLeft, Exp_Qty, Exp_Weight, Exp_SpaceLeft, Rows in cursor.fetchall():
+            checks = [("Quantity", Qty or 0, Exp_Qty, 0), ("Weight", Weight or 0, Exp_Weight, tolerance)]
+            if Rows:  # SpaceLeft is only maintained for shelves holding products
+                checks.append(("SpaceLeft", SpaceLeft, Exp_SpaceLeft, tolerance))
+            for column, stored, expected, tol in checks:
+                if stored is None or abs(stored - expected) > tol:
+                    mismatches.append({"table": "SHELVES", "ID": ID, "column": column, "stored": stored, "expected": expected})
+
+        cursor.execute(
+            """SELECT PRODUCTS.ID, PRODUCTS.OH, COALESCE(SUM(PRODUCTS_SHELVES.Quantity), 0)
+               FROM PRODUCTS
+               LEFT JOIN PRODUCTS_SHELVES ON PRODUCTS_SHELVES.Product_ID = PRODUCTS.ID
+               GROUP BY PRODUCTS.ID
+               HAVING COALESCE(PRODUCTS.OH, 0) != COALESCE(SUM(PRODUCTS_SHELVES.Quantity), 0)"""
+        )
+        for ID, OH, Expected in cursor.fetchall():
+            mismatches.append({"table": "PRODUCTS", "ID": ID, "column": "OH", "stored": OH, "expected": Expected})
+
+    if mismatches and repair:
+        Aggregates_Rebuild()
+    return mismatches
+
+def Aggregates_Rebuild():
+    """
+    Recomputes every SHELVES and PRODUCTS aggregate from PRODUCTS_SHELVES in one transaction.
+    Returns:
+        bool: True if the rebuild was successful, otherwise an error message.
+    """
+    with DBConnection() as db:
+        try:
             Shelves_qty_Update(db)
             Shelves_Weight_Update(db)
             Shelves_SpaceLeft_Update(db)
             Products_qty_Update(db)
             db.commit()
         except Exception as e:
+            db.rollback()
             return e
+    catalog_cache.clear()
     return True
 
 def Shelves_qty_Update(db):
@@ -274,6 +1099,7 @@ def Shelves_qty_Update(db):
     Updates the quantity of products on each shelf in the SHELVES table.
     This function calculates the total quantity of products on each shelf
     by summing the quantities from the PRODUCTS_SHELVES table.
+    Full-table recompute used by Aggregates_Rebuild, the caller commits.
     Args:
         db (sqlite3.Connection): The database connection object.
     Returns:
@@ -282,19 +1108,19 @@ def Shelves_qty_Update(db):
     cursor = db.cursor()
     cursor.execute(
         """UPDATE SHELVES
-           SET Quantity = (
+           SET Quantity = COALESCE((
                SELECT SUM(Quantity)
                FROM PRODUCTS_SHELVES
                WHERE PRODUCTS_SHELVES.Shelf_ID = SHELVES.ID
-           );"""
+           ), 0);"""
     )
-    db.commit()
     return True
 
 def Shelves_Weight_Update(db):
     """Updates the weight of products on each shelf in the SHELVES table.
     This function calculates the total weight of products on each shelf
     by summing the weights from the PRODUCTS_SHELVES table.
+    Full-table recompute used by Aggregates_Rebuild, the caller commits.
     Args:
         db (sqlite3.Connection): The database connection object.
     Returns:
@@ -303,18 +1129,18 @@ def Shelves_Weight_Update(db):
     cursor = db.cursor()
     cursor.execute(
         """UPDATE SHELVES
-           SET Weight = (
+           SET Weight = COALESCE((
                SELECT SUM(PRODUCTS.Weight * PRODUCTS_SHELVES.Quantity)
                FROM PRODUCTS_SHELVES
                JOIN PRODUCTS ON PRODUCTS_SHELVES.Product_ID = PRODUCTS.ID
                WHERE PRODUCTS_SHELVES.Shelf_ID = SHELVES.ID
-           );"""
+           ), 0);"""
     )
-    db.commit()
     return True
 
 def Shelves_SpaceLeft_Update(db):
     """Updates the space left on each shelf in the SHELVES table.
+    Full-table recompute used by Aggregates_Rebuild, the caller commits.
     Args:
         db (sqlite3.Connection): The database connection object.
     Returns:
@@ -338,7 +1164,6 @@ def Shelves_SpaceLeft_Update(db):
                    SELECT Shelf_ID FROM PRODUCTS_SHELVES
                );"""  # Only update shelves with products
         )
-        db.commit()
         return True
     except KeyError as e:
         return f"Missing shelf property: {e}"
@@ -349,6 +1174,7 @@ def Products_qty_Update(db):
     """Updates the on-hand (OH) quantity of products in the PRODUCTS table.
     This function calculates the total on-hand quantity of each product
     by summing the quantities from the PRODUCTS_SHELVES table.
+    Full-table recompute used by Aggregates_Rebuild, the caller commits.
     Args:
         db (sqlite3.Connection): The database connection object.
     Returns:
@@ -357,13 +1183,12 @@ def Products_qty_Update(db):
     cursor = db.cursor()
     cursor.execute(
         """UPDATE PRODUCTS
-           SET OH = (
+           SET OH = COALESCE((
                SELECT SUM(Quantity)
                FROM PRODUCTS_SHELVES
                WHERE PRODUCTS_SHELVES.Product_ID = PRODUCTS.ID
-           );"""
+           ), 0);"""
     )
-    db.commit()
     return True
 
  
@@ -391,7 +1216,8 @@ def Shelves_DB_Add(ID, Pos, Weight=0, Quantity=0, SpaceLeft=100, RacksAvailable=
         except Exception as e:
             return e
 
-        return True
+    shelf_registry.set(ID, Pos)
+    return True
 
 def Shelves_DB_Pos_Update(ID, Pos):
     """Updates the position of a shelf in the SHELVES table.
@@ -405,11 +1231,14 @@ def Shelves_DB_Pos_Update(ID, Pos):
         cursor = db.cursor()
         try:
             cursor.execute("UPDATE SHELVES SET Pos = ? WHERE ID = ?", (Pos, ID))
+            Updated = cursor.rowcount
             db.commit()
         except Exception as e:
             return e
-        else:
-            return True
+
+    if Updated:
+        shelf_registry.set(ID, Pos)
+    return True
 
 def Shelves_DB_Pos_Get(ID):
     """Gets the position of a shelf from the SHELVES table.
@@ -418,31 +1247,43 @@ def Shelves_DB_Pos_Get(ID):
     Returns:
         str: Position of the shelf if found, otherwise None.
     """
-    with DBConnection() as db:
+    Pos = shelf_registry.position(ID)
+    if Pos is not None:
+        return Pos
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
         try:
             cursor.execute("SELECT Pos FROM SHELVES WHERE ID = ?", (ID,))
             Pos = cursor.fetchone()
-            return Pos[0] if Pos else None
         except Exception as e:
             return e
+    if Pos:
+        shelf_registry.set(ID, Pos[0])
+    return Pos[0] if Pos else None
 
 
 def Shelf_ID_From_Position(Pos):
-    """Gets the shelf ID from its position in the SHELVES table.
+    """Gets the shelf ID from its position.
+    Answered from shelf_registry, the SHELVES table is only read for a position the registry
+    does not know (e.g. a shelf added by another process).
     Args:
         Pos (str): Position of the shelf.
     Returns:
         str: ID of the shelf if found, otherwise None.
     """
-    with DBConnection() as db:
+    Shelf_ID = shelf_registry.shelf_id(Pos)
+    if Shelf_ID is not None:
+        return Shelf_ID
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
         try:
-            cursor.execute("SELECT ID FROM SHELVES WHERE Pos = ?", (Pos,))
+            cursor.execute(DB_Queries.SHELF_ID_FROM_POSITION, (Pos,))
             Shelf_ID = cursor.fetchone()
-            return Shelf_ID[0] if Shelf_ID else None
         except Exception as e:
             return e
+    if Shelf_ID:
+        shelf_registry.set(Shelf_ID[0], Pos)
+    return Shelf_ID[0] if Shelf_ID else None
 
 
 ###### ADDING NEW PRODUCTS INTO DB:
@@ -466,6 +1307,8 @@ def Products_DB_Add(ID, Name, Description, Family_Name, Family_Item, Weight, ROP
     with DBConnection() as db:  
         cursor = db.cursor()
         try:
+            cursor.execute("SELECT Family_Name FROM PRODUCTS WHERE ID = ?", (ID,))
+            Old_Family = cursor.fetchone()
             cursor.execute(
                 "INSERT OR REPLACE INTO PRODUCTS VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 (ID, Name, Description, Family_Name, Family_Item, Weight, ROP, OH, Length, Width, Height),
@@ -473,6 +1316,10 @@ def Products_DB_Add(ID, Name, Description, Family_Name, Family_Item, Weight, ROP
             db.commit()
         except Exception as e:
             return e
+    tags = [("product", ID), ("family", Family_Name), ("families",)]
+    if Old_Family:
+        tags.append(("family", Old_Family[0]))
+    catalog_cache.invalidate(*tags)
     return True
 
 def TAGS_DB_Add(row):
@@ -489,6 +1336,7 @@ def TAGS_DB_Add(row):
             db.commit()
         except Exception as e:
             return e
+    catalog_cache.invalidate(*{("product", Product_ID) for Product_ID, _ in row})
     return True
 
 def Projects_DB_Add(row):
@@ -505,6 +1353,11 @@ def Projects_DB_Add(row):
             db.commit()
         except Exception as e:
             return e
+    tags = {("projects",)}
+    for Product_ID, Project in row:
+        tags.add(("product_projects", Product_ID))
+        tags.add(("project", Project))
+    catalog_cache.invalidate(*tags)
     return True
 
 def Products_Data_Read(Product_ID):
@@ -519,13 +1372,18 @@ def Products_Data_Read(Product_ID):
               Family_Name, Family_Item, Weight, ROP (Reorder Point), and OH (On-Hand quantity).
         None: If the product is not found.
     """
-    with DBConnection() as db:
+    key = ("product", Product_ID)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
+    with DBConnection(read_only=True) as db:
         try:    
             cursor = db.cursor()
-            cursor.execute("SELECT * FROM PRODUCTS WHERE ID = ?", (Product_ID,))
+            cursor.execute(DB_Queries.PRODUCT_READ, (Product_ID,))
             row = cursor.fetchone()
             if row:
-                return {
+                product = {
                     "ID": row[0],
                     "Name": row[1],
                     "Description": row[2],
@@ -536,61 +1394,80 @@ def Products_Data_Read(Product_ID):
                     "OH": row[7]
                 }
             else:
-                return None
+                product = None
         except Exception as e:
             print(str(e))
+            return None
+    catalog_cache.set(key, product, generation=generation)
+    return product
 
 def Family_Products_Search(Family):
     """
     Reads all unique family names from the PRODUCTS table.
     Returns a list of family names and a dictionary of product IDs.
     """
-    with DBConnection() as db:
+    key = ("family_products", Family)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
+    with DBConnection(read_only=True) as db:
         try:
             cursor = db.cursor()
-            data = cursor.execute("SELECT ID, Family_Item FROM PRODUCTS WHERE Family_Name = ?;", (Family,))
+            data = cursor.execute(DB_Queries.FAMILY_PRODUCTS, (Family,))
             rows = data.fetchall()
             if not rows:
-                return None, None
-            else:
-                return rows
+                rows = (None, None)
         
         except Exception as e:
             print(str(e))
+            return None
+    catalog_cache.set(key, rows, tags=[("family", Family)], generation=generation)
+    return rows
 
 def Unique_Family_Products_Get():
     """
     Reads all unique family names from the PRODUCTS table.
     Returns a list of family names.
     """
+    key = ("families",)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
     try:
-        with DBConnection() as db_conn:
+        with DBConnection(read_only=True) as db_conn:
             cursor = db_conn.cursor()
             cursor.execute("SELECT DISTINCT Family_Name FROM PRODUCTS ORDER BY Family_Name")
             family_names = [row[0] for row in cursor.fetchall()]
-            return family_names
     except Exception as e:
         print(str(e))
+        return None
+    catalog_cache.set(key, family_names, generation=generation)
+    return family_names
 
-def Home_Page_Families_Get(family_names):
+def Families_First_Product_Get():
     """
-    Reads product IDs and thumbnails for the given family names.
-    Returns a list of thumbnails and IDs.
-    """
-    with DBConnection() as db:
+    Reads every family name with the first product (lowest ID) of that family, in one grouped query.
+    Used for the home page, replacing a query per family (DB_Bench keeps that loop as a baseline).
+
+    Returns:
+        tuple: (family_names, thumbnails, product_ids), aligned and ordered by family name.
+    """
+    key = ("families_first",)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
-        Thumbnails = []
-        IDs = []
-        for family in family_names:
-            cursor.execute("SELECT ID FROM PRODUCTS WHERE Family_Name = ? LIMIT 1", (family,))
-            product_id = cursor.fetchone()
-            if product_id:
-                Thumbnails.append(f"DB/Product_Pics/{product_id[0]}/Thumb.jpg")
-                IDs.append(product_id[0])
-            else:
-                Thumbnails.append(None)
-                IDs.append(None)
-        return Thumbnails, IDs
+        cursor.execute(DB_Queries.FAMILIES_FIRST_PRODUCT)
+        rows = cursor.fetchall()
+    Family_names = [row[0] for row in rows]
+    IDs = [row[1] for row in rows]
+    Thumbnails = [f"DB/Product_Pics/{product_id}/Thumb.jpg" for product_id in IDs]
+    catalog_cache.set(key, (Family_names, Thumbnails, IDs), tags=[("families",)], generation=generation)
+    return Family_names, Thumbnails, IDs
 
 def Products_Family_Search(text):
     """
@@ -604,7 +1481,7 @@ def Products_Family_Search(text):
         list: A list of family names that start with the given text.
     """
     try:
-        with DBConnection() as db_conn:
+        with DBConnection(read_only=True) as db_conn:
             cursor = db_conn.cursor()
             text = f"%{text}%"
             cursor.execute("SELECT DISTINCT Family_Name FROM PRODUCTS WHERE Family_Name LIKE ? ORDER BY Family_Name", (text,))
@@ -627,7 +1504,7 @@ def Products_Projects_Search(text):
         list: A list of project names that start with the given text.
     """
     try:
-        with DBConnection() as db_conn:
+        with DBConnection(read_only=True) as db_conn:
             cursor = db_conn.cursor()
             text = f"%{text}%"
             cursor.execute("SELECT DISTINCT Project FROM PRODUCT_PROJECTS WHERE Project LIKE ? ORDER BY Project", (text,))
@@ -648,17 +1525,22 @@ def Product_Projects_Get(Product_ID):
         list: A list of projects associated with the product.
         None: If no projects are found for the product.
     """
+    key = ("product_projects", Product_ID)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
-            cursor.execute("SELECT Project FROM PRODUCT_PROJECTS WHERE Product_ID = ?", (Product_ID,))
+            cursor.execute(DB_Queries.PRODUCT_PROJECTS, (Product_ID,))
             rows = cursor.fetchall()
-            if rows:
-                return [row[0] for row in rows]
-            else:
-                return None
+            projects = [row[0] for row in rows] if rows else None
     except Exception as e:
         print(str(e))
+        return None
+    catalog_cache.set(key, projects, generation=generation)
+    return projects
 
 def Products_Project_Search(Project):
     """
@@ -672,9 +1554,9 @@ def Products_Project_Search(Project):
         None: If no products are found for the project.
     """
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
-            cursor.execute("SELECT Product_ID FROM PRODUCT_PROJECTS WHERE Project = ?", (Project,))
+            cursor.execute(DB_Queries.PROJECT_PRODUCT_IDS, (Project,))
             IDs = cursor.fetchall()
             if IDs:
                 return [row[0] for row in IDs]
@@ -684,19 +1566,63 @@ def Products_Project_Search(Project):
         print(str(e))
 
 
+def Project_Products_Get(Project):
+    """
+    Reads the details of all products associated with a project, in one query.
+    Used for the project page, replacing Products_Project_Search + Products_Data_Read per product.
+
+    Args:
+        Project (str): The name of the project.
+    Returns:
+        list: A list of product dictionaries in the same shape as Products_Data_Read, ordered by ID.
+    """
+    key = ("project_products", Project)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
+    with DBConnection(read_only=True) as db:
+        cursor = db.cursor()
+        cursor.execute(DB_Queries.PROJECT_PRODUCTS, (Project,))
+        rows = cursor.fetchall()
+    products = [
+        {
+            "ID": row[0],
+            "Name": row[1],
+            "Description": row[2],
+            "Family_Name": row[3],
+            "Family_Item": row[4],
+            "Weight": row[5],
+            "ROP": row[6],
+            "OH": row[7]
+        }
+        for row in rows
+    ]
+    tags = [("project", Project)] + [("product", product["ID"]) for product in products]
+    catalog_cache.set(key, products, tags=tags, generation=generation)
+    return products
+
+
 def Get_Unique_Projects():
     """
     Fetches all unique project names from the PRODUCT_PROJECTS table.
     Returns a list of project names.
     """
+    key = ("projects",)
+    cached = catalog_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = catalog_cache.generation
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
             cursor.execute("SELECT DISTINCT Project FROM PRODUCT_PROJECTS ORDER BY Project")
             projects = [row[0] for row in cursor.fetchall()]
-            return projects if projects else []
     except Exception as e:
         print(str(e))
+        return None
+    catalog_cache.set(key, projects, generation=generation)
+    return projects
 
 def Get_Products():
     """
@@ -710,7 +1636,7 @@ def Get_Products():
         - Height
     """
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
             cursor.execute("SELECT ID, Name, Weight, Length, Width, Height FROM PRODUCTS ORDER BY ID")
             
@@ -735,7 +1661,7 @@ def Get_Products_Projects():
     Returns a dictionary of product IDs and their associated project names.
     """
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
             cursor.execute("SELECT Project, Product_ID FROM PRODUCT_PROJECTS")
             projects = cursor.fetchall()
@@ -756,7 +1682,7 @@ def Operators_Exist():
     Returns:
         bool: True if operators exist, False otherwise.
     """
-    with DBConnection() as db:
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
     
         cursor.execute("SELECT 1 FROM OPERATORS LIMIT 1")
@@ -785,6 +1711,8 @@ def Operator_Add(ID, Name, Username, Passw, Access_Level=1):
             db.commit()
     except Exception as e:
         return e
+    finally:
+        operator_cache.invalidate(("operator", str(ID)))
 
 
 def Operator_Login(Username):
@@ -797,11 +1725,11 @@ def Operator_Login(Username):
     Raises:
         Exception: If the username is not found in the database.
     """
-    with DBConnection() as db:
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
     
         cursor.execute(
-            "SELECT Name, Password, Password_Salt, Access_Level FROM OPERATORS WHERE Username = ?", (Username,)
+            DB_Queries.OPERATOR_LOGIN, (Username,)
         )
         result = cursor.fetchone()
         if result:
@@ -809,9 +1737,13 @@ def Operator_Login(Username):
         else:
             raise Exception("Username not found")
 
+# Operator directory for the ESP32 keypad login (websocket code 120), keyed by work ID.
+# Unknown IDs are cached too, Operator_Add drops the entry for the ID it adds.
+operator_cache = CatalogCache(max_entries=1024, default_ttl=600.0)
+
 def Operator_ID_Query(ID):
     """
-    Queries the OPERATORS table for the given operator ID.
+    Queries the OPERATORS table for the given operator ID, reading through operator_cache.
     Args:
         ID (str): The operator ID to query.
     Returns:
@@ -819,23 +1751,118 @@ def Operator_ID_Query(ID):
     Raises:
         Exception: If the operator ID is not found in the database.
     """
+    key = ("operator", str(ID))
+    cached = operator_cache.get(key)
+    if cached is not CatalogCache.MISSING:
+        return cached
+    generation = operator_cache.generation
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
         
             cursor.execute(
-                "SELECT Name, Username FROM OPERATORS WHERE ID = ?", (ID,)
+                DB_Queries.OPERATOR_BY_ID, (ID,)
             )
             result = cursor.fetchone()
-
-            if result:
-                return result[0], result[1]
-            else:
-                return None
-                # raise Exception("Operator ID not found")
-                
     except Exception as e:
         return str(e)
+    result = (result[0], result[1]) if result else None
+    operator_cache.set(key, result, generation=generation)
+    return result
+
+def Operator_ID_Cached(ID):
+    """
+    Looks up an operator ID in operator_cache only, never touching the database.
+    Args:
+        ID (str): The operator ID to look up.
+    Returns:
+        tuple: (Name, Username), None for an ID known not to exist, or CatalogCache.MISSING.
+    """
+    return operator_cache.get(("operator", str(ID)))
+
+def Operators_Cache_Load():
+    """
+    Warms operator_cache with every operator (up to its size bound), so keypad logins
+    after startup are answered from memory.
+    """
+    generation = operator_cache.generation
+    with DBConnection(read_only=True) as db:
+        rows = db.execute(
+            "SELECT ID, Name, Username FROM OPERATORS LIMIT ?", (operator_cache.max_entries,)
+        ).fetchall()
+    for ID, Name, Username in rows:
+        operator_cache.set(("operator", str(ID)), (Name, Username), generation=generation)
+
+# Bounded worker pool for bcrypt, so a burst of logins cannot occupy every request thread.
+# At most workers hashes run at once and at most max_pending wait; past that, callers are
+# turned away with a TimeoutError instead of queueing behind the burst.
+class PasswordHasher:
+    def __init__(self, workers=2, max_pending=16, rounds=12, timeout=10.0):
+        """
+        Args:
+            workers (int): Number of hashes computed in parallel.
+            max_pending (int): Maximum number of hashes running or waiting.
+            rounds (int): bcrypt cost factor for new password hashes. Existing hashes keep
+                the cost stored in their salt.
+            timeout (float): Seconds a caller waits for its hash.
+        """
+        self.rounds = rounds
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="PasswordHasher")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.counters = {"hashed": 0, "rejected": 0, "timed_out": 0, "hash_ms_total": 0.0, "hash_ms_max": 0.0, "wait_ms_total": 0.0}
+
+    def run(self, fn, *args):
+        """Runs fn(*args) on the pool and returns its result. Raises TimeoutError when busy.
+        The slot is held until the hash finishes, not until the caller stops waiting, so hashes
+        left running after a timeout still count against max_pending.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.counters["rejected"] += 1
+            raise TimeoutError("Password hasher busy")
+        queued = time.perf_counter()
+        try:
+            future = self.executor.submit(self._timed, fn, queued, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            with self.lock:
+                self.counters["timed_out"] += 1
+            raise TimeoutError("Password hash timed out") from None
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        hashed = stats["hashed"]
+        stats["hash_ms_avg"] = round(stats["hash_ms_total"] / hashed, 2) if hashed else None
+        stats["wait_ms_avg"] = round(stats["wait_ms_total"] / hashed, 2) if hashed else None
+        stats["rounds"] = self.rounds
+        return stats
+
+    def _timed(self, fn, queued, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            hash_ms = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.counters["hashed"] += 1
+                self.counters["hash_ms_total"] += hash_ms
+                self.counters["hash_ms_max"] = max(self.counters["hash_ms_max"], hash_ms)
+                self.counters["wait_ms_total"] += (started - queued) * 1000
+
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get("VLM_HASH_WORKERS", 2)),
+    max_pending=int(os.environ.get("VLM_HASH_MAX_PENDING", 16)),
+    rounds=int(os.environ.get("VLM_BCRYPT_ROUNDS", 12)),
+    timeout=float(os.environ.get("VLM_HASH_TIMEOUT_S", 10.0)),
+)
 
 def Passw_Hasher(Passw: str):
     """
@@ -846,7 +1873,7 @@ def Passw_Hasher(Passw: str):
         tuple: A tuple containing the hashed password and the salt used for hashing.
     """
 
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=password_hasher.rounds)
     hashed = bcrypt.hashpw(Passw.encode("utf-8"), salt).decode("utf-8")
     return hashed, salt.decode("utf-8")
 
@@ -862,6 +1889,14 @@ def Passw_Salter(data: str, salt: str):
     new = bcrypt.hashpw(data.encode("utf-8"), salt.encode("utf-8")).decode("utf-8")
     return new
 
+def Passw_Salter_Pooled(data: str, salt: str):
+    """
+    Passw_Salter run on password_hasher, used by web login.
+    Raises:
+        TimeoutError: If the hasher queue is full or the hash takes longer than its timeout.
+    """
+    return password_hasher.run(Passw_Salter, data, salt)
+
 ### VLM Configuration Logging
 def VLM_Update_Configuration(normal_speed,
                         approach_speed,
@@ -915,7 +1950,7 @@ def VLM_Get_Configuration():
         or None if not found / on error.
     """
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
             cursor.execute('SELECT Normal_Speed, Approach_Speed, Steps_Per_Floor, Stop_Pulse, For_Pulse, Back_Pulse, Collect_Time, Return_Time, hall_N_thresh, hall_S_thresh, Last_Updated FROM VLM_CONFIG LIMIT 1')
             row = cursor.fetchone()
@@ -939,79 +1974,492 @@ def VLM_Get_Configuration():
         return None
 
 
-def Get_Logs(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None, limit=50, offset=0):
-    """Query logs with optional filters and pagination.
-    Returns: (rows, total_count)
+# Cached LOGS totals per filter set: key -> (total, refreshed_at), least recently used first.
+# Counts run on one background worker; when LOG_TOTALS_MAX_PENDING counts are already waiting,
+# new filter sets get no total instead of queueing more work.
+LOG_TOTAL_TTL = 30.0
+LOG_TOTALS_MAX = 256
+LOG_TOTALS_MAX_PENDING = 8
+log_totals = OrderedDict()
+log_totals_refreshing = set()
+log_totals_lock = threading.Lock()
+log_totals_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="LogTotals")
+logs_fts_available = None  # set on first use by Logs_FTS_Available
+
+def Logs_FTS_Available():
+    """Returns True if the LOGS_FTS full-text index exists (see DB_Create migration 3)."""
+    global logs_fts_available
+    if logs_fts_available is None:
+        with DBConnection(read_only=True) as db:
+            logs_fts_available = db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'LOGS_FTS'"
+            ).fetchone() is not None
+    return logs_fts_available
+
+def Logs_Where(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None):
+    """DB_Queries.Logs_Where, searching q in LOGS_FTS when this database has it.
+    Returns: (from_sql, where, params)
+    """
+    fts = bool(q) and Logs_FTS_Available()
+    return DB_Queries.Logs_Where(level, source, transaction_type, transaction_id, q, start, end, fts=fts)
+
+def Logs_Cursor_Encode(key, ID):
+    """Encodes the sort key (Timestamp or search rank) and ID of the last row of a page into an opaque cursor string."""
+    return base64.urlsafe_b64encode(json.dumps([key, ID]).encode("utf-8")).decode("ascii")
+
+def Logs_Cursor_Decode(cursor):
+    """Decodes a cursor made by Logs_Cursor_Encode.
+    Raises:
+        ValueError: If the cursor is malformed.
     """
-    with DBConnection() as db:
-        cursor = db.cursor()
-        where = []
-        params = []
-        if level:
-            where.append("Level = ?")
-            params.append(level)
-        if source:
-            where.append("Source = ?")
-            params.append(source)
-        if transaction_type:
-            where.append("Transaction_Type = ?")
-            params.append(transaction_type)
-        if transaction_id:
-            where.append("Transaction_ID = ?")
-            params.append(transaction_id)
-        if q:
-            where.append("Message LIKE ?")
-            params.append(f"%{q}%")
-        if start:
-            where.append("Timestamp >= ?")
-            params.append(start)
-        if end:
-            where.append("Timestamp <= ?")
-            params.append(end)
-
-        where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-
-        # total count
-        count_q = f"SELECT COUNT(*) FROM LOGS {where_sql}"
-        cursor.execute(count_q, params)
-        total = cursor.fetchone()[0]
-
-        q_str = f"SELECT ID, Timestamp, Transaction_Type, Transaction_ID, Level, Source, Message FROM LOGS {where_sql} ORDER BY Timestamp DESC LIMIT ? OFFSET ?"
-        cursor.execute(q_str, params + [limit, offset])
-        rows = cursor.fetchall()
-        # convert to list of dicts
-        logs = []
-        for r in rows:
-            logs.append({
-                'id': r[0],
-                'timestamp': r[1],
-                'transaction_type': r[2],
-                'transaction_id': r[3],
-                'level': r[4],
-                'source': r[5],
-                'message': r[6]
-            })
-        return logs, total
+    try:
+        key, ID = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(key, (str, int, float)):
+            raise ValueError
+        return key, int(ID)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def Refresh_Log_Total(key, from_sql, where_sql, params):
+    """Counts the LOGS rows matching a filter set and stores it in log_totals."""
+    try:
+        with DBConnection(read_only=True) as db:
+            total = db.execute(f"SELECT COUNT(*) FROM {from_sql} {where_sql}", params).fetchone()[0]
+        with log_totals_lock:
+            log_totals[key] = (total, time.monotonic())
+            log_totals.move_to_end(key)
+            while len(log_totals) > LOG_TOTALS_MAX:
+                log_totals.popitem(last=False)
+    except Exception as e:
+        print(f"Log total refresh failed: {e}")
+    finally:
+        with log_totals_lock:
+            log_totals_refreshing.discard(key)
+
+def Get_Logs_Total(from_sql, where, params):
+    """Returns the cached total for a filter set and refreshes it in the background when stale.
+    Without filters the total is read from LOGS_COUNT, which triggers keep exact through inserts
+    and retention deletes.
+    Returns: (total, is_estimate). total is None until the first background count finishes.
+    """
+    if not where:
+        with DBConnection(read_only=True) as db:
+            row = db.execute("SELECT Total FROM LOGS_COUNT WHERE ID = 1").fetchone()
+        return (row[0] if row else 0), False
+
+    key = (from_sql, tuple(where), tuple(params))
+    with log_totals_lock:
+        cached = log_totals.get(key)
+        if cached is not None:
+            log_totals.move_to_end(key)
+        stale = cached is None or time.monotonic() - cached[1] > LOG_TOTAL_TTL
+        if stale and key not in log_totals_refreshing and len(log_totals_refreshing) < LOG_TOTALS_MAX_PENDING:
+            log_totals_refreshing.add(key)
+            where_sql = "WHERE " + " AND ".join(where)
+            log_totals_executor.submit(Refresh_Log_Total, key, from_sql, where_sql, params)
+    return (cached[0] if cached else None), True
+
+def Get_Logs(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None, limit=50, offset=0, cursor=None, sort="time", include_archive=False):
+    """Query logs with optional filters.
+    Pages are keyed on (Timestamp, ID), or (rank, ID) when sorting by relevance: pass the
+    next_cursor of the previous page as cursor to get the following page in constant time.
+    offset is only used when no cursor is given.
+    q is a full-text search over the message (every word, prefix matched). Matching rows get a
+    'snippet' with the hits wrapped in \x02 ... \x03 markers.
+    sort: "time" (newest first) or "relevance" (best match first, only with q). A full-text search
+        sorted by time is read in descending ID (insertion) order straight from the index, so a broad
+        q stops after one page instead of sorting every match by Timestamp.
+    include_archive: also search the archives written by Logs_Prune and merge them into the page
+        by (Timestamp, ID), which a full-text search then sorts by as well (archived rows are marked
+        'archived'). Only with sort "time".
+    Returns: (rows, total_count, next_cursor)
+        total_count is the exact LOGS count without filters, otherwise a cached count (None while it is being computed).
+        next_cursor is None on the last page.
+    """
+    from_sql, where, params = Logs_Where(level, source, transaction_type, transaction_id, q, start, end)
+    total, _ = Get_Logs_Total(from_sql, where, params)
+
+    fts = from_sql != "LOGS"
+    by_rank = fts and sort == "relevance"
+    # archived rows only merge in on the (Timestamp, ID) order and cursor
+    with_archive = include_archive and not by_rank
+    before = None
+    page_params = list(params)
+    if cursor:
+        before = Logs_Cursor_Decode(cursor)
+        page_params.extend([before[1]] if fts and not by_rank and not with_archive else list(before))
+        offset = 0
+    fetch, skip = limit + 1, offset
+    if with_archive:
+        # the offset counts merged rows, so it is skipped after the merge
+        fetch, skip = offset + limit + 1, 0
+
+    with DBConnection(read_only=True) as db:
+        q_str = DB_Queries.Logs_Page_Query(from_sql, where, by_rank, bool(cursor), by_timestamp=with_archive)
+        rows = db.execute(q_str, page_params + [fetch, skip]).fetchall()
+
+    # convert to list of dicts
+    keys = [r[8] for r in rows]
+    logs = []
+    for r in rows:
+        log = {
+            'id': r[0],
+            'timestamp': r[1],
+            'transaction_type': r[2],
+            'transaction_id': r[3],
+            'level': r[4],
+            'source': r[5],
+            'message': r[6]
+        }
+        if fts:
+            log['snippet'] = r[7]
+        logs.append(log)
+
+    if with_archive:
+        # Both sources hold their first fetch rows after the cursor in the same (Timestamp, ID) order,
+        # so the first fetch rows of the merge are the page, the skipped offset and the row that tells
+        # whether a page follows. A row still live after a failed prune commit is also in the archive,
+        # the live one is kept.
+        archived = Search_Log_Archives(level, source, transaction_type, transaction_id, q, start, end,
+                                       limit=fetch, before=before)
+        live = {log['id'] for log in logs}
+        archived = [log for log in archived if log['id'] not in live]
+        logs = sorted(logs + archived, key=lambda log: (log['timestamp'], log['id']), reverse=True)[offset:fetch]
+        keys = [log['timestamp'] for log in logs]
+
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = Logs_Cursor_Encode(keys[limit - 1], logs[-1]['id'])
+    return logs, total, next_cursor
 
 
 def Get_Log_Selectors():
-    """Return distinct values for Level, Source, Transaction_Type to populate filters."""
-    with DBConnection() as db:
+    """Return known values for Level, Source, Transaction_Type to populate filters.
+    Read from the LOG_SELECTORS dictionary, which a trigger keeps up to date on every LOGS insert.
+    """
+    with DBConnection(read_only=True) as db:
         cursor = db.cursor()
-        cursor.execute("SELECT DISTINCT Level FROM LOGS")
-        levels = [r[0] for r in cursor.fetchall() if r[0]]
-        cursor.execute("SELECT DISTINCT Source FROM LOGS")
-        sources = [r[0] for r in cursor.fetchall() if r[0]]
-        cursor.execute("SELECT DISTINCT Transaction_Type FROM LOGS")
-        types = [r[0] for r in cursor.fetchall() if r[0]]
-        return {'levels': levels, 'sources': sources, 'transaction_types': types}
-
+        cursor.execute("SELECT Kind, Value FROM LOG_SELECTORS ORDER BY Kind, Value")
+        selectors = {'Level': [], 'Source': [], 'Transaction_Type': []}
+        for kind, value in cursor.fetchall():
+            if kind in selectors:
+                selectors[kind].append(value)
+        return {'levels': selectors['Level'], 'sources': selectors['Source'], 'transaction_types': selectors['Transaction_Type']}
+
+
+
+###### LOG RETENTION
+# Days a row stays in LOGS before Logs_Prune moves it to the archive.
+# A Transaction_Type rule wins over a Level rule, which wins over the default. None keeps rows forever.
+LOG_RETENTION = {
+    "default": 90,
+    "Level": {"ERROR": 365, "WARNING": 180},
+    "Transaction_Type": {
+        "WEBSOCKET_MESSAGE": 14,
+        "AUTO_HALL_SENSOR_READING": 7,
+        "MANUAL_HALL_SENSOR_READING": 30,
+        "PRODUCT_OPERATION": None,
+        "PRODUCT_OPERATION_VLM": None,
+    },
+}
+# One gzip NDJSON file per UTC day of Timestamp: LOGS-YYYY-MM-DD.ndjson.gz
+LOG_ARCHIVE_DIR = "DB/Logs_Archive"
+LOG_ARCHIVE_KEYS = ('id', 'timestamp', 'transaction_type', 'transaction_id', 'level', 'source', 'message')
+log_retention_last = {}  # result of the last Logs_Prune run, for /debug/log_retention
+
+def Logs_Retention_Where(retention=None, now=None):
+    """Builds the WHERE clause matching every LOGS row past its retention.
+    Returns: (where_sql, params)
+    """
+    retention = retention or LOG_RETENTION
+    now = now or datetime.now(timezone.utc)
+
+    def cutoff(days):
+        # '' sorts before every timestamp, so nothing is older than it
+        return "" if days is None else (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    expr = "?"
+    params = [cutoff(retention.get("default"))]
+    newest = params[0]
+    for column in ("Level", "Transaction_Type"):
+        rules = retention.get(column) or {}
+        if not rules:
+            continue
+        whens = []
+        when_params = []
+        for value, days in rules.items():
+            whens.append("WHEN ? THEN ?")
+            when_params.extend([value, cutoff(days)])
+            newest = max(newest, cutoff(days))
+        expr = f"CASE {column} {' '.join(whens)} ELSE {expr} END"
+        params = when_params + params
+    # The plain Timestamp bound lets the delete batches range scan IDX_LOGS_TIMESTAMP
+    return f"Timestamp < ? AND Timestamp < ({expr})", [newest] + params
+
+def Logs_Archive_Write(rows, archive_dir=None):
+    """Appends LOGS rows (in LOG_ARCHIVE_KEYS order) to their daily archive files.
+    archive_dir defaults to LOG_ARCHIVE_DIR.
+    Returns: list of the files written.
+    """
+    archive_dir = archive_dir or LOG_ARCHIVE_DIR
+    os.makedirs(archive_dir, exist_ok=True)
+    by_day = {}
+    for row in rows:
+        by_day.setdefault(str(row[1])[:10], []).append(row)
+    paths = []
+    for day, day_rows in by_day.items():
+        path = os.path.join(archive_dir, f"LOGS-{day}.ndjson.gz")
+        # Appending adds a gzip member, readers see one continuous stream
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in day_rows:
+                f.write(json.dumps(dict(zip(LOG_ARCHIVE_KEYS, row)), ensure_ascii=False) + "\n")
+        paths.append(path)
+    return paths
+
+def Logs_Prune(retention=None, batch_size=1000, pause=0.05, archive=True, archive_dir=None, max_batches=None):
+    """Moves LOGS rows past their retention to the archive and deletes them, oldest first.
+    Every batch is its own short write transaction, with a pause in between so other writers
+    get the lock. A batch takes the write lock, deletes its rows, writes them to the archive and
+    only then commits: a delete that fails archives nothing, and an archive write that fails rolls
+    the delete back, so rows are neither lost nor archived twice.
+    Args:
+        retention (dict, optional): Rules in the shape of LOG_RETENTION.
+        batch_size (int): Rows archived and deleted per transaction.
+        pause (float): Seconds to sleep between batches.
+        archive (bool): Write the rows to archive_dir before deleting them.
+        archive_dir (str, optional): Directory of the daily archive files, LOG_ARCHIVE_DIR by default.
+        max_batches (int, optional): Stop after this many batches.
+    Returns:
+        dict: {"deleted", "batches", "files", "seconds"}
+    """
+    started = time.monotonic()
+    where_sql, params = Logs_Retention_Where(retention)
+    deleted = 0
+    batches = 0
+    files = set()
+    while max_batches is None or batches < max_batches:
+        with DBConnection() as db:
+            try:
+                db.execute("BEGIN IMMEDIATE")
+                rows = db.execute(
+                    f"""SELECT ID, Timestamp, Transaction_Type, Transaction_ID, Level, Source, Message
+                        FROM LOGS WHERE {where_sql} ORDER BY Timestamp LIMIT ?""",
+                    params + [batch_size],
+                ).fetchall()
+                if not rows:
+                    db.rollback()
+                    break
+                db.executemany("DELETE FROM LOGS WHERE ID = ?", [(row[0],) for row in rows])
+                if archive:
+                    files.update(Logs_Archive_Write(rows, archive_dir))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        deleted += len(rows)
+        batches += 1
+        if len(rows) < batch_size:
+            break
+        time.sleep(pause)
+
+    if deleted:
+        with log_totals_lock:
+            log_totals.clear()
+        with DBConnection() as db:
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    result = {"deleted": deleted, "batches": batches, "files": sorted(files), "seconds": round(time.monotonic() - started, 3)}
+    log_retention_last.clear()
+    log_retention_last.update(result, finished=time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()))
+    return result
+
+def Logs_Retention_Start(interval=3600.0, **kwargs):
+    """Runs Logs_Prune and Hall_Readings_Prune every interval seconds on a daemon thread.
+    kwargs go to Logs_Prune."""
+    def run():
+        while True:
+            try:
+                Logs_Prune(**kwargs)
+                Hall_Readings_Prune()
+            except Exception as e:
+                print(f"Log retention failed: {e}")
+            time.sleep(interval)
+    thread = threading.Thread(target=run, name="LogRetention", daemon=True)
+    thread.start()
+    return thread
+
+def Search_Log_Archives(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None, limit=50, before=None, archive_dir=None):
+    """Searches the archived logs with the same filters as Get_Logs, newest first.
+    Daily files are read newest first and the search stops as soon as a full page is found,
+    since older files cannot hold newer rows. q matches messages containing every word (case-insensitive).
+    A row archived more than once (a prune whose commit failed after the archive write) is returned once.
+    Args:
+        before (tuple, optional): (Timestamp, ID) of the last row of the previous page.
+        archive_dir (str, optional): Directory of the daily archive files, LOG_ARCHIVE_DIR by default.
+    Returns:
+        list: Up to limit log dicts like Get_Logs rows, with 'archived' set to True.
+    """
+    archive_dir = archive_dir or LOG_ARCHIVE_DIR
+    words = q.lower().split() if q else []
+    found = {}  # id -> log
+    for path in sorted(glob.glob(os.path.join(archive_dir, "LOGS-*.ndjson.gz")), reverse=True):
+        day = os.path.basename(path)[5:15]
+        if len(found) >= limit or (start and day < start[:10]):
+            break
+        if (end and day > end[:10]) or (before and day > str(before[0])[:10]):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                log = json.loads(line)
+                if before and (log['timestamp'], log['id']) >= tuple(before):
+                    continue
+                if (level and log['level'] != level) or (source and log['source'] != source):
+                    continue
+                if transaction_type and log['transaction_type'] != transaction_type:
+                    continue
+                if transaction_id and str(log['transaction_id']) != str(transaction_id):
+                    continue
+                if (start and log['timestamp'] < start) or (end and log['timestamp'] > end):
+                    continue
+                if words and not all(word in (log['message'] or "").lower() for word in words):
+                    continue
+                log['archived'] = True
+                found[log['id']] = log
+    found = sorted(found.values(), key=lambda log: (log['timestamp'], log['id']), reverse=True)
+    return found[:limit]
 
 
 ###### ADDING LOGGING FUNCTIONALITY
+# Background writer that groups log rows into one commit.
+class LogWriter:
+    INSERT = "INSERT INTO LOGS (Timestamp, Level, Message, Source, Transaction_Type, Transaction_ID) VALUES (?, ?, ?, ?, ?, ?)"
+
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval_ms=250, policy="block", block_timeout=0.1):
+        """
+        Args:
+            max_queue (int): Maximum number of rows waiting to be written.
+            batch_size (int): Flush as soon as this many rows are waiting.
+            flush_interval_ms (int): Flush at least this often while rows are waiting.
+            policy (str): What to do when the queue is full. "block" waits up to block_timeout
+                seconds for space and then drops the row, "drop" drops it immediately.
+            block_timeout (float): Seconds to wait for space with the "block" policy.
+        """
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.lock = threading.Lock()
+        self.counters = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stops the writer thread after flushing every queued row."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self._write(self._drain())
+
+    def put(self, row):
+        """Queues a row for writing. Returns False if the row was dropped."""
+        try:
+            if self.policy == "block":
+                self.queue.put(row, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(row)
+        except queue.Full:
+            with self.lock:
+                self.counters["dropped"] += 1
+            return False
+        with self.lock:
+            self.counters["queued"] += 1
+        return True
+
+    def flush(self):
+        """Writes every queued row now, from the calling thread."""
+        self._write(self._drain())
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats["pending"] = self.queue.qsize()
+        return stats
+
+    def _drain(self, limit=None):
+        rows = []
+        while limit is None or len(rows) < limit:
+            try:
+                rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                rows = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size and not self.stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            rows.extend(self._drain(self.batch_size - len(rows)))
+            self._write(rows)
+
+    def _write(self, rows):
+        if not rows:
+            return
+        written = 0
+        failed = 0
+        try:
+            with DBConnection() as db:
+                try:
+                    db.executemany(self.INSERT, rows)
+                    db.commit()
+                    written = len(rows)
+                except sqlite3.IntegrityError:
+                    # A bad row (e.g. missing Transaction_Type) must not take the batch down with it
+                    db.rollback()
+                    for row in rows:
+                        try:
+                            db.execute(self.INSERT, row)
+                            written += 1
+                        except sqlite3.IntegrityError as e:
+                            failed += 1
+                            print(f"Logging failed: {e}")
+                    db.commit()
+        except Exception as e:
+            failed = len(rows) - written
+            print(f"Logging failed: {e}")  # Fallback if logging itself fails
+        with self.lock:
+            self.counters["written"] += written
+            self.counters["failed"] += failed
+            self.counters["batches"] += 1
+
+log_writer = LogWriter()
+log_writer.start()
+atexit.register(log_writer.stop)
+
+Operators_Cache_Load()
+
 def log_event(level, message, source ,transaction_type=None, transaction_id=None):
     """
     Logs an event to the LOGS table.
+    The row is queued on log_writer and committed in a batch by its background thread,
+    the timestamp is taken when the event is logged.
     Args:
         level (str): Log level (e.g., 'INFO', 'ERROR', 'WARNING').
         message (str): Log message.
@@ -1019,16 +2467,101 @@ def log_event(level, message, source ,transaction_type=None, transaction_id=None
         transaction_type (str, optional): Type of transaction (e.g., 'ADD', 'REMOVE').
         transaction_id (str, optional): ID of the related transaction.
     """
-    with DBConnection() as db:
-        cursor = db.cursor()
-        try:
-            cursor.execute(
-                "INSERT INTO LOGS (Level, Message, Source, Transaction_Type, Transaction_ID) VALUES (?, ?, ?, ?, ?)",
-                (level, message, source, transaction_type, transaction_id)
-            )
-            db.commit()
-        except Exception as e:
-            print(f"Logging failed: {e}")  # Fallback if logging itself fails
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())  # same format as CURRENT_TIMESTAMP
+    log_writer.put((timestamp, level, message, source, transaction_type, transaction_id))
+
+###### HALL SENSOR SERIES
+# Readings from websocket code 603 go to HALL_READINGS in batches, the insert trigger keeps the
+# per-minute HALL_ROLLUPS current (see DB_Create migration 5).
+class HallWriter(LogWriter):
+    INSERT = "INSERT INTO HALL_READINGS (Time, Value, Pin, Transaction_ID) VALUES (?, ?, ?, ?)"
+
+hall_writer = HallWriter(max_queue=50000, batch_size=500, flush_interval_ms=1000, policy="drop")
+hall_writer.start()
+atexit.register(hall_writer.stop)
+
+HALL_RAW_RETENTION_DAYS = 7
+
+def Hall_Reading_Add(value, pin=None, transaction_id=None):
+    """
+    Queues one hall sensor reading, timestamped now.
+    Args:
+        value (int): The analog reading.
+        pin (int, optional): Sensor pin reported by the ESP32.
+        transaction_id (int, optional): Set for reads requested with code 602.
+    Returns:
+        bool: False if the reading was dropped because the queue is full.
+    """
+    return hall_writer.put((int(time.time() * 1000), int(value), pin, transaction_id))
+
+def Get_Hall_Series(minutes=60, resolution="minute", end_ms=None, max_points=2000):
+    """
+    Returns hall sensor readings over a time window, for calibrating hall_N_thresh/hall_S_thresh.
+    Args:
+        minutes (int): Length of the window, ending at end_ms.
+        resolution (str): "raw" for individual readings (last max_points of the window),
+            "minute" for the per-minute rollups.
+        end_ms (int, optional): End of the window as Unix time in milliseconds, default now.
+        max_points (int): Maximum number of raw points returned.
+    Returns:
+        dict: {"resolution", "points", "stats"}
+            points are [time_ms, value] for raw, [minute_start_ms, count, min, max, mean] for minute.
+            stats has count, min, max, mean and std over the whole window (from the rollups).
+    """
+    end_ms = end_ms or int(time.time() * 1000)
+    start_ms = end_ms - int(minutes) * 60000
+    with DBConnection(read_only=True) as db:
+        rollups = db.execute(
+            DB_Queries.HALL_ROLLUPS_RANGE,
+            (start_ms // 60000, end_ms // 60000),
+        ).fetchall()
+        if resolution == "raw":
+            rows = db.execute(
+                DB_Queries.HALL_READINGS_RANGE,
+                (start_ms, end_ms, max_points),
+            ).fetchall()
+            points = [[t, v] for t, v in reversed(rows)]
+        else:
+            points = [[m * 60000, c, lo, hi, round(s / c, 2)] for m, c, lo, hi, s, _ in rollups]
+
+    count = sum(r[1] for r in rollups)
+    stats = {"count": count, "min": None, "max": None, "mean": None, "std": None}
+    if count:
+        total = sum(r[4] for r in rollups)
+        total_sq = sum(r[5] for r in rollups)
+        mean = total / count
+        stats.update(
+            min=min(r[2] for r in rollups),
+            max=max(r[3] for r in rollups),
+            mean=round(mean, 2),
+            std=round(max(total_sq / count - mean * mean, 0) ** 0.5, 2),
+        )
+    return {"resolution": "raw" if resolution == "raw" else "minute", "points": points, "stats": stats}
+
+def Hall_Readings_Prune(days=HALL_RAW_RETENTION_DAYS, batch_size=5000, pause=0.05):
+    """
+    Deletes raw hall readings older than days in short batches. The per-minute rollups are kept.
+    Returns:
+        int: Number of readings deleted.
+    """
+    cutoff = int(time.time() * 1000) - days * 86400000
+    deleted = 0
+    while True:
+        with DBConnection() as db:
+            try:
+                count = db.execute(
+                    "DELETE FROM HALL_READINGS WHERE rowid IN (SELECT rowid FROM HALL_READINGS WHERE Time < ? LIMIT ?)",
+                    (cutoff, batch_size),
+                ).rowcount
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        deleted += count
+        if count < batch_size:
+            return deleted
+        time.sleep(pause)
+
 
 ### Forecast Projects
 def Forecast_Project_Get():
@@ -1037,7 +2570,7 @@ def Forecast_Project_Get():
     Returns a list of project names.
     """
     try:
-        with DBConnection() as db:
+        with DBConnection(read_only=True) as db:
             cursor = db.cursor()
             cursor.execute("SELECT UNIQUE ID Product_ID, Project_Name, Shelf_ID, Time, Quantity_Removed FROM TRANSACTIONS")
             projects = [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from DB import DB_Synth
+
+# Benchmarks for the DB layer hot paths on a synthetic warehouse (see DB_Synth).
+# Every case is timed call by call after a warmup, inputs are drawn up front from a seeded random
+# generator so two runs make the same calls. Results are written as JSON and can be compared with
+# a baseline run, the command exits non-zero when a case's median got slower than the tolerance.
+#
+# The benchmarks write (Norm_Product_Operation, log_event), so they always run on a fresh working
+# copy of the database and never touch DB/DB.db.
+
+
+def Percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def Time_Calls(fn, calls, warmup=10):
+    """
+    Times fn once per argument tuple in calls.
+    Args:
+        fn (callable): Function to time.
+        calls (list): Argument tuples, one per call.
+        warmup (int): Untimed calls made first with the leading argument tuples.
+    Returns:
+        dict: {"calls", "total_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "ops_per_s"}
+    """
+    for args in calls[:warmup]:
+        fn(*args)
+    latencies = []
+    for args in calls:
+        started = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "calls": len(latencies),
+        "total_s": round(total, 4),
+        "mean_ms": round(total / len(latencies) * 1000, 4),
+        "p50_ms": round(Percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(Percentile(latencies, 0.95) * 1000, 4),
+        "p99_ms": round(Percentile(latencies, 0.99) * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+        "ops_per_s": round(len(latencies) / total) if total else None,
+    }
+
+
+def Home_Page_Families_Baseline(db):
+    """
+    The home page lookup before Families_First_Product_Get, kept only as a baseline for the grouped query.
+    The bodies of the former DB_Back.Unique_Family_Products_Get and Home_Page_Families_Get as they were,
+    called the way Backend.Unique_Product_Families_Get called them.
+    """
+    with db.DBConnection() as db_conn:
+        cursor = db_conn.cursor()
+        cursor.execute("SELECT DISTINCT Family_Name FROM PRODUCTS ORDER BY Family_Name")
+        family_names = [row[0] for row in cursor.fetchall()]
+
+    with db.DBConnection() as db_conn:
+        cursor = db_conn.cursor()
+        Thumbnails = []
+        IDs = []
+        for family in family_names:
+            cursor.execute("SELECT ID FROM PRODUCTS WHERE Family_Name = ? LIMIT 1", (family,))
+            product_id = cursor.fetchone()
+            if product_id:
+                Thumbnails.append(f"DB/Product_Pics/{product_id[0]}/Thumb.jpg")
+                IDs.append(product_id[0])
+            else:
+                Thumbnails.append(None)
+                IDs.append(None)
+    return family_names, Thumbnails, IDs
+
+
+def Families_First_Product_Uncached(db):
+    """Families_First_Product_Get as after a catalog write: the cached entry is dropped first."""
+    db.catalog_cache.invalidate(("families",))
+    return db.Families_First_Product_Get()
+
+
+def Cases(db, Backend, rng, iterations):
+    """
+    Builds the benchmark cases against the open database.
+    Returns:
+        list: (name, fn, calls) with calls a list of argument tuples.
+    """
+    with db.DBConnection(read_only=True) as conn:
+        pairs = conn.execute("SELECT Shelf_ID, Product_ID FROM PRODUCTS_SHELVES").fetchall()
+        products = [row[0] for row in conn.execute("SELECT ID FROM PRODUCTS").fetchall()]
+        busiest = [row[0] for row in conn.execute(
+            "SELECT Product_ID FROM TRANSACTIONS GROUP BY Product_ID ORDER BY COUNT(*) DESC LIMIT 20").fetchall()]
+    next_cursor = db.Get_Logs(limit=50)[2]
+
+    def Norm_Operation(shelf_id, product_id, QTY):
+        Backend.Norm_Product_Operation(db.Transaction_ID_Generator(), shelf_id, product_id, QTY, 1)
+
+    return [
+        ("Norm_Product_Operation", Norm_Operation,
+         [rng.choice(pairs) + (rng.choice((-1, 1)),) for _ in range(iterations)]),
+        ("Product_Shelf_Choose[1]", db.Product_Shelf_Choose,
+         [([rng.choice(products)],) for _ in range(iterations)]),
+        ("Product_Shelf_Choose[10]", db.Product_Shelf_Choose,
+         [(rng.sample(products, 10),) for _ in range(iterations)]),
+        ("Get_Logs[first page]", lambda: db.Get_Logs(limit=50), [()] * iterations),
+        ("Get_Logs[next page]", lambda cursor: db.Get_Logs(limit=50, cursor=cursor),
+         [(next_cursor,)] * iterations),
+        ("Get_Logs[level]", lambda level: db.Get_Logs(level=level, limit=50),
+         [(rng.choice(("INFO", "WARNING", "ERROR")),) for _ in range(iterations)]),
+        ("Get_Logs[search]", lambda q: db.Get_Logs(q=q, limit=50),
+         [(rng.choice(("sensor", "Operator", "Connection lost", "P00001")),) for _ in range(iterations)]),
+        ("Get_Product_Inventory_Records", db.Get_Product_Inventory_Records,
+         [(rng.choice(busiest),) for _ in range(iterations)]),
+        ("Get_Product_Inventory_Records[500 points]", lambda pid: db.Get_Product_Inventory_Records(pid, max_points=500),
+         [(rng.choice(busiest),) for _ in range(iterations)]),
+        ("Home_Page_Families_Get (baseline)", lambda: Home_Page_Families_Baseline(db), [()] * iterations),
+        ("Families_First_Product_Get", lambda: Families_First_Product_Uncached(db), [()] * iterations),
+        ("Families_First_Product_Get (cached)", db.Families_First_Product_Get, [()] * iterations),
+        ("log_event", db.log_event,
+         [("INFO", f"Benchmark event {i}", "Server", "BENCHMARK", str(i)) for i in range(iterations * 10)]),
+    ]
+
+
+def Working_Copy(source, target):
+    """Copies a database with the online backup API."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def Git_Commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def Run(db_path=None, scale="small", seed=0, iterations=200, only=None):
+    """
+    Runs the benchmark suite.
+    Args:
+        db_path (str, optional): Synthetic database to reuse, generated there if missing.
+            Without it a database is generated in a temporary directory.
+        scale (str): DB_Synth scale used when generating.
+        seed (int): Seed for the data and for the benchmark inputs.
+        iterations (int): Timed calls per case (log_event makes ten times as many).
+        only (list, optional): Substrings, run only the cases whose name contains one of them.
+    Returns:
+        dict: {"meta", "dataset", "results"} ready to be written as JSON.
+    """
+    workdir = tempfile.mkdtemp(prefix="vlm_bench_")
+    dataset = None
+    if db_path is None or not os.path.exists(db_path):
+        db_path = db_path or os.path.join(workdir, f"synthetic_{scale}_{seed}.db")
+        dataset = DB_Synth.Generate(db_path, scale, seed)
+    working = os.path.join(workdir, "working.db")
+    Working_Copy(db_path, working)
+
+    db = DB_Synth.Open_Backend(working)
+    result = db.Aggregates_Rebuild()
+    if result is not True:
+        raise result
+    import Backend
+
+    if dataset is None:
+        with db.DBConnection(read_only=True) as conn:
+            dataset = {table.lower(): conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                       for table in ("SHELVES", "PRODUCTS", "OPERATORS", "PRODUCTS_SHELVES", "TRANSACTIONS", "LOGS")}
+
+    results = {}
+    for name, fn, calls in Cases(db, Backend, random.Random(seed), iterations):
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = Time_Calls(fn, calls)
+        if name == "log_event":
+            # the calls only queue rows, report what writing them costs as well
+            started = time.perf_counter()
+            db.log_writer.flush()
+            results[name]["flush_s"] = round(time.perf_counter() - started, 4)
+        print(f"{name:<45} p50 {results[name]['p50_ms']:>9.3f} ms  p95 {results[name]['p95_ms']:>9.3f} ms  {results[name]['ops_per_s'] or 0:>8} ops/s")
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": Git_Commit(),
+            "scale": scale,
+            "seed": seed,
+            "iterations": iterations,
+            "db_path": db_path,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "dataset": dataset,
+        "results": results,
+    }
+
+
+def Compare(report, baseline, tolerance=0.25):
+    """
+    Compares the median latency of every case with a baseline report.
+    Args:
+        report (dict): Result of Run.
+        baseline (dict): An earlier result of Run.
+        tolerance (float): Allowed slowdown, 0.25 flags cases more than 25% slower.
+    Returns:
+        list: (name, baseline p50 ms, p50 ms, ratio, regressed) for cases present in both.
+    """
+    rows = []
+    for name, stats in report["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["p50_ms"]:
+            continue
+        ratio = stats["p50_ms"] / base["p50_ms"]
+        rows.append((name, base["p50_ms"], stats["p50_ms"], round(ratio, 3), ratio > 1 + tolerance))
+    return rows
+
+
+if __name__ == '__main__':
+    # python -m DB.DB_Bench --scale medium -o bench.json --baseline baseline.json
+    parser = argparse.ArgumentParser(description="Benchmark the VLM DB layer on synthetic data.")
+    parser.add_argument("--db", help="synthetic database to reuse (generated there if missing)")
+    parser.add_argument("--scale", choices=list(DB_Synth.SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--only", nargs="*", help="run only the cases whose name contains one of these")
+    parser.add_argument("-o", "--output", help="write the results as JSON here")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown against the baseline (default 0.25)")
+    args = parser.parse_args()
+
+    report = Run(args.db, args.scale, args.seed, args.iterations, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for name, before, after, ratio, slower in Compare(report, baseline, args.tolerance):
+            regressed |= slower
+            print(f"{name:<45} {before:>9.3f} -> {after:>9.3f} ms  x{ratio:<6} {'REGRESSION' if slower else ''}")
+    sys.exit(1 if regressed else 0)
@@ -1,153 +1,406 @@
-import sqlite3 
+import sqlite3
+import sys
 
-db = sqlite3.connect('DB/DB.db')
-cursor = db.cursor()
+from DB import DB_Queries
 
-# cursor.execute('DROP TABLE SHELVES;')
-# cursor.execute('DROP TABLE PRODUCTS;')
-# cursor.execute('DROP TABLE OPERATORS;')
-# cursor.execute('DROP TABLE PRODUCTS_SHELVES;')
-# cursor.execute('DROP TABLE TRANSACTIONS;')
-# cursor.execute('DROP TABLE PRODUCT_TAGS;')
-# cursor.execute('DROP TABLE PRODUCT_PROJECTS;')
-cursor.execute('DROP TABLE LOGS;')
-# cursor.execute('DROP TABLE FORECASTS;')
-cursor.execute('DROP TABLE VLM_CONFIG;')
-
-
-# # Pos (L/R row-> upto 999 rows)
-# cursor.execute('''CREATE TABLE IF NOT EXISTS SHELVES (
-#                ID TEXT PRIMARY KEY,
-#                Pos CHARACTER(3) NOT NULL,
-#                Weight FLOAT(2),
-#                Quantity INT DEFAULT 0,
-# 			   SpaceLeft INT DEFAULT 100,
-# 			   RacksAvailable INT DEFAULT 1,
-#                UNIQUE (Pos, ID)
-# );
-# ''')
-
-# cursor.execute('''CREATE TABLE IF NOT EXISTS PRODUCTS (
-#                ID TEXT PRIMARY KEY,
-#                Name TEXT NOT NULL,
-#                Description TEXT,
-#                Family_Name TEXT,
-#                Family_Item TEXT,
-#                Weight FLOAT(2),
-#                ROP INT DEFAULT 0,
-#                OH INT DEFAULT 0,
-# 			   Length FLOAT(2),
-# 			   Width FLOAT(2),
-#                Height FLOAT(2),
-#                UNIQUE (ID)
-# );
-# ''')
-
-# cursor.execute('''CREATE TABLE IF NOT EXISTS OPERATORS (
-#                ID INT,
-#                NAME TEXT NOT NULL,
-#                Username TEXT,
-#                Password TEXT NOT NULL,
-#                Password_Salt TEXT NOT NULL,
-#                Access_Level INT DEFAULT 1,
-#                PRIMARY KEY (ID, Username)
-# );
-# ''')
-# Access Levels:
+# Versioned schema migrations.
+# Each migration is (version, name, statements) and is applied once, in order, inside its own
+# transaction. Applied versions are recorded in SCHEMA_MIGRATIONS. Never edit a migration that
+# has shipped, append a new one instead.
+# Access Levels (OPERATORS.Access_Level):
 # 1: Operator (Can add/remove stock, view products)
 # 2: Manager (Can add/remove products)
 # 3: Admin (can add/remove operators)
 # 4: Super Admin (can manage all aspects)
+MIGRATIONS = [
+    (1, "Base schema", [
+        # Pos (L/R row-> upto 999 rows)
+        '''CREATE TABLE IF NOT EXISTS SHELVES (
+               ID TEXT PRIMARY KEY,
+               Pos CHARACTER(3) NOT NULL,
+               Weight FLOAT(2),
+               Quantity INT DEFAULT 0,
+               SpaceLeft INT DEFAULT 100,
+               RacksAvailable INT DEFAULT 1,
+               UNIQUE (Pos, ID)
+        );''',
+        '''CREATE TABLE IF NOT EXISTS PRODUCTS (
+               ID TEXT PRIMARY KEY,
+               Name TEXT NOT NULL,
+               Description TEXT,
+               Family_Name TEXT,
+               Family_Item TEXT,
+               Weight FLOAT(2),
+               ROP INT DEFAULT 0,
+               OH INT DEFAULT 0,
+               Length FLOAT(2),
+               Width FLOAT(2),
+               Height FLOAT(2),
+               UNIQUE (ID)
+        );''',
+        '''CREATE TABLE IF NOT EXISTS OPERATORS (
+               ID INT,
+               NAME TEXT NOT NULL,
+               Username TEXT,
+               Password TEXT NOT NULL,
+               Password_Salt TEXT NOT NULL,
+               Access_Level INT DEFAULT 1,
+               PRIMARY KEY (ID, Username)
+        );''',
+        '''CREATE TABLE IF NOT EXISTS PRODUCTS_SHELVES (
+               Shelf_ID INT,
+               Product_ID TEXT,
+               Quantity INT,
+               PRIMARY KEY (Shelf_ID, Product_ID),
+               FOREIGN KEY (Shelf_ID) REFERENCES SHELVES(ID) ON DELETE CASCADE,
+               FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
+        );''',
+        '''CREATE TABLE IF NOT EXISTS TRANSACTIONS (
+               ID INT,
+               Product_ID TEXT,
+               Project_Name TEXT,
+               Shelf_ID TEXT,
+               Time TEXDATETIME DEFAULT CURRENT_TIMESTAMPT,
+               Quantity_Added INT,
+               Quantity_Removed INT,
+               Operator_ID INT,
+               PRIMARY KEY (ID, Product_ID, Shelf_ID),
+               FOREIGN KEY (Shelf_ID) REFERENCES SHELVES(ID) ON DELETE CASCADE,
+               FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
+               FOREIGN KEY (Operator_ID) REFERENCES OPERATORS(ID) ON DELETE CASCADE
+               FOREIGN KEY (Project_Name) REFERENCES PRODUCT_PROJECTS(Project) ON DELETE CASCADE
+        );''',
+        '''CREATE TABLE IF NOT EXISTS PRODUCT_TAGS (
+               Product_ID TEXT,
+               Tag TEXT,
+               PRIMARY KEY (Product_ID,Tag),
+               FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
+        );''',
+        '''CREATE TABLE IF NOT EXISTS PRODUCT_PROJECTS (
+               Product_ID TEXT,
+               Project TEXT,
+               PRIMARY KEY (Product_ID, Project),
+               FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
+        );''',
+        '''CREATE TABLE IF NOT EXISTS LOGS (
+               ID INTEGER PRIMARY KEY AUTOINCREMENT,
+               Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+               Transaction_Type TEXT NOT NULL,  -- e.g., 'ADD', 'REMOVE', 'UPDATE'
+               Transaction_ID TEXT,
+               Level TEXT NOT NULL,  -- e.g., 'INFO', 'ERROR', 'WARNING'
+               Source TEXT,
+               Message TEXT NOT NULL
+        );''',
+        '''CREATE TABLE IF NOT EXISTS FORECASTS (
+               ID INTEGER PRIMARY KEY AUTOINCREMENT,
+               Product_ID TEXT,            -- nullable
+               Project_Name TEXT,          -- nullable
+               Forecasted_On DATETIME,
+               Target_Date DATETIME,
+               Forecast_Quantity INT,
+               Model_Name TEXT,
+               Created_By TEXT,
+               Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE,
+               FOREIGN KEY (Project_Name) REFERENCES PRODUCT_PROJECTS(Project) ON DELETE CASCADE
+        );''',
+        '''CREATE TABLE IF NOT EXISTS VLM_CONFIG (
+               Normal_Speed INT,
+               Approach_Speed INT,
+               Steps_Per_Floor INT,
+               Stop_Pulse INT,
+               For_Pulse INT,
+               Back_Pulse INT,
+               Collect_Time INT,
+               Return_Time INT,
+               hall_N_thresh INT,
+               hall_S_thresh INT,
+               Last_Updated DATETIME DEFAULT CURRENT_TIMESTAMP
+        );''',
+    ]),
+    (2, "Hot path indexes", [
+        # Inventory history per product, ordered by time (covering)
+        '''CREATE INDEX IF NOT EXISTS IDX_TRANSACTIONS_PRODUCT_TIME
+               ON TRANSACTIONS (Product_ID, Time, Quantity_Added, Quantity_Removed, Operator_ID, Project_Name, Shelf_ID);''',
+        # Logs page: newest first, with or without the selector filters
+        "CREATE INDEX IF NOT EXISTS IDX_LOGS_TIMESTAMP ON LOGS (Timestamp);",
+        "CREATE INDEX IF NOT EXISTS IDX_LOGS_LEVEL_TIMESTAMP ON LOGS (Level, Timestamp);",
+        "CREATE INDEX IF NOT EXISTS IDX_LOGS_SOURCE_TIMESTAMP ON LOGS (Source, Timestamp);",
+        "CREATE INDEX IF NOT EXISTS IDX_LOGS_TYPE_TIMESTAMP ON LOGS (Transaction_Type, Timestamp);",
+        "CREATE INDEX IF NOT EXISTS IDX_LOGS_TRANSACTION_ID ON LOGS (Transaction_ID, Timestamp);",
+        # Family pages and home page (covering)
+        "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_FAMILY ON PRODUCTS (Family_Name, Family_Item, ID);",
+        # Shelf lookups by product (covering)
+        "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_SHELVES_PRODUCT ON PRODUCTS_SHELVES (Product_ID, Shelf_ID, Quantity);",
+        # Project pages and shelf selection
+        "CREATE INDEX IF NOT EXISTS IDX_PRODUCT_PROJECTS_PROJECT ON PRODUCT_PROJECTS (Project, Product_ID);",
+        # Best shelf fallback ordering
+        "CREATE INDEX IF NOT EXISTS IDX_SHELVES_SPACE ON SHELVES (SpaceLeft DESC, Weight, ID, Pos);",
+        # Web login
+        "CREATE INDEX IF NOT EXISTS IDX_OPERATORS_USERNAME ON OPERATORS (Username);",
+    ]),
+    (3, "Full-text index on LOGS.Message", [
+        lambda db: Logs_FTS_Create(db),
+    ]),
+    (4, "Log filter selector dictionary", [
+        # Known Level/Source/Transaction_Type values for the machine logs filters
+        '''CREATE TABLE IF NOT EXISTS LOG_SELECTORS (
+               Kind TEXT NOT NULL,  -- 'Level', 'Source' or 'Transaction_Type'
+               Value TEXT NOT NULL,
+               PRIMARY KEY (Kind, Value)
+        ) WITHOUT ROWID;''',
+        '''CREATE TRIGGER IF NOT EXISTS LOG_SELECTORS_INSERT AFTER INSERT ON LOGS BEGIN
+               INSERT OR IGNORE INTO LOG_SELECTORS (Kind, Value) SELECT 'Level', new.Level WHERE new.Level IS NOT NULL AND new.Level != '';
+               INSERT OR IGNORE INTO LOG_SELECTORS (Kind, Value) SELECT 'Source', new.Source WHERE new.Source IS NOT NULL AND new.Source != '';
+               INSERT OR IGNORE INTO LOG_SELECTORS (Kind, Value) SELECT 'Transaction_Type', new.Transaction_Type WHERE new.Transaction_Type IS NOT NULL AND new.Transaction_Type != '';
+           END;''',
+        # Backfill from the existing LOGS rows
+        "INSERT OR IGNORE INTO LOG_SELECTORS (Kind, Value) SELECT DISTINCT 'Level', Level FROM LOGS WHERE Level IS NOT NULL AND Level != '';",
+        "INSERT OR IGNORE INTO LOG_SELECTORS (Kind, Value) SELECT DISTINCT 'Source', Source FROM LOGS WHERE Source IS NOT NULL AND Source != '';",
+        "INSERT OR IGNORE INTO LOG_SELECTORS (Kind, Value) SELECT DISTINCT 'Transaction_Type', Transaction_Type FROM LOGS WHERE Transaction_Type IS NOT NULL AND Transaction_Type != '';",
+    ]),
+    (5, "Hall sensor time series", [
+        # Raw readings (websocket code 603), kept for a few days
+        '''CREATE TABLE IF NOT EXISTS HALL_READINGS (
+               Time INTEGER NOT NULL,  -- Unix time in milliseconds
+               Value INTEGER NOT NULL,
+               Pin INTEGER,
+               Transaction_ID INTEGER  -- set for reads requested with code 602, NULL for automatic ones
+        );''',
+        "CREATE INDEX IF NOT EXISTS IDX_HALL_READINGS_TIME ON HALL_READINGS (Time, Value);",
+        # Per-minute rollups, kept after the raw readings are pruned
+        '''CREATE TABLE IF NOT EXISTS HALL_ROLLUPS (
+               Minute INTEGER PRIMARY KEY,  -- Unix time in minutes
+               Count INTEGER NOT NULL,
+               Min INTEGER NOT NULL,
+               Max INTEGER NOT NULL,
+               Sum INTEGER NOT NULL,
+               Sum_Sq INTEGER NOT NULL
+        );''',
+        '''CREATE TRIGGER IF NOT EXISTS HALL_ROLLUPS_INSERT AFTER INSERT ON HALL_READINGS BEGIN
+               INSERT INTO HALL_ROLLUPS (Minute, Count, Min, Max, Sum, Sum_Sq)
+               VALUES (new.Time / 60000, 1, new.Value, new.Value, new.Value, new.Value * new.Value)
+               ON CONFLICT (Minute) DO UPDATE SET
+                   Count = Count + 1,
+                   Min = MIN(Min, excluded.Min),
+                   Max = MAX(Max, excluded.Max),
+                   Sum = Sum + excluded.Sum,
+                   Sum_Sq = Sum_Sq + excluded.Sum_Sq;
+           END;''',
+        # Backfill from the readings logged as text before this table existed
+        '''INSERT INTO HALL_READINGS (Time, Value, Pin, Transaction_ID)
+               SELECT CAST(strftime('%s', Timestamp) AS INTEGER) * 1000,
+                      CAST(substr(Message, length('Hall sensor reading received: ') + 1) AS INTEGER),
+                      NULL,
+                      CAST(Transaction_ID AS INTEGER)
+               FROM LOGS
+               WHERE Transaction_Type IN ('AUTO_HALL_SENSOR_READING', 'MANUAL_HALL_SENSOR_READING')
+                 AND Message LIKE 'Hall sensor reading received: %'
+               ORDER BY ID;''',
+    ]),
+    (6, "LOGS row count", [
+        # Exact unfiltered total for the machine logs page, kept by triggers through inserts and retention deletes
+        '''CREATE TABLE IF NOT EXISTS LOGS_COUNT (
+               ID INTEGER PRIMARY KEY CHECK (ID = 1),
+               Total INTEGER NOT NULL
+        );''',
+        "INSERT OR REPLACE INTO LOGS_COUNT (ID, Total) SELECT 1, COUNT(*) FROM LOGS;",
+        '''CREATE TRIGGER IF NOT EXISTS LOGS_COUNT_INSERT AFTER INSERT ON LOGS BEGIN
+               UPDATE LOGS_COUNT SET Total = Total + 1 WHERE ID = 1;
+           END;''',
+        '''CREATE TRIGGER IF NOT EXISTS LOGS_COUNT_DELETE AFTER DELETE ON LOGS BEGIN
+               UPDATE LOGS_COUNT SET Total = Total - 1 WHERE ID = 1;
+           END;''',
+    ]),
+    (7, "SHELVES generation", [
+        # Bumped by every shelf insert, delete or move, so processes holding shelf positions in
+        # memory (DB_Back.shelf_registry) can tell that SHELVES changed under them
+        '''CREATE TABLE IF NOT EXISTS SHELVES_VERSION (
+               ID INTEGER PRIMARY KEY CHECK (ID = 1),
+               Generation INTEGER NOT NULL
+        );''',
+        "INSERT OR IGNORE INTO SHELVES_VERSION (ID, Generation) VALUES (1, 0);",
+        '''CREATE TRIGGER IF NOT EXISTS SHELVES_VERSION_INSERT AFTER INSERT ON SHELVES BEGIN
+               UPDATE SHELVES_VERSION SET Generation = Generation + 1 WHERE ID = 1;
+           END;''',
+        '''CREATE TRIGGER IF NOT EXISTS SHELVES_VERSION_UPDATE AFTER UPDATE OF ID, Pos ON SHELVES BEGIN
+               UPDATE SHELVES_VERSION SET Generation = Generation + 1 WHERE ID = 1;
+           END;''',
+        '''CREATE TRIGGER IF NOT EXISTS SHELVES_VERSION_DELETE AFTER DELETE ON SHELVES BEGIN
+               UPDATE SHELVES_VERSION SET Generation = Generation + 1 WHERE ID = 1;
+           END;''',
+    ]),
+]
+
 
-# cursor.execute('''CREATE TABLE IF NOT EXISTS PRODUCTS_SHELVES (
-#                Shelf_ID INT,
-#                Product_ID TEXT,
-#                Quantity INT,
-#                PRIMARY KEY (Shelf_ID, Product_ID),
-#                FOREIGN KEY (Shelf_ID) REFERENCES SHELVES(ID) ON DELETE CASCADE,
-#                FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
-# );
-# ''')
+def Logs_FTS_Create(db):
+    """Creates LOGS_FTS, an FTS5 index over LOGS.Message kept in sync by triggers, and backfills it.
+    Skipped when the SQLite build has no FTS5, Get_Logs then falls back to LIKE.
+    Args:
+        db (sqlite3.Connection): The database connection object.
+    """
+    try:
+        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS LOGS_FTS USING fts5(Message, content='LOGS', content_rowid='ID');")
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 not available, log search will use LIKE: {e}")
+        return
+    db.execute(
+        """CREATE TRIGGER IF NOT EXISTS LOGS_FTS_INSERT AFTER INSERT ON LOGS BEGIN
+               INSERT INTO LOGS_FTS (rowid, Message) VALUES (new.ID, new.Message);
+           END;"""
+    )
+    db.execute(
+        """CREATE TRIGGER IF NOT EXISTS LOGS_FTS_DELETE AFTER DELETE ON LOGS BEGIN
+               INSERT INTO LOGS_FTS (LOGS_FTS, rowid, Message) VALUES ('delete', old.ID, old.Message);
+           END;"""
+    )
+    db.execute(
+        """CREATE TRIGGER IF NOT EXISTS LOGS_FTS_UPDATE AFTER UPDATE OF Message ON LOGS BEGIN
+               INSERT INTO LOGS_FTS (LOGS_FTS, rowid, Message) VALUES ('delete', old.ID, old.Message);
+               INSERT INTO LOGS_FTS (rowid, Message) VALUES (new.ID, new.Message);
+           END;"""
+    )
+    # Backfill from the existing LOGS rows
+    db.execute("INSERT INTO LOGS_FTS (LOGS_FTS) VALUES ('rebuild');")
 
-# cursor.execute('''CREATE TABLE IF NOT EXISTS TRANSACTIONS (
-#                ID INT,
-#                Product_ID TEXT,
-#                Project_Name TEXT,
-#                Shelf_ID TEXT,
-#                Time TEXDATETIME DEFAULT CURRENT_TIMESTAMPT,
-#                Quantity_Added INT,
-#                Quantity_Removed INT,
-#                Operator_ID INT,
-#                PRIMARY KEY (ID, Product_ID, Shelf_ID),
-#                FOREIGN KEY (Shelf_ID) REFERENCES SHELVES(ID) ON DELETE CASCADE,
-#                FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
-#                FOREIGN KEY (Operator_ID) REFERENCES OPERATORS(ID) ON DELETE CASCADE
-#                FOREIGN KEY (Project_Name) REFERENCES PRODUCT_PROJECTS(Project) ON DELETE CASCADE
-# );
-# ''')
+def Logs_Hot_Query(name, cursor=False, **filters):
+    """A HOT_QUERIES entry for the Get_Logs page query with these filters."""
+    from_sql, where, params = DB_Queries.Logs_Where(**filters)
+    if cursor:
+        params += [2**53] if from_sql != "LOGS" else ["2025-01-01 00:00:00", 2**53]
+    return (name, DB_Queries.Logs_Page_Query(from_sql, where, cursor=cursor), params + [51, 0])
 
-# cursor.execute('''CREATE TABLE IF NOT EXISTS PRODUCT_TAGS (
-#                Product_ID TEXT,
-#                Tag TEXT,
-#                PRIMARY KEY (Product_ID,Tag),
-#                FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
-# );
-# ''')
+# Queries on the hot path of DB_Back.py, built from the same DB_Queries strings and builders that
+# DB_Back runs. Query_Plan_Check fails if any of them falls back to a full table scan or a
+# temporary sort, unless the plan line is listed for it in PLAN_ALLOWANCES.
+# The downsampled inventory query ranks inside buckets, and the relevance search and the search
+# merged with the log archives sort their matches by design, they are not listed.
+HOT_QUERIES = [
+    ("Get_Product_Inventory_Records", DB_Queries.Inventory_Records_Query(), {"pid": "P"}),
+    ("Get_Product_Inventory_Records (range)", DB_Queries.Inventory_Records_Query(start=True, end=True),
+     {"pid": "P", "start": "2025-01-01", "end": "2025-12-31"}),
+    Logs_Hot_Query("Get_Logs"),
+    Logs_Hot_Query("Get_Logs (cursor)", cursor=True),
+    Logs_Hot_Query("Get_Logs (level)", cursor=True, level="INFO"),
+    Logs_Hot_Query("Get_Logs (source)", cursor=True, source="ESP32"),
+    Logs_Hot_Query("Get_Logs (type)", cursor=True, transaction_type="PRODUCT_OPERATION"),
+    Logs_Hot_Query("Get_Logs (transaction)", cursor=True, transaction_id="1"),
+    Logs_Hot_Query("Get_Logs (level, range)", cursor=True, level="ERROR", start="2025-01-01", end="2025-12-31"),
+    Logs_Hot_Query("Get_Logs (search)", cursor=True, q="sensor"),
+    ("Product_Shelf_Get", DB_Queries.Product_Shelf_Get_Query(2), ("P", "Q")),
+    ("Product_Shelf_Choose", DB_Queries.Product_Shelf_Choose_Query(2), (0, "P", 1, "Q")),
+    ("Family_Products_Search", DB_Queries.FAMILY_PRODUCTS, ("F",)),
+    ("Families_First_Product_Get", DB_Queries.FAMILIES_FIRST_PRODUCT, ()),
+    ("Project_Products_Get", DB_Queries.PROJECT_PRODUCTS, ("X",)),
+    ("Get_Product_on_Shelf_QTY", DB_Queries.PRODUCT_ON_SHELF_QTY, ("P", "S")),
+    ("Products_Project_Search", DB_Queries.PROJECT_PRODUCT_IDS, ("X",)),
+    ("Product_Projects_Get", DB_Queries.PRODUCT_PROJECTS, ("P",)),
+    ("Shelf_ID_From_Position", DB_Queries.SHELF_ID_FROM_POSITION, ("F01",)),
+    ("Products_Data_Read", DB_Queries.PRODUCT_READ, ("P",)),
+    ("Operator_Login", DB_Queries.OPERATOR_LOGIN, ("u",)),
+    ("Operator_ID_Query", DB_Queries.OPERATOR_BY_ID, (1,)),
+    ("Get_Hall_Series (raw)", DB_Queries.HALL_READINGS_RANGE, (0, 1, 10)),
+    ("Get_Hall_Series (minute)", DB_Queries.HALL_ROLLUPS_RANGE, (0, 1)),
+]
+# query name -> plan lines that are expected for it, each with the reason
+PLAN_ALLOWANCES = {
+    # Ranks the candidate shelves of every product by tier, space left and weight. The candidates
+    # come from three different joins, no index can return them in that order. The sort covers
+    # only the candidates found through the indexes, never a whole table.
+    "Product_Shelf_Choose": ("USE TEMP B-TREE FOR ORDER BY",),
+}
 
-# cursor.execute('''CREATE TABLE IF NOT EXISTS PRODUCT_PROJECTS (
-#                Product_ID TEXT,
-#                Project TEXT,
-#                PRIMARY KEY (Product_ID, Project),
-#                FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
-# );
-# ''')
 
-cursor.execute('''CREATE TABLE IF NOT EXISTS LOGS (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            Transaction_Type TEXT NOT NULL,  -- e.g., 'ADD', 'REMOVE', 'UPDATE'
-			Transaction_ID TEXT,  
-			Level TEXT NOT NULL,  -- e.g., 'INFO', 'ERROR', 'WARNING'
-            Source TEXT,
-			Message TEXT NOT NULL
-			
-);
-''')
+def Schema_Version(db):
+    """Returns the highest applied migration version, 0 for a database that was never migrated.
+    Args:
+        db (sqlite3.Connection): The database connection object.
+    """
+    db.execute(
+        """CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS (
+               Version INT PRIMARY KEY,
+               Name TEXT NOT NULL,
+               Applied_At DATETIME DEFAULT CURRENT_TIMESTAMP
+        );"""
+    )
+    row = db.execute("SELECT MAX(Version) FROM SCHEMA_MIGRATIONS").fetchone()
+    return row[0] or 0
 
 
-# cursor.execute('''CREATE TABLE IF NOT EXISTS FORECASTS (
-#     ID INTEGER PRIMARY KEY AUTOINCREMENT,
-#     Product_ID TEXT,            -- nullable
-#     Project_Name TEXT,          -- nullable
-#     Forecasted_On DATETIME,
-#     Target_Date DATETIME,
-#     Forecast_Quantity INT,
-#     Model_Name TEXT,
-#     Created_By TEXT,
-#     Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-#     FOREIGN KEY (Product_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE,
-#     FOREIGN KEY (Project_Name) REFERENCES PRODUCT_PROJECTS(Project) ON DELETE CASCADE
-# );''')
+def Migrate(db_path="DB/DB.db", verbose=False):
+    """Applies all pending migrations in order. Safe to call on every startup.
+    Args:
+        db_path (str): Path to the SQLite database file.
+        verbose (bool): Print every applied migration.
+    Returns:
+        int: The schema version after migrating.
+    """
+    db = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        current = Schema_Version(db)
+        for version, name, statements in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if version <= current:
+                continue
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if Schema_Version(db) >= version:
+                    db.execute("COMMIT")
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(db)
+                    else:
+                        db.execute(statement)
+                db.execute("INSERT INTO SCHEMA_MIGRATIONS (Version, Name) VALUES (?, ?)", (version, name))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            current = version
+            if verbose:
+                print(f"Applied migration {version}: {name}")
+        return current
+    finally:
+        db.close()
 
-# cursor.execute('''ALTER TABLE OPERATOR RENAME TO OPERATORS''')
-# cursor.execute('''ALTER TABLE SHELVES ADD COLUMN Height FLOAT(1)''')
-# cursor.execute('''ALTER TABLE PRODUCTS_SHELVES RENAME COLUMN Shelf to Shelf_ID''')
 
+def Query_Plan_Check(db_path="DB/DB.db"):
+    """Runs EXPLAIN QUERY PLAN on every hot query.
+    Args:
+        db_path (str): Path to the SQLite database file.
+    Returns:
+        list: A list of (query name, plan detail) for every query that scans a table or sorts
+              through a temporary b-tree, apart from its PLAN_ALLOWANCES. Empty if all hot
+              queries use an index.
+    """
+    db = sqlite3.connect(db_path)
+    try:
+        # Scans of CTEs and subqueries read rows already found through an index, only tables count
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        regressions = []
+        for name, query, params in HOT_QUERIES:
+            if "LOGS_FTS" in query and "LOGS_FTS" not in tables:
+                continue  # SQLite without FTS5, Get_Logs searches with LIKE
+            allowed = PLAN_ALLOWANCES.get(name, ())
+            for row in db.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall():
+                detail = row[-1]
+                scanned = detail.split()[1] if detail.startswith("SCAN ") else None
+                if detail in allowed:
+                    continue
+                if (scanned in tables and "USING" not in detail and "VIRTUAL TABLE INDEX" not in detail) or "TEMP B-TREE" in detail:
+                    regressions.append((name, detail))
+        return regressions
+    finally:
+        db.close()
 
-cursor.execute('''CREATE TABLE IF NOT EXISTS VLM_CONFIG (
-	Normal_Speed INT ,
-	Approach_Speed INT,
-	Steps_Per_Floor INT ,
-	Stop_Pulse INT ,
-	For_Pulse INT ,
-	Back_Pulse INT ,
-	Collect_Time INT ,
-	Return_Time INT,
-	hall_N_thresh INT,
-	hall_S_thresh INT,
-	Last_Updated DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-''')
 
-db.commit()
-db.close()
\ No newline at end of file
+if __name__ == '__main__':
+    # python -m DB.DB_Create [db_path]
+    path = sys.argv[1] if len(sys.argv) > 1 else "DB/DB.db"
+    version = Migrate(path, verbose=True)
+    print(f"Schema version: {version}")
+    regressions = Query_Plan_Check(path)
+    for name, detail in regressions:
+        print(f"Query plan regression in {name}: {detail}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,130 @@
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+
+import DB.DB_Back as db
+
+# Streaming export of the full TRANSACTIONS and LOGS history as CSV or NDJSON, optionally gzip.
+# Rows are read in keyset chunks (rowid > last seen) with fetchmany, each chunk on a pool
+# connection borrowed only for that query. Memory stays constant however long the history is,
+# and a slow download holds no connection or read transaction between chunks.
+
+# kind -> (table, key column, exported columns, time column)
+EXPORTS = {
+    "transactions": (
+        "TRANSACTIONS",
+        "rowid",
+        ("ID", "Product_ID", "Project_Name", "Shelf_ID", "Time", "Quantity_Added", "Quantity_Removed", "Operator_ID"),
+        "Time",
+    ),
+    "logs": (
+        "LOGS",
+        "ID",
+        ("ID", "Timestamp", "Transaction_Type", "Transaction_ID", "Level", "Source", "Message"),
+        "Timestamp",
+    ),
+}
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def Export_Rows(kind, start=None, end=None, chunk_size=1000):
+    """
+    Yields the rows of TRANSACTIONS or LOGS in insertion order, one chunk at a time.
+    Args:
+        kind (str): "transactions" or "logs".
+        start (str, optional): Only rows at or after this time.
+        end (str, optional): Only rows at or before this time.
+        chunk_size (int): Rows per query.
+    Returns:
+        iterator: lists of row tuples in the EXPORTS column order.
+    """
+    table, key, columns, time_column = EXPORTS[kind]
+    where = [f"{key} > ?"]
+    params = []
+    if start:
+        where.append(f"{time_column} >= ?")
+        params.append(start)
+    if end:
+        where.append(f"{time_column} <= ?")
+        params.append(end)
+    query = f"SELECT {key}, {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)} ORDER BY {key} LIMIT ?"
+
+    last = -1
+    while True:
+        with db.DBConnection(read_only=True) as conn:
+            cursor = conn.execute(query, [last] + params + [chunk_size])
+            rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [row[1:] for row in rows]
+        if len(rows) < chunk_size:
+            return
+
+
+def Export_Chunks(kind, fmt="csv", compress=False, start=None, end=None, chunk_size=1000):
+    """
+    Yields the export as bytes, one piece per chunk of rows.
+    Args:
+        kind (str): "transactions" or "logs".
+        fmt (str): "csv" (with a header row) or "ndjson".
+        compress (bool): gzip the stream.
+        start, end, chunk_size: See Export_Rows.
+    Returns:
+        iterator: bytes.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    columns = EXPORTS[kind][2]
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip header
+
+    def encode(text):
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield encode(buffer.getvalue())
+    for rows in Export_Rows(kind, start, end, chunk_size):
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            text = buffer.getvalue()
+        else:
+            text = "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n" for row in rows)
+        data = encode(text)
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+def Export_Filename(kind, fmt="csv", compress=False):
+    return f"{kind}.{fmt}" + (".gz" if compress else "")
+
+
+if __name__ == '__main__':
+    # python -m DB.DB_Export logs --format ndjson --gzip -o logs.ndjson.gz
+    parser = argparse.ArgumentParser(description="Export the full TRANSACTIONS or LOGS history.")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("--start", help="only rows at or after this time (YYYY-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--end", help="only rows at or before this time")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("-o", "--output", help="output file, default stdout")
+    args = parser.parse_args()
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in Export_Chunks(args.kind, args.format, args.gzip, args.start, args.end, args.chunk_size):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
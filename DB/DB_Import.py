@@ -0,0 +1,232 @@
+import argparse
+import csv
+import json
+import time
+from itertools import islice
+
+import DB.DB_Back as db
+
+# Bulk catalog import for onboarding a site.
+# Rows are streamed from CSV, JSON or NDJSON files and written with executemany, one transaction
+# per chunk. SHELVES and PRODUCTS aggregates (Quantity, Weight, SpaceLeft, OH) are not touched
+# per row, they are recomputed once from PRODUCTS_SHELVES by Aggregates_Rebuild at the end.
+#
+# Columns (CSV header or JSON keys):
+#   shelves:  ID, Pos, RacksAvailable
+#   products: ID, Name, Description, Family_Name, Family_Item, Weight, ROP, Length, Width, Height,
+#             Tags, Projects (lists in JSON, ';' separated in CSV)
+#   stock:    Shelf_ID, Product_ID, Quantity (quantity on the shelf, replaces the current one)
+
+SHELVES_UPSERT = """INSERT INTO SHELVES (ID, Pos, RacksAvailable) VALUES (?, ?, ?)
+    ON CONFLICT (ID) DO UPDATE SET Pos = excluded.Pos, RacksAvailable = excluded.RacksAvailable"""
+# OH is left alone on existing products, it is recomputed from stock at the end
+PRODUCTS_UPSERT = """INSERT INTO PRODUCTS (ID, Name, Description, Family_Name, Family_Item, Weight, ROP, OH, Length, Width, Height)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+    ON CONFLICT (ID) DO UPDATE SET Name = excluded.Name, Description = excluded.Description,
+        Family_Name = excluded.Family_Name, Family_Item = excluded.Family_Item, Weight = excluded.Weight,
+        ROP = excluded.ROP, Length = excluded.Length, Width = excluded.Width, Height = excluded.Height"""
+TAGS_INSERT = "INSERT OR IGNORE INTO PRODUCT_TAGS VALUES(?, ?)"
+PROJECTS_INSERT = "INSERT OR IGNORE INTO PRODUCT_PROJECTS VALUES(?, ?)"
+STOCK_REPLACE = "INSERT OR REPLACE INTO PRODUCTS_SHELVES VALUES(?, ?, ?)"
+
+
+def Read_Records(path):
+    """
+    Streams records from a CSV (.csv), NDJSON (.ndjson/.jsonl) or JSON array (.json) file.
+    CSV and NDJSON are read one line at a time, a JSON array is loaded whole.
+    Args:
+        path (str): Path to the file.
+    Returns:
+        iterator: dicts keyed by column name.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    elif path.endswith((".ndjson", ".jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+    else:
+        raise ValueError(f"Unsupported file type: {path} (use .csv, .json, .ndjson or .jsonl)")
+
+
+def Chunks(records, size):
+    """Groups an iterator into lists of at most size items."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def Required(record, column):
+    """The value of a column that must be present and not empty."""
+    value = record[column]
+    if value in (None, ""):
+        raise ValueError(f"empty {column}")
+    return value
+
+
+def To_Float(value):
+    return float(value) if value not in (None, "") else None
+
+
+def To_Int(value, default=0):
+    return int(float(value)) if value not in (None, "") else default
+
+
+def To_List(value):
+    """A JSON list as is, or a ';' separated CSV cell."""
+    if value in (None, ""):
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(";") if v.strip()]
+
+
+def Shelf_Rows(record):
+    return [(Required(record, "ID"), Required(record, "Pos"), To_Int(record.get("RacksAvailable"), 1))], [], []
+
+
+def Product_Rows(record):
+    ID = Required(record, "ID")
+    product = (
+        ID,
+        Required(record, "Name"),
+        record.get("Description"),
+        record.get("Family_Name"),
+        record.get("Family_Item"),
+        To_Float(record.get("Weight")),
+        To_Int(record.get("ROP")),
+        To_Float(record.get("Length")),
+        To_Float(record.get("Width")),
+        To_Float(record.get("Height")),
+    )
+    tags = [(ID, tag) for tag in To_List(record.get("Tags"))]
+    projects = [(ID, project) for project in To_List(record.get("Projects"))]
+    return [product], tags, projects
+
+
+def Stock_Rows(record):
+    return [(Required(record, "Shelf_ID"), Required(record, "Product_ID"), To_Int(record.get("Quantity")))], [], []
+
+
+# kind -> (row builder, statements for the main rows, tags and projects)
+KINDS = {
+    "shelves": (Shelf_Rows, (SHELVES_UPSERT, None, None)),
+    "products": (Product_Rows, (PRODUCTS_UPSERT, TAGS_INSERT, PROJECTS_INSERT)),
+    "stock": (Stock_Rows, (STOCK_REPLACE, None, None)),
+}
+
+
+def Import_File(kind, path, chunk_size=5000):
+    """
+    Imports one file of a kind ("shelves", "products" or "stock"), one transaction per chunk.
+    Records missing a required column or with a bad number are skipped and counted.
+    Aggregates are not updated, call Aggregates_Rebuild when every file is imported.
+    Args:
+        kind (str): One of KINDS.
+        path (str): File to import, see Read_Records.
+        chunk_size (int): Records per executemany/transaction.
+    Returns:
+        dict: {"kind", "path", "rows", "skipped", "errors", "seconds", "rows_per_s"}
+    """
+    build, statements = KINDS[kind]
+    started = time.perf_counter()
+    rows = 0
+    skipped = 0
+    errors = []
+    for number, chunk in enumerate(Chunks(Read_Records(path), chunk_size)):
+        batches = ([], [], [])
+        for offset, record in enumerate(chunk):
+            try:
+                for batch, built in zip(batches, build(record)):
+                    batch.extend(built)
+            except (KeyError, ValueError, TypeError) as e:
+                skipped += 1
+                if len(errors) < 20:
+                    errors.append(f"record {number * chunk_size + offset + 1}: {type(e).__name__} {e}")
+        with db.DBConnection() as conn:
+            try:
+                for statement, batch in zip(statements, batches):
+                    if statement and batch:
+                        conn.executemany(statement, batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        rows += len(batches[0])
+    seconds = time.perf_counter() - started
+    return {
+        "kind": kind,
+        "path": path,
+        "rows": rows,
+        "skipped": skipped,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows / seconds) if seconds else None,
+    }
+
+
+def Bulk_Import(shelves=None, products=None, stock=None, chunk_size=5000):
+    """
+    Imports shelves, then products, then stock, and recomputes the aggregates once at the end.
+    Args:
+        shelves (str, optional): Shelves file.
+        products (str, optional): Products file.
+        stock (str, optional): Stock file.
+        chunk_size (int): Records per transaction.
+    Returns:
+        dict: {"files": [Import_File reports], "rebuild_seconds", "seconds"}
+    """
+    started = time.perf_counter()
+    reports = []
+    for kind, path in (("shelves", shelves), ("products", products), ("stock", stock)):
+        if path:
+            reports.append(Import_File(kind, path, chunk_size))
+
+    rebuild_started = time.perf_counter()
+    result = db.Aggregates_Rebuild()
+    if result is not True:
+        raise result
+    rebuild_seconds = time.perf_counter() - rebuild_started
+
+    # This process' caches. Another process (the web app) picks up product changes when its
+    # catalog_cache entries expire, and shelf changes on its next shelf_registry lookup, which
+    # sees the SHELVES generation move
+    db.catalog_cache.clear()
+    db.shelf_registry.load()
+    db.log_event(
+        "INFO",
+        "Bulk import: " + ", ".join(f"{r['rows']} {r['kind']} ({r['skipped']} skipped) from {r['path']}" for r in reports),
+        "Server",
+        transaction_type="BULK_IMPORT",
+    )
+    return {"files": reports, "rebuild_seconds": round(rebuild_seconds, 3), "seconds": round(time.perf_counter() - started, 3)}
+
+
+def Print_Report(report):
+    for r in report["files"]:
+        print(f"{r['kind']:<9} {r['rows']:>9} rows {r['skipped']:>6} skipped {r['seconds']:>9.3f} s {r['rows_per_s'] or 0:>9} rows/s  {r['path']}")
+        for error in r["errors"]:
+            print(f"          {error}")
+    print(f"aggregate rebuild {report['rebuild_seconds']:.3f} s")
+    print(f"total {report['seconds']:.3f} s")
+
+
+if __name__ == '__main__':
+    # python -m DB.DB_Import --shelves shelves.csv --products products.csv --stock stock.csv
+    parser = argparse.ArgumentParser(description="Bulk import shelves, products and stock into the VLM database.")
+    parser.add_argument("--shelves", help="CSV/JSON/NDJSON file with ID, Pos, RacksAvailable")
+    parser.add_argument("--products", help="CSV/JSON/NDJSON file with product columns, Tags and Projects")
+    parser.add_argument("--stock", help="CSV/JSON/NDJSON file with Shelf_ID, Product_ID, Quantity")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="records per transaction (default 5000)")
+    args = parser.parse_args()
+    if not (args.shelves or args.products or args.stock):
+        parser.error("give at least one of --shelves, --products, --stock")
+    Print_Report(Bulk_Import(args.shelves, args.products, args.stock, args.chunk_size))
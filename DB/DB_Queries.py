@@ -0,0 +1,227 @@
+# SQL of the DB_Back hot paths, as constants and builders.
+# DB_Back runs these exact strings and DB_Create.HOT_QUERIES runs EXPLAIN QUERY PLAN on them, so
+# the plan check always sees the queries the app runs. Nothing here touches a connection, the
+# module can be imported before DB_Back opens its pool.
+
+PRODUCT_ON_SHELF_QTY = "SELECT Quantity FROM PRODUCTS_SHELVES WHERE Product_ID = ? AND Shelf_ID = ?"
+SHELF_ID_FROM_POSITION = "SELECT ID FROM SHELVES WHERE Pos = ?"
+PRODUCT_READ = "SELECT * FROM PRODUCTS WHERE ID = ?"
+FAMILY_PRODUCTS = "SELECT ID, Family_Item FROM PRODUCTS WHERE Family_Name = ?;"
+FAMILIES_FIRST_PRODUCT = "SELECT Family_Name, MIN(ID) FROM PRODUCTS GROUP BY Family_Name ORDER BY Family_Name"
+PRODUCT_PROJECTS = "SELECT Project FROM PRODUCT_PROJECTS WHERE Product_ID = ?"
+PROJECT_PRODUCT_IDS = "SELECT Product_ID FROM PRODUCT_PROJECTS WHERE Project = ?"
+PROJECT_PRODUCTS = """SELECT PRODUCTS.ID, PRODUCTS.Name, PRODUCTS.Description, PRODUCTS.Family_Name,
+                             PRODUCTS.Family_Item, PRODUCTS.Weight, PRODUCTS.ROP, PRODUCTS.OH
+                      FROM PRODUCT_PROJECTS
+                      JOIN PRODUCTS ON PRODUCTS.ID = PRODUCT_PROJECTS.Product_ID
+                      WHERE PRODUCT_PROJECTS.Project = ?
+                      ORDER BY PRODUCT_PROJECTS.Product_ID"""
+OPERATOR_LOGIN = "SELECT Name, Password, Password_Salt, Access_Level FROM OPERATORS WHERE Username = ?"
+OPERATOR_BY_ID = "SELECT Name, Username FROM OPERATORS WHERE ID = ?"
+HALL_ROLLUPS_RANGE = "SELECT Minute, Count, Min, Max, Sum, Sum_Sq FROM HALL_ROLLUPS WHERE Minute BETWEEN ? AND ? ORDER BY Minute"
+HALL_READINGS_RANGE = "SELECT Time, Value FROM HALL_READINGS WHERE Time BETWEEN ? AND ? ORDER BY Time DESC LIMIT ?"
+
+
+def Product_Shelf_Get_Query(count):
+    """
+    Builds the Product_Shelf_Get query for count product IDs.
+    Rows are read in Product_ID order from IDX_PRODUCTS_SHELVES_PRODUCT and grouped per product,
+    the shelf comes from the row with the highest key: shelves holding stock first, then the
+    most space left. SQLite takes the bare columns of a MAX() aggregate from that row, so no
+    window and no sort is needed. The TEXT cast lets SHELVES be joined on its primary key
+    (see Product_Shelf_Choose_Query).
+    Args:
+        count (int): Number of product IDs.
+    Returns:
+        str: The SQL, taking the product IDs. Rows are (Product_ID, Shelf_ID, Pos, key).
+    """
+    placeholders = ", ".join("?" * count)
+    return f"""SELECT PRODUCTS_SHELVES.Product_ID, PRODUCTS_SHELVES.Shelf_ID, SHELVES.Pos,
+                      MAX((PRODUCTS_SHELVES.Quantity > 0) * 1e15 + COALESCE(SHELVES.SpaceLeft, -1e14))
+               FROM PRODUCTS_SHELVES
+               CROSS JOIN SHELVES ON SHELVES.ID = CAST(PRODUCTS_SHELVES.Shelf_ID AS TEXT)
+               WHERE PRODUCTS_SHELVES.Product_ID IN ({placeholders})
+               GROUP BY PRODUCTS_SHELVES.Product_ID"""
+
+def Product_Shelf_Choose_Query(count):
+    """
+    Builds the Product_Shelf_Choose query for count products.
+    Candidate shelves come from three tiers (shelves of the same projects, of the same family,
+    the best shelf overall) and are ranked per product by tier, space left and weight. The
+    ranking sorts the candidates (see DB_Create.PLAN_ALLOWANCES), everything else is index lookups.
+    PRODUCTS_SHELVES.Shelf_ID is declared INT while SHELVES.ID is TEXT, comparing them directly
+    applies numeric affinity and SHELVES can only be scanned. The join casts the candidate to
+    TEXT so every candidate is a primary key lookup, and CROSS JOIN keeps the candidates outside.
+    Args:
+        count (int): Number of requested products.
+    Returns:
+        str: The SQL, taking (Seq, Product_ID) pairs for the requested products.
+    """
+    requested = ", ".join("(?, ?)" for _ in range(count))
+    return f"""WITH Requested (Seq, Product_ID) AS (VALUES {requested}),
+            Known AS (
+                SELECT Requested.Seq, Requested.Product_ID, PRODUCTS.Family_Name
+                FROM Requested JOIN PRODUCTS ON PRODUCTS.ID = Requested.Product_ID
+            ),
+            Candidates (Seq, Tier, Shelf_ID) AS (
+                SELECT Known.Seq, 1, PRODUCTS_SHELVES.Shelf_ID
+                FROM Known
+                JOIN PRODUCT_PROJECTS AS Mine ON Mine.Product_ID = Known.Product_ID
+                JOIN PRODUCT_PROJECTS AS Other ON Other.Project = Mine.Project AND Other.Product_ID != Known.Product_ID
+                JOIN PRODUCTS_SHELVES ON PRODUCTS_SHELVES.Product_ID = Other.Product_ID
+                UNION ALL
+                SELECT Known.Seq, 2, PRODUCTS_SHELVES.Shelf_ID
+                FROM Known
+                JOIN PRODUCTS AS Other ON Other.Family_Name = Known.Family_Name AND Other.ID != Known.Product_ID
+                JOIN PRODUCTS_SHELVES ON PRODUCTS_SHELVES.Product_ID = Other.ID
+                UNION ALL
+                SELECT Known.Seq, 3, (SELECT ID FROM SHELVES ORDER BY SpaceLeft DESC, Weight ASC LIMIT 1)
+                FROM Known
+            ),
+            Ranked AS (
+                SELECT Candidates.Seq, SHELVES.ID, SHELVES.Pos,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY Candidates.Seq
+                           ORDER BY Candidates.Tier, SHELVES.SpaceLeft DESC, SHELVES.Weight ASC
+                       ) AS Rank
+                FROM Candidates CROSS JOIN SHELVES ON SHELVES.ID = CAST(Candidates.Shelf_ID AS TEXT)
+            )
+            SELECT Seq, ID, Pos FROM Ranked WHERE Rank = 1"""
+
+# Newest first in the exact column order of IDX_TRANSACTIONS_PRODUCT_TIME, so the running sum
+# walks the covering index backwards and needs no sort. Ties on Time are broken by the remaining
+# index columns and rowid, the same order the rows come out in.
+INVENTORY_ORDER = "Time DESC, Quantity_Added DESC, Quantity_Removed DESC, Operator_ID DESC, Project_Name DESC, Shelf_ID DESC, rowid DESC"
+
+def Inventory_Records_Query(start=False, end=False, max_points=False):
+    """
+    Builds the Get_Product_Inventory_Records query.
+    Args:
+        start (bool): Filter on :start.
+        end (bool): Filter on :end.
+        max_points (bool): Downsample to :buckets buckets when there are more than :max_points rows.
+    Returns:
+        str: The SQL, taking the named parameters pid, start, end, max_points and buckets.
+    """
+    # Balances only depend on newer transactions, so rows before start can be skipped entirely
+    where = ["Product_ID = :pid"]
+    if start:
+        where.append("Time >= :start")
+    history = f"""
+        History AS (
+            SELECT Time, Quantity_Added, Quantity_Removed, Operator_ID, Project_Name, Shelf_ID,
+                   COALESCE((SELECT OH FROM PRODUCTS WHERE ID = :pid), 0) - COALESCE(SUM(
+                       COALESCE(Quantity_Added, 0) - COALESCE(Quantity_Removed, 0)
+                   ) OVER (ORDER BY {INVENTORY_ORDER} ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS On_Hand
+            FROM TRANSACTIONS
+            WHERE {" AND ".join(where)}
+        ),
+        Filtered AS (
+            SELECT * FROM History {"WHERE Time <= :end" if end else ""}
+        )"""
+    columns = "Time, On_Hand, Quantity_Added, Quantity_Removed, Operator_ID, Project_Name, Shelf_ID"
+
+    if not max_points:
+        # No outer ORDER BY: the window pass already yields INVENTORY_ORDER, sorting again
+        # would only add a temporary b-tree
+        return f"WITH {history} SELECT {columns} FROM Filtered"
+    # Ranking inside the buckets sorts by On_Hand, over at most the rows in range
+    return f"""
+        WITH {history},
+        Bounds AS (
+            SELECT MIN(julianday(Time)) AS T0, MAX(julianday(Time)) AS T1, COUNT(*) AS N FROM Filtered
+        ),
+        Ranked AS (
+            SELECT Filtered.*,
+                   ROW_NUMBER() OVER (PARTITION BY Bucket ORDER BY On_Hand, Time) AS Rank_Min,
+                   ROW_NUMBER() OVER (PARTITION BY Bucket ORDER BY On_Hand DESC, Time DESC) AS Rank_Max
+            FROM (
+                SELECT Filtered.*,
+                       MIN(CAST((julianday(Time) - Bounds.T0) * :buckets / MAX(Bounds.T1 - Bounds.T0, 1e-9) AS INT), :buckets - 1) AS Bucket
+                FROM Filtered, Bounds
+            ) AS Filtered, Bounds
+            WHERE Bounds.N > :max_points
+        )
+        SELECT {columns} FROM Ranked WHERE Rank_Min = 1 OR Rank_Max = 1
+        UNION ALL
+        SELECT {columns} FROM Filtered, Bounds WHERE Bounds.N <= :max_points
+        ORDER BY Time DESC"""
+
+def Logs_FTS_Query(text):
+    """Turns free text into an FTS5 query: every word is quoted (so UIDs like N-17-10-123 and
+    punctuation are safe) and prefix matched, and all words must be present."""
+    words = text.split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+LOGS_COLUMNS = "LOGS.ID, LOGS.Timestamp, LOGS.Transaction_Type, LOGS.Transaction_ID, LOGS.Level, LOGS.Source, LOGS.Message"
+
+def Logs_Where(level=None, source=None, transaction_type=None, transaction_id=None, q=None, start=None, end=None, fts=True):
+    """Builds the FROM and WHERE clauses shared by the LOGS queries.
+    With q and fts (the LOGS_FTS index exists), LOGS is joined to LOGS_FTS and matched there,
+    otherwise q is a LIKE on the message.
+    Returns: (from_sql, where, params)
+    """
+    from_sql = "LOGS"
+    where = []
+    params = []
+    if level:
+        where.append("Level = ?")
+        params.append(level)
+    if source:
+        where.append("Source = ?")
+        params.append(source)
+    if transaction_type:
+        where.append("Transaction_Type = ?")
+        params.append(transaction_type)
+    if transaction_id:
+        where.append("Transaction_ID = ?")
+        params.append(transaction_id)
+    if q and Logs_FTS_Query(q) and fts:
+        from_sql = "LOGS_FTS JOIN LOGS ON LOGS.ID = LOGS_FTS.rowid"
+        where.append("LOGS_FTS MATCH ?")
+        params.append(Logs_FTS_Query(q))
+    elif q:
+        where.append("Message LIKE ?")
+        params.append(f"%{q}%")
+    if start:
+        where.append("Timestamp >= ?")
+        params.append(start)
+    if end:
+        where.append("Timestamp <= ?")
+        params.append(end)
+    return from_sql, where, params
+
+def Logs_Page_Query(from_sql, where, by_rank=False, cursor=False, by_timestamp=False):
+    """
+    Builds the Get_Logs page query for the FROM and WHERE clauses of Logs_Where.
+    Rows are newest first on (Timestamp, ID), best match first on (rank, ID) with by_rank, and in
+    descending ID order for a full-text search by time, which FTS5 returns without sorting.
+    Args:
+        from_sql (str): FROM clause from Logs_Where.
+        where (list): WHERE conditions from Logs_Where.
+        by_rank (bool): Sort a full-text search by relevance.
+        cursor (bool): Continue after a cursor.
+        by_timestamp (bool): Sort a full-text search by time on (Timestamp, ID) too, the order of
+            the log archives, instead of descending ID.
+    Returns:
+        str: The SQL. Parameters are the Logs_Where params, then the cursor (key, ID), or only ID
+            for a full-text search by ID, then LIMIT and OFFSET. The last column is the sort key.
+    """
+    fts = from_sql != "LOGS"
+    where = list(where)
+    by_id = fts and not by_rank and not by_timestamp
+    if cursor and by_id:
+        where.append("LOGS_FTS.rowid < ?")
+    elif cursor:
+        where.append(f"({'LOGS_FTS.rank' if by_rank else 'LOGS.Timestamp'}, LOGS.ID) {'>' if by_rank else '<'} (?, ?)")
+    extra_sql = ", snippet(LOGS_FTS, 0, char(2), char(3), '…', 16)" if fts else ", NULL"
+    extra_sql += ", LOGS_FTS.rank" if by_rank else ", LOGS.Timestamp"
+    if by_rank:
+        order_sql = "LOGS_FTS.rank, LOGS.ID"
+    elif by_id:
+        order_sql = "LOGS_FTS.rowid DESC"
+    else:
+        order_sql = "LOGS.Timestamp DESC, LOGS.ID DESC"
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    return f"SELECT {LOGS_COLUMNS}{extra_sql} FROM {from_sql} {where_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?"
@@ -0,0 +1,196 @@
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from DB import DB_Create
+
+# Reproducible synthetic warehouse for benchmarks.
+# The same scale and seed always give the same database: shelves, product families, tags,
+# projects, operators, stock and years of transactions with their PRODUCT_OPERATION logs plus
+# background log noise. Rows are written with raw sqlite3 into a fresh file created by the
+# migrations, the SHELVES/PRODUCTS aggregates are then recomputed by DB_Back.Aggregates_Rebuild.
+# Shelf positions and transaction IDs use the same formats as the machine ('F01', IDAllocator IDs),
+# so benchmarks exercise the real position parsing and ID range queries.
+#
+# Operators get placeholder password hashes, they cannot log in.
+
+# Positions are side + two digit level ('F01' ... 'B99'), so a machine has at most 198 shelves
+MAX_SHELVES = 2 * 99
+SCALES = {
+    "tiny": {"shelves": 20, "products": 500, "families": 50, "projects": 10, "operators": 5, "years": 1, "transactions_per_day": 20},
+    "small": {"shelves": 50, "products": 2000, "families": 200, "projects": 20, "operators": 10, "years": 1, "transactions_per_day": 100},
+    "medium": {"shelves": 150, "products": 20000, "families": 1000, "projects": 100, "operators": 50, "years": 3, "transactions_per_day": 500},
+    "large": {"shelves": MAX_SHELVES, "products": 100000, "families": 5000, "projects": 300, "operators": 200, "years": 5, "transactions_per_day": 2000},
+}
+# Same layout as DB_Back.IDAllocator (not imported, DB_Back must only be imported by Open_Backend).
+# Synthetic IDs use their own node so they never collide with IDs minted by a benchmark run.
+ID_EPOCH = datetime(2025, 1, 1)
+ID_NODE_BITS = 4
+ID_SEQUENCE_BITS = 8
+ID_NODE = 15
+START = ID_EPOCH
+NOISE_PER_TRANSACTION = 1.0  # background LOGS rows per transaction
+NOISE = [
+    ("INFO", "ESP32", "WEBSOCKET_MESSAGE", "Received message code {n}"),
+    ("INFO", "Server", "USER_LOGIN", "Operator {n} logged in"),
+    ("INFO", "Server", "WEBSITE_TRANSACTION", "Website transaction for {n} products"),
+    ("WARNING", "ESP32", "AUTO_HALL", "Hall sensor reading {n} outside the expected range"),
+    ("ERROR", "Server", "WEBSOCKET_DISCONNECTION", "Connection lost after {n} s"),
+]
+TAGS = ["bolt", "nut", "washer", "screw", "bracket", "sensor", "cable", "motor", "bearing", "spring",
+        "fuse", "relay", "gear", "belt", "pulley", "clamp", "seal", "valve", "pipe", "fitting"]
+
+
+def Shelf_Pos(index):
+    """Positions alternate sides, F01, B01, F02, B02, ..."""
+    if not 0 <= index < MAX_SHELVES:
+        raise ValueError(f"shelf index must be between 0 and {MAX_SHELVES - 1}")
+    return f"{'FB'[index % 2]}{index // 2 + 1:02d}"
+
+
+def Transaction_ID(stamp, sequence):
+    """IDAllocator ID for a UTC time on ID_NODE, sequence numbers the IDs of the same millisecond."""
+    ms = (stamp - ID_EPOCH) // timedelta(milliseconds=1) + (sequence >> ID_SEQUENCE_BITS)
+    return (ms << (ID_NODE_BITS + ID_SEQUENCE_BITS)) | (ID_NODE << ID_SEQUENCE_BITS) | (sequence & ((1 << ID_SEQUENCE_BITS) - 1))
+
+
+def Generate(db_path, scale="small", seed=0, chunk_size=10000, **overrides):
+    """
+    Writes a synthetic warehouse into a new database file.
+    Args:
+        db_path (str): Database to create, must not exist yet.
+        scale (str): One of SCALES.
+        seed (int): Random seed, the same seed gives the same data.
+        chunk_size (int): Rows per executemany/transaction for transactions and logs.
+        **overrides: Replace single SCALES values, e.g. years=2.
+    Returns:
+        dict: Row counts per table and "seconds".
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists, synthetic data only goes into a new database")
+    params = dict(SCALES[scale], **overrides)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    DB_Create.Migrate(db_path)
+
+    shelves = [(f"S{i + 1:04d}", Shelf_Pos(i), 1 + (i % 3 == 0)) for i in range(params["shelves"])]
+    families = [f"Family {i + 1:05d}" for i in range(params["families"])]
+    projects = [f"Project {i + 1:04d}" for i in range(params["projects"])]
+    operators = [(i + 1, f"Operator {i + 1}", f"operator{i + 1}", "synthetic", "synthetic", 1 + (i % 4 == 0))
+                 for i in range(params["operators"])]
+
+    products = []
+    tags = []
+    product_projects = {}
+    for i in range(params["products"]):
+        ID = f"P{i + 1:07d}"
+        family = rng.choice(families)
+        products.append((ID, f"Product {i + 1}", f"Synthetic product {i + 1} of {family}", family,
+                         f"Item {i + 1}", round(rng.uniform(0.01, 5.0), 2), rng.randint(0, 20), 0,
+                         round(rng.uniform(1, 30), 1), round(rng.uniform(1, 30), 1), round(rng.uniform(1, 20), 1)))
+        tags.extend((ID, tag) for tag in rng.sample(TAGS, rng.randint(0, 3)))
+        if rng.random() < 0.6:
+            product_projects[ID] = rng.sample(projects, rng.randint(1, min(3, len(projects))))
+
+    stock = {}
+    for product in products:
+        for shelf in rng.sample(shelves, 1 + (rng.random() < 0.2)):
+            stock[(shelf[0], product[0])] = rng.randint(0, 50)
+    pairs = list(stock)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executemany("INSERT INTO SHELVES (ID, Pos, RacksAvailable) VALUES (?, ?, ?)", shelves)
+        conn.executemany("INSERT INTO PRODUCTS VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", products)
+        conn.executemany("INSERT INTO PRODUCT_TAGS VALUES (?, ?)", tags)
+        conn.executemany("INSERT INTO PRODUCT_PROJECTS VALUES (?, ?)",
+                         [(ID, project) for ID, names in product_projects.items() for project in names])
+        conn.executemany("INSERT INTO OPERATORS VALUES (?, ?, ?, ?, ?, ?)", operators)
+        conn.executemany("INSERT INTO PRODUCTS_SHELVES VALUES (?, ?, ?)", [(s, p, q) for (s, p), q in stock.items()])
+        conn.commit()
+
+        counts = {"transactions": 0, "logs": 0}
+        transactions = []
+        logs = []
+
+        def Write():
+            conn.executemany("INSERT INTO TRANSACTIONS VALUES (?, ?, ?, ?, ?, ?, ?, ?)", transactions)
+            conn.executemany("INSERT INTO LOGS (Timestamp, Transaction_Type, Transaction_ID, Level, Source, Message) VALUES (?, ?, ?, ?, ?, ?)", logs)
+            conn.commit()
+            counts["transactions"] += len(transactions)
+            counts["logs"] += len(logs)
+            transactions.clear()
+            logs.clear()
+
+        last_when = None
+        for day in range(365 * params["years"]):
+            date = START + timedelta(days=day)
+            for second in sorted(rng.randrange(86400) for _ in range(params["transactions_per_day"])):
+                when = date + timedelta(seconds=second)
+                sequence = sequence + 1 if when == last_when else 0
+                last_when = when
+                ID = Transaction_ID(when, sequence)
+                shelf_id, product_id = rng.choice(pairs)
+                stamp = when.strftime("%Y-%m-%d %H:%M:%S")
+                QTY = rng.choice((-3, -2, -1, -1, -1, 1, 2, 5, 10))
+                added, removed = max(QTY, 0), max(-QTY, 0)
+                project = rng.choice(product_projects[product_id]) if product_id in product_projects and rng.random() < 0.5 else None
+                operator_id = rng.randint(1, params["operators"])
+                transactions.append((ID, product_id, project, shelf_id, stamp, added, removed, operator_id))
+                logs.append((stamp, "PRODUCT_OPERATION", str(ID), "INFO", "Server",
+                             f"Product operation logged: ID={ID}, Product_ID={product_id}, Shelf_ID={shelf_id}, QTY_Added={added}, QTY_Removed={removed}, Operator_ID={operator_id}, Source=Website, Project_Name={project}"))
+                while rng.random() < NOISE_PER_TRANSACTION / (1 + NOISE_PER_TRANSACTION):
+                    level, source, transaction_type, message = rng.choice(NOISE)
+                    logs.append((stamp, transaction_type, None, level, source, message.format(n=rng.randint(1, 999))))
+                if len(transactions) >= chunk_size:
+                    Write()
+        Write()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    counts.update(
+        shelves=len(shelves),
+        products=len(products),
+        tags=len(tags),
+        product_projects=sum(len(names) for names in product_projects.values()),
+        operators=len(operators),
+        stock=len(stock),
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    return counts
+
+
+def Open_Backend(db_path):
+    """
+    Imports DB_Back pointed at db_path (through VLM_DB_PATH) and returns the module.
+    Must run before anything else in the process imports DB_Back.
+    """
+    os.environ["VLM_DB_PATH"] = db_path
+    import DB.DB_Back as db
+    if os.path.abspath(db.DB_PATH) != os.path.abspath(db_path):
+        raise RuntimeError(f"DB_Back was already imported for {db.DB_PATH}")
+    return db
+
+
+if __name__ == '__main__':
+    # python -m DB.DB_Synth bench.db --scale medium --seed 1
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic VLM database.")
+    parser.add_argument("db_path", help="database file to create")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--years", type=int, help="override the scale's years of transactions")
+    args = parser.parse_args()
+
+    overrides = {"years": args.years} if args.years else {}
+    counts = Generate(args.db_path, args.scale, args.seed, **overrides)
+    result = Open_Backend(args.db_path).Aggregates_Rebuild()
+    if result is not True:
+        raise result
+    for table, count in counts.items():
+        print(f"{table:<17} {count}")
@@ -14,7 +14,7 @@ extern I2CKeyPad keypad;
 
 extern bool Authenticated;
 extern int8_t AuthTrials;
-extern int VLMtransactionID;
+extern int64_t VLMtransactionID;
 extern bool AutoRestocked;
 extern PCF8574 pcf8574;
 extern I2CKeyPad keypad;
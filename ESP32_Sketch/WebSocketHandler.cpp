@@ -4,7 +4,7 @@ WebSocketsClient webSocket;
 
 bool Authenticated = false;
 int8_t AuthTrials = 0;
-int VLMtransactionID = 0;
+int64_t VLMtransactionID = 0;
 bool AutoRestocked = false;
 
 // Initialize WiFi connection
@@ -147,7 +147,7 @@ void webSocketEvent(WStype_t type, uint8_t *payload, size_t length)
     { // VLM Operator Authenticated {}
       if (dict["Authenticated"] == false)
       {
-        VLMtransactionID = dict["transaction_id"].as<int>();
+        VLMtransactionID = dict["transaction_id"].as<int64_t>();
         Authenticated = false;
         AuthTrials++;
 
@@ -162,7 +162,7 @@ void webSocketEvent(WStype_t type, uint8_t *payload, size_t length)
       else
       {
         String operator_id = dict["operator_id"].as<const char*>();
-        VLMtransactionID = dict["transaction_id"].as<int>();
+        VLMtransactionID = dict["transaction_id"].as<int64_t>();
 
         Authenticated = true;
         AuthTrials = 0;
@@ -202,7 +202,7 @@ void webSocketEvent(WStype_t type, uint8_t *payload, size_t length)
     {
       int steps = dict["steps"];
       bool direction = dict["direction"];
-      long transaction_id = dict["transaction_id"];
+      int64_t transaction_id = dict["transaction_id"];
       ManualVerticalMotion(steps, direction);
       
 
@@ -217,7 +217,7 @@ void webSocketEvent(WStype_t type, uint8_t *payload, size_t length)
       int duration_ms = dict["duration_ms"];
       int left_pwm_freq = dict["left_pwm_freq"];
       int right_pwm_freq = dict["right_pwm_freq"];
-      int transaction_id = dict["transaction_id"];
+      int64_t transaction_id = dict["transaction_id"];
 
       ManualHorizontalMotion(duration_ms, left_pwm_freq, right_pwm_freq );
 
@@ -229,7 +229,7 @@ void webSocketEvent(WStype_t type, uint8_t *payload, size_t length)
     }
     case 602: // immediate hall sensor read
     {
-      int transaction_id = dict["transaction_id"];
+      int64_t transaction_id = dict["transaction_id"];
       pinMode(HallSensor, INPUT); // Ensure correct mode
       int hall_value = analogRead(HallSensor);
 
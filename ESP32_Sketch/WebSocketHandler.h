@@ -10,7 +10,7 @@
 
 extern bool Authenticated;
 extern int8_t AuthTrials;
-extern int VLMtransactionID;
+extern int64_t VLMtransactionID;
 extern bool AutoRestocked;
 extern Preferences preferences;
 extern const int HallSensor;
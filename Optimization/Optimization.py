@@ -234,8 +234,10 @@ def Categorize_Products():
 	Returns:
 		dict: A nested dictionary categorizing products by family and project.
 	"""
-	products_project, productIDs_without_project = Products_Projects_Merge()
-	Transaction_Sessions = Transactions_Sessions_Creation(productIDs_without_project, products_project)
+	# Read everything from a point-in-time copy, so the run holds no pool connections and never blocks writers
+	with db.Snapshot():
+		products_project, productIDs_without_project = Products_Projects_Merge()
+		Transaction_Sessions = Transactions_Sessions_Creation(productIDs_without_project, products_project)
 	co_df, products, descriptions = CoOccurrence_Matrix_Creation(Transaction_Sessions)
 	cluster_df = Clustering(co_df, products, descriptions)
 	cluster_results, split_clusters = Gemini_Verify_Clusters(cluster_df)
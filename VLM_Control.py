@@ -19,15 +19,19 @@ def Products_Dispense(Product_IDs, Shelf_IDs, Positions):
 
     Differences = []
     
-    for shelf_id in Shelf_IDs:
+    for shelf_id, position in zip(Shelf_IDs, Positions):
+        level = db.shelf_registry.level(shelf_id)
+        if level is None:
+            level = db.Pos_Level(position)
         Differences.append(
-            abs(int(shelf_id[1:3]) - current_level)
-        )  # Extract level from shelf ID (assuming format 'SLLXX')
+            abs(level - current_level) if level is not None else float("inf")
+        )
 
     # Get the closest to the current level
     min_idx = Differences.index(min(Differences))
     Shelf_IDs.insert(0, Shelf_IDs.pop(min_idx))
     Product_IDs.insert(0, Product_IDs.pop(min_idx))
+    Positions.insert(0, Positions.pop(min_idx))
     Differences.insert(0, Differences.pop(min_idx))
 
     floors = []
@@ -107,12 +111,17 @@ def Auto_Restock_Shelf_Get(UID, Operator_ID, Transaction_id):
     payload = {"code": 101, "uid": UID, "operator_id": Operator_ID, "transaction_id": Transaction_id}
 
     # Physical Control of the VLM where the shelf is retrieved
-    Shelf_IDs, Positions = db.Product_Shelf_Get([UID])
+    Shelves = db.Product_Shelf_Get([UID])
 
-    if not Shelf_IDs:
-        Shelf_IDs, Positions = db.Product_Shelf_Choose([UID])
-    
-    payload["Floor"] = Positions[0]
+    if UID in Shelves:
+        Position = Shelves[UID][1]
+    else:
+        Chosen = db.Product_Shelf_Choose([UID])
+        if not Chosen or Chosen[1][0] is None:
+            return None
+        Position = Chosen[1][0]
+
+    payload["Floor"] = Position
      
     msg = WS_Send_sync(json.dumps(payload))
     if msg:
@@ -44,7 +44,10 @@ async def websocket_handler(websocket):
                 case 120:  # Handle authentication request from ESP32 and provide transaction ID
 
                     transaction_id = db.Transaction_ID_Generator()
-                    operator_info = db.Operator_ID_Query(message["operator"])
+                    operator_info = db.Operator_ID_Cached(message["operator"])
+                    if operator_info is db.CatalogCache.MISSING:
+                        # Not cached yet, keep the blocking query off the event loop
+                        operator_info = await asyncio.to_thread(db.Operator_ID_Query, message["operator"])
                     print(f"Operator Info: {operator_info}")
                     if operator_info is not None:
                         # Send the transaction ID and operator info back to the ESP32
@@ -160,18 +163,11 @@ async def websocket_handler(websocket):
                         hall_S_thresh,
                     )
                 case 603:  # Handle hall sensor reading
-                    hall_value = message["hall_value"]
-                    if message["transaction_id"] is None:
-                        type = "AUTO_HALL_SENSOR_READING"
-                    else:
-                        type = "MANUAL_HALL_SENSOR_READING"
-                    
-                    db.log_event(
-                        "INFO",
-                        f"Hall sensor reading received: {hall_value}",
-                        "ESP32",
-                        transaction_type=type,
-                        transaction_id=message["transaction_id"],
+                    # Stored in the hall sensor series, not in LOGS (see /api/hall_series)
+                    db.Hall_Reading_Add(
+                        message["hall_value"],
+                        pin=message.get("hall_pin"),
+                        transaction_id=message.get("transaction_id"),
                     )
                 case _:
                     print(f"Unhandled message: {message}")
@@ -1,11 +1,13 @@
 import os
 import Backend
 import DB.DB_Back as db
+import DB.DB_Export as DB_Export
 from Websocket_Server import init_websocket_server, WS_Send_sync
 import Websocket_Server as WSS
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, g, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, g, jsonify, Response, stream_with_context
 import json
+import hashlib
 
 
 app = Flask(__name__)
@@ -46,6 +48,8 @@ def login():
             return render_template('index.html', products=products, Thumbnails=Thumbnails, IDs=IDs, projects=projects)
 
 
+        elif result == Backend.LOGIN_BUSY:
+            flash(result, 'error')
         else:
             flash('Invalid username or password!', 'error')
             db.log_event("WARNING", f"Failed login attempt for user {username}", "Server", transaction_type="USER_LOGIN_FAILED")
@@ -204,7 +208,15 @@ def product_inventory(product_id):
     if 'username' not in session or session['Access_Level'] <= 1:
         return jsonify({'error': 'Unauthorized access'}), 403
 
-    inventory_data = Backend.Get_Product_Inventory(product_id)
+    start = request.args.get('start')
+    end = request.args.get('end')
+    try:
+        # Chart payload stays bounded however long the history is
+        max_points = min(max(int(request.args.get('max_points', 500)), 2), 5000)
+    except ValueError:
+        return jsonify({'error': 'Invalid max_points'}), 400
+
+    inventory_data = Backend.Get_Product_Inventory(product_id, start=start, end=end, max_points=max_points)
     if isinstance(inventory_data, str):
         return jsonify({'error': inventory_data}), 400
 
@@ -237,6 +249,9 @@ def api_logs():
     q = request.args.get('q')
     start = request.args.get('start')
     end = request.args.get('end')
+    cursor = request.args.get('cursor')  # next_cursor of the previous page
+    sort = request.args.get('sort', 'time')  # 'relevance' ranks full-text matches of q
+    include_archive = request.args.get('archive') == '1'  # also search logs moved out by retention
     try:
         limit = int(request.args.get('limit', 50))
         offset = int(request.args.get('offset', 0))
@@ -244,8 +259,32 @@ def api_logs():
         limit = 50
         offset = 0
 
-    logs, total = Backend.Get_Logs(level=level, source=source, transaction_type=transaction_type, transaction_id=transaction_id, q=q, start=start, end=end, limit=limit, offset=offset)
-    return jsonify({'logs': logs, 'total': total})
+    try:
+        logs, total, next_cursor = Backend.Get_Logs(level=level, source=source, transaction_type=transaction_type, transaction_id=transaction_id, q=q, start=start, end=end, limit=limit, offset=offset, cursor=cursor, sort=sort, include_archive=include_archive)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # the unfiltered total is exact, filtered totals are cached counts and may be null while being counted
+    filtered = any([level, source, transaction_type, transaction_id, q, start, end, include_archive])
+    return jsonify({'logs': logs, 'total': total, 'total_is_estimate': filtered, 'next_cursor': next_cursor})
+
+
+@app.route('/api/export/<kind>', methods=['GET'])
+def api_export(kind):
+    """Stream the full TRANSACTIONS or LOGS history as a download.
+    Query: format=csv|ndjson, gzip=1, start, end (times as stored, e.g. 2025-01-31 23:59:59)."""
+    if 'username' not in session or session['Access_Level'] <= 1:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    fmt = request.args.get('format', 'csv')
+    if kind not in DB_Export.EXPORTS or fmt not in DB_Export.FORMATS:
+        return jsonify({'error': 'Unknown export'}), 404
+    compress = request.args.get('gzip') == '1'
+    chunks = DB_Export.Export_Chunks(kind, fmt, compress, request.args.get('start'), request.args.get('end'))
+    db.log_event("INFO", f"Export of {kind} ({fmt}) by {session['username']}", "Server", transaction_type="EXPORT")
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else DB_Export.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={DB_Export.Export_Filename(kind, fmt, compress)}'},
+    )
 
 
 @app.route('/api/log_selectors', methods=['GET'])
@@ -253,7 +292,11 @@ def api_log_selectors():
     if 'username' not in session:
         return jsonify({'error': 'Unauthorized access'}), 403
     selectors = Backend.Get_Log_Selectors()
-    return jsonify(selectors)
+    # The selector list rarely changes: let the browser revalidate with If-None-Match and get a 304
+    response = jsonify(selectors)
+    response.set_etag(hashlib.md5(json.dumps(selectors, sort_keys=True).encode('utf-8')).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 
 @app.route('/api/vlm_config', methods=['GET'])
@@ -268,6 +311,22 @@ def get_vlm_config():
 
 
 
+@app.route('/api/hall_series', methods=['GET'])
+def get_hall_series():
+    """Hall sensor readings and stats over the last `minutes`, with the stored thresholds, for calibration."""
+    if 'username' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    try:
+        minutes = min(max(int(request.args.get('minutes', 60)), 1), 60 * 24 * 30)
+    except ValueError:
+        minutes = 60
+    resolution = request.args.get('resolution', 'minute')
+    series = db.Get_Hall_Series(minutes=minutes, resolution=resolution)
+    config = db.VLM_Get_Configuration() or {}
+    series['thresholds'] = {'hall_N_thresh': config.get('hall_N_thresh'), 'hall_S_thresh': config.get('hall_S_thresh')}
+    return jsonify(series)
+
+
 @app.route('/api/vlm_config', methods=['POST'])
 def update_vlm_config():
     if 'username' not in session:
@@ -401,6 +460,89 @@ def debug_ws_status():
     return jsonify({'connected': connected, 'queue_size': qsize})
 
 
+def debug_access_denied():
+    """The DB debug counters expose queries and timings: admins only."""
+    if 'username' not in session or session['Access_Level'] <= 2:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    return None
+
+
+@app.route('/debug/db_queries', methods=['GET', 'POST'])
+def debug_db_queries():
+    """Return per-function and per-query DB time, rows and pool wait, plus recent slow queries.
+    Query: limit (top queries, default 20). POST returns the counters and starts counting afresh."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    stats = db.query_stats.stats(limit=request.args.get('limit', 20, type=int))
+    if request.method == 'POST':
+        db.query_stats.reset()
+    return jsonify(stats)
+
+
+@app.route('/debug/db_pool', methods=['GET'])
+def debug_db_pool():
+    """Return DB connection pool counters (wait/hold time, exhaustion, reconnects) per lane."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.pool.stats())
+
+
+@app.route('/debug/log_writer', methods=['GET'])
+def debug_log_writer():
+    """Return background log writer counters (queued, written, dropped, failed, pending)."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.log_writer.stats())
+
+
+@app.route('/debug/catalog_cache', methods=['GET'])
+def debug_catalog_cache():
+    """Return catalog cache counters (hits, misses, expired, evicted, invalidated, entries)."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.catalog_cache.stats())
+
+
+@app.route('/debug/operator_cache', methods=['GET'])
+def debug_operator_cache():
+    """Return operator directory cache counters used by the ESP32 login (code 120)."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.operator_cache.stats())
+
+
+@app.route('/debug/password_hasher', methods=['GET'])
+def debug_password_hasher():
+    """Return login bcrypt pool counters (hash latency, queue wait, rejected)."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.password_hasher.stats())
+
+
+@app.route('/debug/log_retention', methods=['GET'])
+def debug_log_retention():
+    """Return the result of the last log retention run (rows archived/deleted, files, duration)."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.log_retention_last)
+
+
+@app.route('/debug/hall_writer', methods=['GET'])
+def debug_hall_writer():
+    """Return hall sensor series writer counters (queued, written, dropped, failed, pending)."""
+    denied = debug_access_denied()
+    if denied:
+        return denied
+    return jsonify(db.hall_writer.stats())
+
+
 if __name__ == '__main__':
     # Only start WebSocket server in the reloader child (when WERKZEUG_RUN_MAIN is set)
     # This ensures Flask and WebSocket share the same process/memory space
@@ -409,6 +551,7 @@ if __name__ == '__main__':
     if is_reloader_child:
         print("[app.py] Reloader child: starting WebSocket server")
         init_websocket_server()
+        db.Logs_Retention_Start()
     else:
         print("[app.py] Reloader parent: skipping WebSocket server")
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+# DB_Back opens its pool at import, point it at a throwaway database before any test imports it
+os.environ["VLM_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="vlm_tests_"), "test.db")
+
+import DB.DB_Back as db
+
+TABLES = ("TRANSACTIONS", "PRODUCTS_SHELVES", "PRODUCT_TAGS", "PRODUCT_PROJECTS", "PRODUCTS", "SHELVES", "LOGS")
+
+
+@pytest.fixture
+def clean_db():
+    """DB_Back on an empty catalog, with the caches and the log queue cleared."""
+    db.log_writer.flush()
+    with db.DBConnection() as conn:
+        for table in TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+    db.catalog_cache.clear()
+    db.shelf_registry.load()
+    with db.log_totals_lock:
+        db.log_totals.clear()
+    return db
+
+
+@pytest.fixture
+def stocked(clean_db):
+    """Two shelves and two products, P1 on S1 (10) and S2 (5), P2 on S2 (3)."""
+    db = clean_db
+    db.Shelves_DB_Add("S1", "F01")
+    db.Shelves_DB_Add("S2", "F02")
+    db.Products_DB_Add("P1", "Bolt", "", "Fasteners", "M4", 0.1, 0, 0, 2, 2, 1)
+    db.Products_DB_Add("P2", "Nut", "", "Fasteners", "M4", 0.05, 0, 0, 1, 1, 1)
+    assert db.Stock_Operations_Apply_db(1, [("S1", "P1", 10), ("S2", "P1", 5), ("S2", "P2", 3)], "2025-01-01 00:00:00", 1) is True
+    return db
+
+
+@pytest.fixture
+def catalog_files(tmp_path):
+    """Shelves (CSV), products (NDJSON) and stock (CSV) files for DB_Import, the shelves and products files have one bad record each."""
+    shelves = tmp_path / "shelves.csv"
+    shelves.write_text("ID,Pos,RacksAvailable\nS1,F01,2\nS2,B01,\n,F02,1\n", encoding="utf-8")
+    products = tmp_path / "products.ndjson"
+    products.write_text("\n".join(json.dumps(record) for record in [
+        {"ID": "P1", "Name": "Bolt", "Family_Name": "Fasteners", "Weight": 0.1, "Length": 2, "Width": 2, "Height": 1, "Tags": ["m4", "steel"]},
+        {"ID": "P2", "Name": "Nut", "Family_Name": "Fasteners", "Weight": "0.05", "Projects": ["Line A"]},
+        {"ID": "P3", "Name": "Washer", "Weight": "heavy"},
+    ]) + "\n", encoding="utf-8")
+    stock = tmp_path / "stock.csv"
+    stock.write_text("Shelf_ID,Product_ID,Quantity\nS1,P1,10\nS2,P1,5\nS2,P2,3\n", encoding="utf-8")
+    return str(shelves), str(products), str(stock)
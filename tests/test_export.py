@@ -0,0 +1,56 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from DB import DB_Export, DB_Import
+
+
+def Export(kind, fmt, compress=False, **kwargs):
+    data = b"".join(DB_Export.Export_Chunks(kind, fmt, compress, chunk_size=2, **kwargs))
+    text = (gzip.decompress(data) if compress else data).decode("utf-8")
+    if fmt == "csv":
+        rows = list(csv.reader(io.StringIO(text)))
+        assert tuple(rows[0]) == DB_Export.EXPORTS[kind][2]
+        return rows[1:]
+    return [list(json.loads(line).values()) for line in text.splitlines()]
+
+
+@pytest.fixture
+def history(clean_db, catalog_files):
+    """The imported test catalog with five stock operations on top."""
+    db = clean_db
+    DB_Import.Bulk_Import(*catalog_files)
+    for ID, (Delta, Time) in enumerate([(-2, "2025-01-02"), (4, "2025-01-03"), (-1, "2025-01-04"), (1, "2025-01-05"), (-3, "2025-01-06")], start=1):
+        assert db.Stock_Operations_Apply_db(ID, [("S1", "P1", Delta)], f"{Time} 00:00:00", 1, "Line A") is True
+    db.log_writer.flush()
+    return db
+
+
+@pytest.mark.parametrize("fmt,compress", [("csv", False), ("csv", True), ("ndjson", False), ("ndjson", True)])
+def test_transactions_export_round_trip(history, fmt, compress):
+    with history.DBConnection(read_only=True) as conn:
+        expected = conn.execute(f"SELECT {', '.join(DB_Export.EXPORTS['transactions'][2])} FROM TRANSACTIONS ORDER BY rowid").fetchall()
+    rows = Export("transactions", fmt, compress)
+    if fmt == "csv":
+        expected = [["" if value is None else str(value) for value in row] for row in expected]
+    else:
+        expected = [list(row) for row in expected]
+    assert len(rows) == 5
+    assert rows == expected
+
+
+def test_export_time_window(history):
+    rows = Export("transactions", "ndjson", start="2025-01-03", end="2025-01-05 00:00:00")
+    assert [row[0] for row in rows] == [2, 3, 4]
+
+
+def test_logs_export_matches_logs(history):
+    with history.DBConnection(read_only=True) as conn:
+        expected = [list(row) for row in conn.execute("SELECT ID, Timestamp, Transaction_Type, Transaction_ID, Level, Source, Message FROM LOGS ORDER BY ID")]
+    assert expected
+    assert Export("logs", "ndjson", True) == expected
+    with pytest.raises(ValueError):
+        list(DB_Export.Export_Chunks("logs", "xml"))
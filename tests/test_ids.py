@@ -0,0 +1,48 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+import DB.DB_Back as db
+
+
+def test_ids_are_unique_and_increasing_under_contention():
+    allocator = db.IDAllocator()
+    per_thread = {}
+
+    def Mint(name):
+        per_thread[name] = [allocator.next() for _ in range(2000)]
+
+    threads = [threading.Thread(target=Mint, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for ids in per_thread.values():
+        assert all(a < b for a, b in zip(ids, ids[1:]))
+    every = [ID for ids in per_thread.values() for ID in ids]
+    assert len(set(every)) == len(every) == 16000
+    assert max(every) < 2**53
+
+
+def test_sequence_overflow_and_clock_step_back(monkeypatch):
+    allocator = db.IDAllocator(node=3)
+    now = [1750000000.0]
+    monkeypatch.setattr(db.time, "time", lambda: now[0])
+    ids = [allocator.next() for _ in range(1 << db.IDAllocator.SEQUENCE_BITS)]
+    # the 257th ID of one millisecond borrows the next millisecond
+    overflow = allocator.next()
+    now[0] -= 5  # clock stepped back
+    after = allocator.next()
+    assert ids == sorted(set(ids)) and ids[-1] < overflow < after
+    assert db.ID_Time(overflow) > db.ID_Time(ids[0])
+    assert (after >> db.IDAllocator.SEQUENCE_BITS) & 0xF == 3
+
+
+def test_id_time_round_trip():
+    when = datetime(2026, 3, 4, 5, 6, 7, 89000, tzinfo=timezone.utc)
+    assert db.ID_Time(db.ID_From_Time(when)) == when
+    assert db.ID_From_Time(datetime(2020, 1, 1, tzinfo=timezone.utc)) == 0
+    with pytest.raises(ValueError):
+        db.IDAllocator(node=16)
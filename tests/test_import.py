@@ -0,0 +1,26 @@
+from DB import DB_Import
+
+
+def test_bulk_import_builds_the_catalog_and_aggregates(clean_db, catalog_files):
+    db = clean_db
+    report = DB_Import.Bulk_Import(*catalog_files, chunk_size=2)
+    assert [(r["kind"], r["rows"], r["skipped"]) for r in report["files"]] == [("shelves", 2, 1), ("products", 2, 1), ("stock", 3, 0)]
+    with db.DBConnection(read_only=True) as conn:
+        assert conn.execute("SELECT ID, Pos, RacksAvailable FROM SHELVES ORDER BY ID").fetchall() == [("S1", "F01", 2), ("S2", "B01", 1)]
+        assert conn.execute("SELECT ID, OH FROM PRODUCTS ORDER BY ID").fetchall() == [("P1", 15), ("P2", 3)]
+        assert conn.execute("SELECT Tag FROM PRODUCT_TAGS WHERE Product_ID = 'P1' ORDER BY Tag").fetchall() == [("m4",), ("steel",)]
+    assert db.Aggregates_Check() == []
+
+
+def test_reimport_is_idempotent(clean_db, catalog_files):
+    db = clean_db
+    DB_Import.Bulk_Import(*catalog_files)
+
+    def State():
+        with db.DBConnection(read_only=True) as conn:
+            return [conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+                    for table in ("SHELVES", "PRODUCTS", "PRODUCT_TAGS", "PRODUCT_PROJECTS", "PRODUCTS_SHELVES")]
+
+    before = State()
+    DB_Import.Bulk_Import(*catalog_files)
+    assert State() == before
@@ -0,0 +1,154 @@
+import time
+
+import pytest
+
+
+def Logs_Count(db, where="1"):
+    """Rows in LOGS, after the log writer wrote what other tests and the server queued."""
+    db.log_writer.flush()
+    with db.DBConnection(read_only=True) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM LOGS WHERE {where}").fetchone()[0]
+
+
+def Add_Logs(db, rows):
+    """rows: (Timestamp, Level, Message) tuples, written directly so timestamps can repeat."""
+    with db.DBConnection() as conn:
+        conn.executemany(
+            "INSERT INTO LOGS (Timestamp, Transaction_Type, Level, Source, Message) VALUES (?, 'TEST', ?, 'Server', ?)",
+            rows,
+        )
+        conn.commit()
+
+
+def test_cursor_round_trip(clean_db):
+    db = clean_db
+    for key, ID in [("2025-01-01 00:00:00", 1), (-3.25, 17), (0, 2**53 - 1)]:
+        assert db.Logs_Cursor_Decode(db.Logs_Cursor_Encode(key, ID)) == (key, ID)
+    for bad in ["", "not base64!", db.Logs_Cursor_Encode(None, 1), db.Logs_Cursor_Encode("x", "y")]:
+        with pytest.raises(ValueError):
+            db.Logs_Cursor_Decode(bad)
+
+
+def test_cursor_pages_cover_every_row_once(clean_db):
+    db = clean_db
+    # repeated timestamps, so pages must break ties on ID
+    Add_Logs(db, [(f"2025-01-01 00:00:{i // 3:02d}", "INFO", f"message {i}") for i in range(23)])
+    seen = []
+    cursor = None
+    while True:
+        logs, total, cursor = db.Get_Logs(limit=5, cursor=cursor)
+        assert total == 23
+        seen.extend(log["id"] for log in logs)
+        if cursor is None:
+            break
+    assert len(seen) == 23 == len(set(seen))
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_last_page_boundary(clean_db):
+    db = clean_db
+    Add_Logs(db, [(f"2025-01-01 00:00:{i:02d}", "INFO", "m") for i in range(10)])
+    logs, _, cursor = db.Get_Logs(limit=10)
+    assert len(logs) == 10 and cursor is None
+    logs, _, cursor = db.Get_Logs(limit=5)
+    logs, _, cursor = db.Get_Logs(limit=5, cursor=cursor)
+    assert len(logs) == 5 and cursor is None
+
+
+def test_unfiltered_total_is_exact_after_deletes(clean_db):
+    db = clean_db
+    Add_Logs(db, [("2025-01-01 00:00:00", "INFO", "m")] * 10)
+    with db.DBConnection() as conn:
+        conn.execute("DELETE FROM LOGS WHERE ID % 2 = 0")
+        conn.commit()
+    assert Logs_Count(db, "Transaction_Type = 'TEST'") == 5
+    assert db.Get_Logs(limit=1)[1] == Logs_Count(db)
+
+
+def test_filtered_totals_are_bounded(clean_db, monkeypatch):
+    db = clean_db
+    monkeypatch.setattr(db, "LOG_TOTALS_MAX", 4)
+    Add_Logs(db, [("2025-01-01 00:00:00", "INFO", "alpha"), ("2025-01-01 00:00:00", "ERROR", "beta")])
+    for i in range(20):
+        db.Get_Logs(q=f"word{i}", limit=1)
+    deadline = time.monotonic() + 5
+    while db.log_totals_refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(db.log_totals) <= 4
+    # a filtered total shows up once the background count ran
+    db.Get_Logs(level="ERROR", limit=1)
+    while db.log_totals_refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert db.Get_Logs(level="ERROR", limit=1)[1] == 1
+
+
+def test_prune_keeps_an_exact_total(clean_db, tmp_path):
+    db = clean_db
+    Add_Logs(db, [("2000-01-01 00:00:00", "INFO", "old")] * 7 + [("2999-01-01 00:00:00", "INFO", "new")] * 3)
+    db.Logs_Prune({"default": 90}, batch_size=3, pause=0, archive_dir=str(tmp_path))
+    assert Logs_Count(db, "Message = 'new'") == 3 and Logs_Count(db, "Message = 'old'") == 0
+    assert db.Get_Logs(limit=1)[1] == Logs_Count(db)
+    archived = db.Search_Log_Archives(limit=100, archive_dir=str(tmp_path))
+    assert len(archived) == 7
+
+
+def test_failed_prune_archives_nothing(clean_db, tmp_path, monkeypatch):
+    db = clean_db
+    Add_Logs(db, [("2000-01-01 00:00:00", "INFO", "old")] * 4)
+
+    def Fail(rows, archive_dir):
+        raise OSError("disk full")
+    monkeypatch.setattr(db, "Logs_Archive_Write", Fail)
+    with pytest.raises(OSError):
+        db.Logs_Prune({"default": 90}, pause=0, archive_dir=str(tmp_path))
+    assert db.Get_Logs(limit=1)[1] == 4
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_archive_pages_merge_live_and_archived_rows(clean_db, tmp_path, monkeypatch):
+    db = clean_db
+    monkeypatch.setattr(db, "LOG_ARCHIVE_DIR", str(tmp_path))
+    # live IDs do not follow the timestamps, and archived rows share timestamps with live ones
+    Add_Logs(db, [(f"2025-01-0{1 + i % 3} 00:00:{i % 4:02d}", "INFO", f"sensor {i}") for i in range(12)])
+    with db.DBConnection(read_only=True) as conn:
+        live = conn.execute(
+            "SELECT ID, Timestamp, Transaction_Type, Transaction_ID, Level, Source, Message FROM LOGS WHERE Transaction_Type = 'TEST'"
+        ).fetchall()
+    archived = [(10**6 + i, f"2025-01-0{1 + i % 3} 00:00:{i % 4:02d}", "TEST", None, "INFO", "Server", f"sensor old {i}") for i in range(9)]
+    # a row left live by a failed prune commit is also in the archive
+    db.Logs_Archive_Write(archived + [live[0]])
+    expected = [row[0] for row in sorted(live + archived, key=lambda row: (row[1], row[0]), reverse=True)]
+
+    for q in (None, "sensor"):
+        seen = []
+        cursor = None
+        while True:
+            logs, _, cursor = db.Get_Logs(transaction_type="TEST", q=q, limit=4, cursor=cursor, include_archive=True)
+            seen.extend(log["id"] for log in logs)
+            if cursor is None:
+                break
+        assert seen == expected
+        logs = db.Get_Logs(transaction_type="TEST", q=q, limit=4, offset=8, include_archive=True)[0]
+        assert [log["id"] for log in logs] == expected[8:12]
+
+
+def test_archive_search_skips_rows_archived_twice(clean_db, tmp_path):
+    db = clean_db
+    rows = [(i, "2000-01-01 00:00:00", "TEST", None, "INFO", "Server", f"m{i}") for i in range(1, 4)]
+    db.Logs_Archive_Write(rows, str(tmp_path))
+    db.Logs_Archive_Write(rows, str(tmp_path))
+    assert [log["id"] for log in db.Search_Log_Archives(limit=10, archive_dir=str(tmp_path))] == [3, 2, 1]
+
+
+def test_search_pages_cover_every_match_once(clean_db):
+    db = clean_db
+    Add_Logs(db, [(f"2025-01-01 00:00:{i // 3:02d}", "INFO", f"sensor {i}" if i % 2 else f"other {i}") for i in range(30)])
+    seen = []
+    cursor = None
+    while True:
+        logs, _, cursor = db.Get_Logs(q="sensor", limit=4, cursor=cursor)
+        seen.extend(log["id"] for log in logs)
+        if cursor is None:
+            break
+    assert len(seen) == 15 == len(set(seen))
+    assert seen == sorted(seen, reverse=True)
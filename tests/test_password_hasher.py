@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+
+def test_timed_out_hash_keeps_its_slot(clean_db):
+    db = clean_db
+    hasher = db.PasswordHasher(workers=1, max_pending=1, timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(TimeoutError):
+        hasher.run(release.wait)
+    # the first hash is still running, so the queue is still full
+    with pytest.raises(TimeoutError):
+        hasher.run(lambda: None)
+    release.set()
+    hasher.executor.shutdown(wait=True)
+    stats = hasher.stats()
+    assert (stats["timed_out"], stats["rejected"], stats["hashed"]) == (1, 1, 1)
+    assert hasher.slots.acquire(blocking=False)
+
+
+def test_hasher_settings_come_from_the_environment(tmp_path):
+    env = dict(os.environ, VLM_DB_PATH=str(tmp_path / "env.db"), VLM_BCRYPT_ROUNDS="5", VLM_HASH_WORKERS="3", VLM_HASH_MAX_PENDING="4")
+    code = "import DB.DB_Back as db; h = db.password_hasher; print(h.rounds, h.executor._max_workers, h.slots._initial_value)"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=60, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.stdout.split()[-3:] == ["5", "3", "4"], result.stderr
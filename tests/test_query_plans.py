@@ -0,0 +1,44 @@
+from DB import DB_Create
+
+
+def test_hot_queries_use_indexes(clean_db):
+    assert DB_Create.Query_Plan_Check(clean_db.DB_PATH) == []
+
+
+def test_inventory_records_newest_first_with_balances(stocked):
+    db = stocked
+    for ID, (Delta, Time) in enumerate([(-2, "2025-01-02 00:00:00"), (4, "2025-01-03 00:00:00"), (-1, "2025-01-03 00:00:00")], start=2):
+        assert db.Stock_Operations_Apply_db(ID, [("S1", "P1", Delta)], Time, 1) is True
+    records = db.Get_Product_Inventory_Records("P1")
+    times = [r["Time"] for r in records]
+    assert times == sorted(times, reverse=True)
+    # On_Hand walks back from the current OH (15 + 1) by the newer transactions
+    assert records[0]["On_Hand"] == 16
+    for newer, older in zip(records, records[1:]):
+        assert older["On_Hand"] == newer["On_Hand"] - (newer["Quantity_Added"] or 0) + (newer["Quantity_Removed"] or 0)
+
+
+def test_plan_check_flags_table_scans_and_sorts(clean_db, monkeypatch):
+    monkeypatch.setattr(DB_Create, "HOT_QUERIES", [
+        ("scan", "SELECT * FROM PRODUCTS WHERE Name = ?", ("x",)),
+        ("sort", "SELECT ID FROM PRODUCTS ORDER BY Name", ()),
+    ])
+    assert {name for name, _ in DB_Create.Query_Plan_Check(clean_db.DB_PATH)} == {"scan", "sort"}
+
+
+def test_plan_allowances_only_cover_their_query(clean_db, monkeypatch):
+    sort = "SELECT ID FROM PRODUCTS WHERE Family_Name = ? ORDER BY Name"
+    monkeypatch.setattr(DB_Create, "HOT_QUERIES", [("allowed", sort, ("F",)), ("other", sort, ("F",))])
+    monkeypatch.setattr(DB_Create, "PLAN_ALLOWANCES", {"allowed": ("USE TEMP B-TREE FOR ORDER BY",)})
+    assert {name for name, _ in DB_Create.Query_Plan_Check(clean_db.DB_PATH)} == {"other"}
+
+
+def test_product_shelf_get_prefers_stocked_then_roomier_shelves(stocked):
+    db = stocked
+    with db.DBConnection(read_only=True) as conn:
+        space = dict(conn.execute("SELECT ID, SpaceLeft FROM SHELVES").fetchall())
+    roomier = max(("S1", "S2"), key=space.get)
+    assert db.Product_Shelf_Get(["P1", "P2", "P9"]) == {"P1": (roomier, {"S1": "F01", "S2": "F02"}[roomier]), "P2": ("S2", "F02")}
+    assert db.Products_Shelves_Update_db(roomier, "P1", 0) is True
+    other = "S2" if roomier == "S1" else "S1"
+    assert db.Product_Shelf_Get(["P1"])["P1"][0] == other
@@ -0,0 +1,37 @@
+import sqlite3
+
+
+def Other_Process(db, sql, params=()):
+    """Writes SHELVES through a plain connection, as another process would."""
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_level_follows_a_shelf_moved_elsewhere(stocked):
+    db = stocked
+    assert db.shelf_registry.level("S1") == 1
+    Other_Process(db, "UPDATE SHELVES SET Pos = 'B07' WHERE ID = 'S1'")
+    assert db.shelf_registry.level("S1") == 7
+
+
+def test_lookups_see_shelves_added_elsewhere(stocked, monkeypatch):
+    db = stocked
+    monkeypatch.setattr(db.shelf_registry, "check_interval", 0)
+    Other_Process(db, "INSERT INTO SHELVES (ID, Pos) VALUES ('S3', 'F09')")
+    assert db.shelf_registry.shelf_id("F09") == "S3"
+    Other_Process(db, "DELETE FROM SHELVES WHERE ID = 'S3'")
+    assert db.shelf_registry.position("S3") is None
+
+
+def test_stock_changes_do_not_reload_the_registry(stocked):
+    db = stocked
+    with db.DBConnection(read_only=True) as conn:
+        generation = db.Shelves_Generation(conn)
+    # the aggregates on SHELVES change, the positions do not
+    assert db.Stock_Delta_Apply_db(2, "S1", "P1", -1, "2025-01-02 00:00:00", 1) == 9
+    with db.DBConnection(read_only=True) as conn:
+        assert db.Shelves_Generation(conn) == generation
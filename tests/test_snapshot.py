@@ -0,0 +1,23 @@
+import sqlite3
+
+import pytest
+
+
+def test_snapshot_copies_only_the_analytics_tables(stocked):
+    db = stocked
+    db.log_event("INFO", "before the snapshot", "Server", transaction_type="TEST")
+    db.log_writer.flush()
+    with db.Snapshot() as snapshot:
+        assert snapshot.rows["PRODUCTS"] == 2
+        assert snapshot.rows["PRODUCTS_SHELVES"] == 3
+        # writes after the copy are not seen inside the snapshot
+        assert db.Stock_Delta_Apply_db(5, "S1", "P1", 1, "2025-01-02 00:00:00", 1) == 11
+        with db.DBConnection(read_only=True) as conn:
+            assert conn.execute("SELECT Quantity FROM PRODUCTS_SHELVES WHERE Shelf_ID = 'S1' AND Product_ID = 'P1'").fetchone()[0] == 10
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("SELECT COUNT(*) FROM LOGS")
+            # indexes come along, the inventory history still uses the covering index
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT Time FROM TRANSACTIONS WHERE Product_ID = 'P1' ORDER BY Time").fetchall()
+            assert "IDX_TRANSACTIONS_PRODUCT_TIME" in plan[-1][-1]
+    with db.DBConnection(read_only=True) as conn:
+        assert conn.execute("SELECT Quantity FROM PRODUCTS_SHELVES WHERE Shelf_ID = 'S1' AND Product_ID = 'P1'").fetchone()[0] == 11
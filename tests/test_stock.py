@@ -0,0 +1,97 @@
+import threading
+
+from Backend import Norm_Product_Operation
+
+
+def Quantity(db, Shelf_ID, Product_ID):
+    with db.DBConnection(read_only=True) as conn:
+        row = conn.execute("SELECT Quantity FROM PRODUCTS_SHELVES WHERE Shelf_ID = ? AND Product_ID = ?", (Shelf_ID, Product_ID)).fetchone()
+    return row[0] if row else None
+
+
+def test_delta_returns_new_quantity(stocked):
+    db = stocked
+    assert db.Stock_Delta_Apply_db(2, "S1", "P1", -4, "2025-01-02 00:00:00", 1) == 6
+    assert db.Stock_Delta_Apply_db(3, "S1", "P2", 7, "2025-01-02 00:00:00", 1) == 7
+    assert Quantity(db, "S1", "P2") == 7
+    assert db.Aggregates_Check() == []
+
+
+def test_delta_rejects_over_dispense(stocked):
+    db = stocked
+    result = db.Stock_Delta_Apply_db(2, "S2", "P2", -4, "2025-01-02 00:00:00", 1)
+    assert isinstance(result, ValueError)
+    assert Quantity(db, "S2", "P2") == 3
+    # nothing of the rejected operation is written
+    with db.DBConnection(read_only=True) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM TRANSACTIONS WHERE ID = 2").fetchone()[0] == 0
+    assert isinstance(db.Stock_Delta_Apply_db(3, "S1", "P2", -1, "2025-01-02 00:00:00", 1), ValueError)
+    assert Quantity(db, "S1", "P2") is None
+    assert db.Aggregates_Check() == []
+
+
+def test_batch_rejects_over_dispense_as_a_whole(stocked):
+    db = stocked
+    result = db.Stock_Operations_Apply_db(2, [("S1", "P1", -2), ("S2", "P2", -5)], "2025-01-02 00:00:00", 1)
+    assert isinstance(result, ValueError)
+    assert Quantity(db, "S1", "P1") == 10
+    assert Quantity(db, "S2", "P2") == 3
+    assert db.Stock_Operations_Apply_db(3, [("S1", "P1", -2), ("S2", "P2", -3)], "2025-01-02 00:00:00", 1) is True
+    assert (Quantity(db, "S1", "P1"), Quantity(db, "S2", "P2")) == (8, 0)
+    assert db.Aggregates_Check() == []
+
+
+def test_concurrent_website_and_esp32_operations(stocked):
+    db = stocked
+    errors = []
+
+    def Dispense():
+        for _ in range(50):
+            result = Norm_Product_Operation(db.Transaction_ID_Generator(), "S1", "P1", -1, 1)
+            if isinstance(result, Exception):
+                errors.append(result)
+
+    def Scan():
+        for _ in range(50):
+            result = Norm_Product_Operation(db.Transaction_ID_Generator(), "F01", "P1", 1, 2, Source="ESP32")
+            if isinstance(result, Exception):
+                errors.append(result)
+
+    threads = [threading.Thread(target=f) for f in (Dispense, Dispense, Scan, Scan)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # dispenses may be refused while the shelf is short, every accepted one must be counted
+    refused = len(errors)
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert Quantity(db, "S1", "P1") == 10 + 100 - (100 - refused)
+    assert Quantity(db, "S1", "P1") >= 0
+    assert db.Aggregates_Check() == []
+
+
+def test_quantity_set_races_with_deltas(stocked):
+    db = stocked
+    errors = []
+
+    def Set():
+        for _ in range(30):
+            result = db.Products_Shelves_Update_db("S1", "P1", 20)
+            if result is not True:
+                errors.append(result)
+
+    def Add():
+        for _ in range(30):
+            result = db.Stock_Delta_Apply_db(db.Transaction_ID_Generator(), "S1", "P1", 1, "2025-01-02 00:00:00", 1)
+            if isinstance(result, Exception):
+                errors.append(result)
+
+    threads = [threading.Thread(target=f) for f in (Set, Set, Add, Add)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert db.Aggregates_Check() == []